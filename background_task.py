@@ -0,0 +1,87 @@
+import queue
+import threading
+
+from valuation_core import CalculationCancelled
+
+
+class BackgroundTask:
+    """Run a calculation on a worker thread and hand its result back to the Tk main loop.
+
+    ``func`` is called as ``func(progress, cancelled)``: ``progress(fraction, message=None)``
+    reports progress between 0 and 1 and ``cancelled()`` returns True once ``cancel()`` has
+    been requested. The worker only ever writes to a queue; ``root.after`` polls that queue,
+    so every callback (``on_done``, ``on_error``, ``on_progress``, ``on_cancel``) runs on
+    the main thread and may touch widgets.
+    """
+
+    def __init__(self, root, func, on_done, on_error=None, on_progress=None, on_cancel=None, poll_ms=50):
+        self.root = root
+        self.func = func
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.poll_ms = poll_ms
+
+        self.results = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.finished = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def running(self):
+        return self.thread is not None and not self.finished
+
+    def _progress(self, fraction, message=None):
+        self.results.put(('progress', (fraction, message)))
+
+    def _run(self):
+        try:
+            result = self.func(self._progress, self.cancelled)
+        except CalculationCancelled:
+            self.results.put(('cancelled', None))
+        except Exception as e:
+            # An error after cancel() is as stale as a result would be
+            self.results.put(('cancelled', None) if self.cancelled() else ('error', e))
+        else:
+            # A result that arrives after cancel() is discarded like any other cancellation
+            self.results.put(('cancelled', None) if self.cancelled() else ('done', result))
+
+    def _poll(self):
+        """Drain the queue on the main thread, then re-arm until the worker reports back"""
+        while True:
+            try:
+                kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == 'progress':
+                if self.on_progress is not None and not self.cancelled():
+                    self.on_progress(*payload)
+                continue
+
+            self.finished = True
+            # cancel() may have been called after the worker queued its outcome
+            if self.cancelled():
+                kind = 'cancelled'
+            if kind == 'done':
+                self.on_done(payload)
+            elif kind == 'error' and self.on_error is not None:
+                self.on_error(payload)
+            elif kind == 'cancelled' and self.on_cancel is not None:
+                self.on_cancel()
+            return
+
+        self.root.after(self.poll_ms, self._poll)
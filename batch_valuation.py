@@ -0,0 +1,263 @@
+import os
+import sys
+import glob
+import json
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from valuation_core import (DEFAULT_PARAMETERS, load_panel, select_quarters, lookback_length, forecast_parameters,
+                            default_base_revenue, model_inputs, dcf_valuation, solve_implied_discount_rate,
+                            backtest_parameters, backtest_valuations, file_fingerprint, price_sensitivities,
+                            price_grid, verbose_logging)
+from valuation_export import valuation_tables, combine_tables, export_tables
+from valuation_history import HISTORY_PATH, ValuationHistory
+
+RESULT_COLUMNS = ['ticker', 'status', 'enterprise_value', 'equity_value', 'price_per_share',
+                  'current_share_price', 'implied_discount_rate', 'implied_rate_note']
+
+
+def discover_workbooks(statements_dir, tickers=None):
+    """Find consolidated workbooks laid out as statements/<TICKER>/consolidated_statements_<TICKER>.xlsx"""
+    workbooks = []
+    for path in sorted(glob.glob(os.path.join(statements_dir, '*', 'consolidated_statements_*.xlsx'))):
+        if os.path.basename(path).startswith('~'):
+            continue  # Excel lock files
+        ticker = os.path.basename(os.path.dirname(path)).upper()
+        if tickers and ticker not in tickers:
+            continue
+        workbooks.append((ticker, path))
+    return workbooks
+
+
+def load_overrides(path):
+    """Read parameter overrides from a JSON file.
+
+    The file maps ``"default"`` and/or ticker symbols to parameter dictionaries using the
+    forecast form names and units, e.g. ``{"default": {"discount_rate": 9.0},
+    "AMZN": {"revenue_growth": 12.5, "current_share_price": 185.0}}``.
+    """
+    if not path:
+        return {}
+    with open(path) as f:
+        overrides = json.load(f)
+    return {key if key == 'default' else key.upper(): value for key, value in overrides.items()}
+
+
+def value_ticker(ticker, file_path, overrides=None, quarters="All available data", verbose=False, export=False,
+                 history_path=None):
+    """Run the load -> prefill -> DCF pipeline for one workbook and return a result row.
+
+    With ``export`` the row also carries the ticker's ``valuation_tables`` under ``_export``.
+    With ``history_path`` a stored result for identical inputs is reused instead of being
+    recomputed; only new results are returned under ``_history`` for the parent to record.
+    """
+    overrides = overrides or {}
+    row = {'ticker': ticker, 'file': file_path, '_history': [], '_reused': 0}
+    if verbose:
+        verbose_logging()
+    history = None
+    if history_path:
+        try:
+            history = ValuationHistory(history_path)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def stored(kind, inputs, compute, fingerprint):
+        try:
+            outputs = history.find(kind, inputs) if history is not None else None
+        except sqlite3.Error:
+            outputs = None
+        if outputs is not None:
+            row['_reused'] += 1
+            return outputs
+        outputs = compute()
+        row['_history'].append((ticker, kind, inputs, outputs, fingerprint))
+        return outputs
+
+    try:
+        panel = load_panel(file_path)
+        selected_cols = select_quarters(panel.quarter_cols, quarters)
+        params, _, latest_data = forecast_parameters(panel, selected_cols)
+
+        inputs = dict(DEFAULT_PARAMETERS)
+        inputs.update(params)
+        inputs.update(overrides.get('default', {}))
+        inputs.update(overrides.get(ticker, {}))
+        if inputs.get('base_revenue') is None:
+            inputs['base_revenue'] = default_base_revenue(panel, latest_data)
+        row.update(inputs)
+
+        if inputs['base_revenue'] is None:
+            raise ValueError("Could not find revenue data; provide base_revenue in the overrides file")
+        if not inputs.get('shares_outstanding'):
+            raise ValueError("Shares outstanding not found; provide shares_outstanding in the overrides file")
+
+        kwargs = model_inputs(inputs)
+        fingerprint = file_fingerprint(file_path)
+        model = stored('dcf', kwargs, lambda: dcf_valuation(**kwargs), fingerprint)
+        row['enterprise_value'] = model['ev']
+        row['equity_value'] = model['equity_value']
+        row['price_per_share'] = model['price_per_share']
+        if export:
+            row['_export'] = valuation_tables(model, kwargs, price_sensitivities(kwargs), price_grid(kwargs))
+
+        # Reverse DCF only when a market price is supplied; a price the model cannot reach
+        # is noted on the row without failing the forward valuation
+        if inputs.get('current_share_price'):
+            kwargs = dict(kwargs)
+            kwargs.pop('discount_rate')
+            current_price = float(inputs['current_share_price'])
+            try:
+                solution = stored('implied_discount_rate', dict(kwargs, target_price=current_price),
+                                  lambda: solve_implied_discount_rate(current_price, **kwargs), fingerprint)
+                row['implied_discount_rate'] = solution['implied_discount_rate'] * 100
+            except ValueError as e:
+                row['implied_discount_rate'] = float('nan')
+                row['implied_rate_note'] = str(e)
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = f"error: {e}"
+    finally:
+        if history is not None:
+            history.close()
+    return row
+
+
+def run_batch(workbooks, overrides=None, quarters="All available data", workers=None, verbose=False,
+              history=None, export_path=None):
+    """Value every workbook in a process pool and return one results table.
+
+    When ``history`` (a ``ValuationHistory``) is given, valuations already stored for identical
+    inputs are reused and every new valuation is appended to it.
+    ``export_path`` writes the DCF detail, summary, sensitivities and price grid of every
+    ticker into one consolidated export (.xlsx, .csv or .parquet).
+    """
+    rows = []
+    records = []
+    reused = 0
+    exports = {}
+    # Workers read the history through their own connections; an in-memory one is not shared
+    history_path = history.path if history is not None and history.path != ':memory:' else None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(value_ticker, ticker, path, overrides, quarters, verbose, bool(export_path),
+                               history_path): ticker
+                   for ticker, path in workbooks}
+        for future in as_completed(futures):
+            row = future.result()
+            print(f"  {row['ticker']}: {row['status']}")
+            # History records for the parent process, dropped from the results table
+            records.extend(row.pop('_history'))
+            reused += row.pop('_reused')
+            if '_export' in row:
+                exports[row['ticker']] = row.pop('_export')
+            rows.append(row)
+
+    if reused:
+        print(f"Reused {reused} stored valuations from {history.path}")
+    if history is not None and records:
+        history.record_many(records)
+        print(f"Recorded {len(records)} valuations in {history.path}")
+    if export_path and exports:
+        written = export_tables(combine_tables(dict(sorted(exports.items()))), export_path)
+        print(f"Exported valuation details to {', '.join(written)}")
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    ordered = [col for col in RESULT_COLUMNS if col in results.columns]
+    results = results[ordered + [col for col in results.columns if col not in ordered]]
+    return results.sort_values('ticker').reset_index(drop=True)
+
+
+def backtest_ticker(ticker, file_path, quarters="All available data", verbose=False):
+    """Load one workbook and rebuild its prefilled parameters as of every historical quarter"""
+    if verbose:
+        verbose_logging()
+    try:
+        panel = load_panel(file_path)
+        entries = backtest_parameters(panel, lookback_length(quarters))
+        return ticker, [(ticker, as_of, params) for as_of, params in entries], 'ok'
+    except Exception as e:
+        return ticker, [], f"error: {e}"
+
+
+def run_backtest(workbooks, overrides=None, quarters="All available data", workers=None, verbose=False):
+    """Rebuild the as-of parameters per workbook in a process pool, then value every ticker and
+    quarter together in one vectorized batch"""
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(backtest_ticker, ticker, path, quarters, verbose) for ticker, path in workbooks]
+        for future in as_completed(futures):
+            ticker, ticker_entries, status = future.result()
+            print(f"  {ticker}: {status} ({len(ticker_entries)} quarters)")
+            entries.extend(ticker_entries)
+
+    results = backtest_valuations(entries, overrides)
+    if results.empty:
+        return results
+    # Oldest quarter first within each ticker, in the panel's own period order
+    results['_order'] = results.groupby('ticker').cumcount()
+    return results.sort_values(['ticker', '_order']).drop(columns='_order').reset_index(drop=True)
+
+
+def write_results(results, output_path):
+    """Write the results table as .xlsx or .csv depending on the extension"""
+    if output_path.endswith('.xlsx'):
+        results.to_excel(output_path, index=False, sheet_name='Valuations')
+    else:
+        results.to_csv(output_path, index=False)
+    print(f"Valuation results saved to {output_path}")
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Run the DCF valuation for every consolidated workbook.')
+    parser.add_argument('tickers', nargs='*', help='Only value these tickers (default: all)')
+    parser.add_argument('--statements-dir', default=os.path.join(script_dir, 'statements'),
+                        help='Folder containing one sub-folder per ticker')
+    parser.add_argument('--overrides', help='JSON file with "default" and per-ticker parameter overrides')
+    parser.add_argument('--quarters', default="All available data",
+                        help='Lookback used for prefilled parameters: 4, 8, 12 or 16 quarters, or "all" (default)')
+    parser.add_argument('--output', help='Results table (.csv or .xlsx, default valuation_results.csv '
+                                             'or backtest_results.csv)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('--verbose', action='store_true', help='Show per-ticker diagnostics')
+    parser.add_argument('--history', default=HISTORY_PATH,
+                        help='Valuation history database to reuse and append to (default: $DCF_HISTORY_PATH '
+                             'or the per-user data directory)')
+    parser.add_argument('--no-history', action='store_true', help='Do not reuse or record valuation history')
+    parser.add_argument('--export', help='Also write every ticker\'s DCF detail, sensitivities and price grid '
+                                         'to one .xlsx, .csv or .parquet export')
+    parser.add_argument('--backtest', action='store_true',
+                        help='Value every ticker as of each historical quarter using only data available then')
+    args = parser.parse_args()
+    try:
+        lookback_length(args.quarters)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tickers = {t.upper() for t in args.tickers}
+    workbooks = discover_workbooks(args.statements_dir, tickers)
+    if not workbooks:
+        print(f"Error: No consolidated workbooks found under {args.statements_dir}")
+        sys.exit(1)
+
+    if args.backtest:
+        print(f"Backtesting {len(workbooks)} tickers from {args.statements_dir}")
+        results = run_backtest(workbooks, load_overrides(args.overrides), args.quarters, args.workers, args.verbose)
+        write_results(results, args.output or 'backtest_results.csv')
+        return
+
+    print(f"Valuing {len(workbooks)} tickers from {args.statements_dir}")
+    history = None if args.no_history else ValuationHistory(args.history)
+    results = run_batch(workbooks, load_overrides(args.overrides), args.quarters, args.workers, args.verbose,
+                        history, args.export)
+    write_results(results, args.output or 'valuation_results.csv')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,66 @@
-import pandas as pd
-import numpy as np
+import time
+import sqlite3
+import argparse
+import threading
 import tkinter as tk
+import numpy as np
 from tkinter import filedialog, ttk, messagebox, StringVar
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import re
-import openpyxl
+
+from virtual_table import VirtualTable
+from scenarios import scenario_path, ticker_from_path, load_scenarios, save_scenarios, evaluate_scenarios
+from background_task import BackgroundTask
+from instrumentation import Timings, timed
+from diagnostics_view import DiagnosticsView
+from valuation_history import ValuationHistory
+from valuation_export import EXPORT_FILETYPES, valuation_tables, export_tables
+from peers import STATISTIC_LABELS, PeerIndex, statements_dir_for, load_peer_groups, blend_parameters
+from valuation_core import (LATEST_QUARTER_KEYS, StatementPanel, HistoricalPanel, LookbackCache, DCFGraph, ValuationCache,
+                            PERCENT_PARAMETERS, SCHEDULE_PARAMETERS, load_statement, select_quarters, file_fingerprint,
+                            parse_schedule, describe_schedule, seasonality_profile, next_quarter, price_grid)
+
+# Pause after the last keystroke before a live recalculation runs
+LIVE_DELAY_MS = 250
+
+# Time a live update may hold the Tk thread before the results tab refresh is deferred to idle time
+LIVE_FRAME_BUDGET_MS = 16
 
 class DCFValuationCalculator:
-    def __init__(self, root):
+    def __init__(self, root, timings=None):
         self.root = root
         self.root.title("DCF Valuation Calculator")
         self.root.geometry("1200x900")
         self.root.minsize(1200, 800)
         
         self.df = None
+        self.file_path = None
+        self.quarter_cols = []
+        self.periods = None
+        self.panel = None
+        self.historical_panel = None
+        self.lookback_cache = None
         self.latest_year_data = {}
         self.forecast_years = 5
+        self.task = None
+        self.results_view = None
+        self.sensitivity_view = None
+        self.live_model = DCFGraph()
+        self.live_after_id = None
+        self.live_render_id = None
+        # Latest live result not yet in the history; it is recorded once editing settles
+        self.live_unrecorded = None
+        self.valuation_cache = ValuationCache()
+        self.history = None
+        # The history is opened lazily from both the Tk thread and worker threads
+        self.history_lock = threading.Lock()
+        self.last_valuation = None
+        self.peer_index = None
+        self.peer_stats = None
+        self.peer_stats_key = None
+        self.peer_task = None
+        self.peer_task_key = None
+        self.scenarios = {}
+        # Stage durations for the Diagnostics tab; debugging output only prints when verbose
+        self.timings = timings or Timings()
         
         self.create_widgets()
     
@@ -56,11 +100,37 @@ class DCFValuationCalculator:
         self.dcf_frame = ttk.Frame(self.notebook, padding=10)
         self.notebook.add(self.dcf_frame, text="DCF Valuation")
         
+        # Sensitivities Tab
+        self.sensitivity_frame = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(self.sensitivity_frame, text="Sensitivities")
+        
+        # Diagnostics Tab
+        self.diagnostics_frame = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(self.diagnostics_frame, text="Diagnostics")
+        self.diagnostics_view = DiagnosticsView(self.diagnostics_frame, self.timings)
+        self.diagnostics_view.pack(fill=tk.BOTH, expand=True)
+        self.notebook.bind("<<NotebookTabChanged>>", self.refresh_diagnostics)
+        self.timings.listeners.append(self.refresh_diagnostics)
+        
         # Calculate button - place it in a separate frame at the bottom
         button_frame = ttk.Frame(main_frame)
         button_frame.pack(fill=tk.X, padx=5, pady=10)
-        self.calculate_button = ttk.Button(button_frame, text="Calculate Valuation", command=self.calculate_valuation)
-        self.calculate_button.pack(padx=5, pady=5)
+        actions_frame = ttk.Frame(button_frame)
+        actions_frame.pack()
+        self.calculate_button = ttk.Button(actions_frame, text="Calculate Valuation", command=self.calculate_valuation)
+        self.calculate_button.pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(actions_frame, text="Calculate Sensitivities",
+                   command=self.calculate_sensitivities).pack(side=tk.LEFT, padx=5, pady=5)
+        
+        # Progress of calculations running in the background
+        progress_frame = ttk.Frame(button_frame)
+        progress_frame.pack(fill=tk.X, padx=5)
+        self.progress_label = ttk.Label(progress_frame, text="", width=40)
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+        self.progress_bar = ttk.Progressbar(progress_frame, mode="determinate", maximum=1.0)
+        self.progress_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cancel_button = ttk.Button(progress_frame, text="Cancel", command=self.cancel_task, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
     
     def create_forecast_inputs(self):
         # Left frame for inputs
@@ -76,12 +146,13 @@ class DCFValuationCalculator:
         
         # Dropdown for selecting number of quarters
         self.quarters_var = tk.StringVar(value="All available data")
-        quarters_options = ["All available data", "4 quarters (1 year)", "8 quarters (2 years)", "12 quarters (3 years)"]
-        quarters_dropdown = ttk.Combobox(date_range_frame, textvariable=self.quarters_var, values=quarters_options, width=20)
-        quarters_dropdown.grid(row=0, column=1, padx=5, pady=5)
+        quarters_options = ["All available data", "4 quarters (1 year)", "8 quarters (2 years)", "12 quarters (3 years)",
+                            "16 quarters (4 years)"]
+        self.quarters_dropdown = ttk.Combobox(date_range_frame, textvariable=self.quarters_var, values=quarters_options, width=20)
+        self.quarters_dropdown.grid(row=0, column=1, padx=5, pady=5)
         
         # Bind the dropdown to update parameters when changed
-        quarters_dropdown.bind("<<ComboboxSelected>>", lambda e: self.recalculate_stats())
+        self.quarters_dropdown.bind("<<ComboboxSelected>>", lambda e: self.recalculate_stats())
         
         # Button to update parameters with selected date range - make it more prominent
         refresh_button = ttk.Button(date_range_frame, text="Refresh Parameters", 
@@ -89,6 +160,28 @@ class DCFValuationCalculator:
                                   style="Accent.TButton")  # Use an accent style for visibility
         refresh_button.grid(row=0, column=2, padx=5, pady=5)
         
+        # Export the cached parameters for every lookback window
+        ttk.Button(date_range_frame, text="Export Window Table",
+                   command=self.export_window_table).grid(row=0, column=3, padx=5, pady=5)
+        
+        # Optionally prefill the ratios from (or blend them with) a peer group's statistics
+        ttk.Label(date_range_frame, text="Peer group:").grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        self.peer_group_var = tk.StringVar(value="None")
+        self.peer_group_dropdown = ttk.Combobox(date_range_frame, textvariable=self.peer_group_var, values=["None"],
+                                                width=20, state="readonly")
+        self.peer_group_dropdown.grid(row=1, column=1, padx=5, pady=5)
+        self.peer_statistic_var = tk.StringVar(value=STATISTIC_LABELS['median'])
+        peer_statistic_dropdown = ttk.Combobox(date_range_frame, textvariable=self.peer_statistic_var,
+                                               values=list(STATISTIC_LABELS.values()), width=16, state="readonly")
+        peer_statistic_dropdown.grid(row=1, column=2, padx=5, pady=5)
+        self.peer_weight_var = tk.StringVar(value="50% peer")
+        peer_weight_dropdown = ttk.Combobox(date_range_frame, textvariable=self.peer_weight_var,
+                                            values=["25% peer", "50% peer", "75% peer", "100% peer"],
+                                            width=10, state="readonly")
+        peer_weight_dropdown.grid(row=1, column=3, padx=5, pady=5)
+        for dropdown in (self.peer_group_dropdown, peer_statistic_dropdown, peer_weight_dropdown):
+            dropdown.bind("<<ComboboxSelected>>", lambda e: self.recalculate_stats())
+        
         # Create an accent button style
         style = ttk.Style()
         if 'Accent.TButton' not in style.theme_names():  # Check if style already exists
@@ -157,6 +250,10 @@ class DCFValuationCalculator:
         self.auto_calc_labels["wc_percent"] = ttk.Label(growth_frame, text="", foreground="green")
         self.auto_calc_labels["wc_percent"].grid(row=5, column=2, sticky="w", padx=5, pady=5)
         
+        # Rates that also accept a per-year schedule
+        ttk.Label(growth_frame, text="Growth, margin, CapEx and WC also accept per-year values (30, 25, 20) or a fade (30>5)",
+                  foreground="gray", wraplength=450).grid(row=6, column=0, columnspan=3, sticky="w", padx=5, pady=(0, 5))
+        
         # DCF parameters
         dcf_frame = ttk.LabelFrame(left_frame, text="DCF Parameters", padding=10)
         dcf_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -203,6 +300,11 @@ class DCFValuationCalculator:
         self.auto_calc_labels["cash_equivalents"] = ttk.Label(dcf_frame, text="", foreground="green")
         self.auto_calc_labels["cash_equivalents"].grid(row=5, column=2, sticky="w", padx=5, pady=5)
         
+        # Quarterly forecast grid using the historical quarter profile
+        self.quarterly_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(dcf_frame, text="Quarterly periods with historical seasonality",
+                        variable=self.quarterly_var).grid(row=6, column=0, columnspan=3, sticky="w", padx=5, pady=5)
+        
         # Add Reverse DCF section
         reverse_dcf_frame = ttk.LabelFrame(left_frame, text="Reverse DCF Calculator", padding=10)
         reverse_dcf_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -232,6 +334,49 @@ class DCFValuationCalculator:
         self.hist_stats = tk.Text(self.stats_frame, height=20, width=40)
         self.hist_stats.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.hist_stats.configure(state='disabled')
+        
+        # Live valuation summary, refreshed while the parameters are edited
+        live_frame = ttk.LabelFrame(right_frame, text="Live Valuation", padding=10)
+        live_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.live_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(live_frame, text="Recalculate as parameters are edited", variable=self.live_var,
+                        command=self.schedule_live_update).pack(anchor="w")
+        self.live_summary = ttk.Label(live_frame, text="", justify=tk.LEFT)
+        self.live_summary.pack(anchor="w", pady=5)
+        
+        # Form entries by parameter name, in the units the form uses
+        self.form_entries = {
+            'base_revenue': self.base_revenue_entry,
+            'revenue_growth': self.revenue_growth,
+            'operating_margin': self.operating_margin,
+            'tax_rate': self.tax_rate,
+            'capex_percent': self.capex_percent,
+            'wc_percent': self.wc_percent,
+            'discount_rate': self.discount_rate,
+            'terminal_growth': self.terminal_growth,
+            'forecast_years': self.forecast_years_entry,
+            'shares_outstanding': self.shares_outstanding,
+            'current_debt': self.current_debt,
+            'cash_equivalents': self.cash_equivalents,
+            'current_share_price': self.current_share_price,
+        }
+        for name, entry in self.form_entries.items():
+            if name != 'current_share_price':
+                entry.bind("<KeyRelease>", self.schedule_live_update, add="+")
+                entry.bind("<FocusOut>", self.record_live_valuation, add="+")
+        
+        # Named scenarios saved per ticker
+        scenario_frame = ttk.LabelFrame(right_frame, text="Scenarios", padding=10)
+        scenario_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Label(scenario_frame, text="Scenario name:").grid(row=0, column=0, sticky="w", padx=5, pady=5)
+        self.scenario_var = tk.StringVar()
+        self.scenario_dropdown = ttk.Combobox(scenario_frame, textvariable=self.scenario_var, values=[], width=20)
+        self.scenario_dropdown.grid(row=0, column=1, columnspan=2, sticky="ew", padx=5, pady=5)
+        ttk.Button(scenario_frame, text="Save", command=self.save_scenario).grid(row=1, column=0, padx=5, pady=5, sticky="ew")
+        ttk.Button(scenario_frame, text="Load", command=self.load_scenario).grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        ttk.Button(scenario_frame, text="Delete", command=self.delete_scenario).grid(row=1, column=2, padx=5, pady=5, sticky="ew")
+        ttk.Button(scenario_frame, text="Evaluate All Scenarios", command=self.evaluate_all_scenarios).grid(
+            row=2, column=0, columnspan=3, padx=5, pady=5, sticky="ew")
     
     def load_file(self):
         file_path = filedialog.askopenfilename(
@@ -239,189 +384,105 @@ class DCFValuationCalculator:
         )
         
         if file_path:
-            try:
-                self.file_label.config(text=file_path)
-                
-                # Check file extension and load accordingly
-                if file_path.endswith(('.xlsx', '.xls')):
-                    # For Excel files, don't specify a header row initially
-                    self.df = pd.read_excel(file_path, header=None)
-                else:
-                    self.df = pd.read_csv(file_path, skipinitialspace=True)
-                
-                # Clean the data
-                self.clean_data()
-                
-                # Display historical data
-                self.display_historical_data()
-                
-                # Calculate and display historical stats
-                self.calculate_historical_stats()
-                
-                # Pre-fill forecast parameters from historical data using all available quarters
-                self.prefill_forecast_parameters(self.quarter_cols)
-                
-                # Initialize quarters dropdown with proper options based on available data
-                if hasattr(self, 'quarter_cols') and len(self.quarter_cols) > 0:
-                    num_quarters = len(self.quarter_cols)
-                    quarters_options = ["All available data"]
-                    
-                    if num_quarters >= 4:
-                        quarters_options.append("4 quarters (1 year)")
-                    if num_quarters >= 8:
-                        quarters_options.append("8 quarters (2 years)")
-                    if num_quarters >= 12:
-                        quarters_options.append("12 quarters (3 years)")
-                    
-                    # Update dropdown options
-                    quarters_dropdown = None
-                    for child in self.forecast_frame.winfo_children():
-                        if isinstance(child, ttk.Frame):
-                            for frame_child in child.winfo_children():
-                                if isinstance(frame_child, ttk.Labelframe) and frame_child.winfo_children():
-                                    for combobox in frame_child.winfo_children():
-                                        if isinstance(combobox, ttk.Combobox):
-                                            quarters_dropdown = combobox
-                                            break
-                    
-                    if quarters_dropdown:
-                        quarters_dropdown['values'] = quarters_options
+            self.open_file(file_path)
+    
+    @timed('load_file')
+    def open_file(self, file_path):
+        try:
+            self.file_label.config(text=file_path)
+            self.file_path = file_path
+            
+            # Scenarios saved for this ticker
+            self.scenarios = load_scenarios(scenario_path(file_path))
+            self.scenario_dropdown['values'] = sorted(self.scenarios)
+            
+            # Peer groups of the statements folder the workbook sits in
+            self.peer_index = None
+            self.peer_stats_key = None
+            self.peer_group_dropdown['values'] = ["None", *load_peer_groups(statements_dir_for(file_path))]
+            
+            # Load the cleaned data, from the workbook's sidecar when it is up to date
+            self.load_data(file_path)
+            
+            # Display historical data
+            self.display_historical_data()
+            
+            # Calculate and display historical stats
+            self.calculate_historical_stats()
+            
+            # Pre-fill forecast parameters from historical data using all available quarters
+            self.prefill_forecast_parameters(self.quarter_cols)
+            
+            # Initialize quarters dropdown with proper options based on available data
+            if hasattr(self, 'quarter_cols') and len(self.quarter_cols) > 0:
+                num_quarters = len(self.quarter_cols)
+                quarters_options = ["All available data"]
                 
-                # Switch to forecast tab
-                self.notebook.select(1)
+                if num_quarters >= 4:
+                    quarters_options.append("4 quarters (1 year)")
+                if num_quarters >= 8:
+                    quarters_options.append("8 quarters (2 years)")
+                if num_quarters >= 12:
+                    quarters_options.append("12 quarters (3 years)")
+                if num_quarters >= 16:
+                    quarters_options.append("16 quarters (4 years)")
                 
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load the file: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                # Update dropdown options
+                self.quarters_dropdown['values'] = quarters_options
+            
+            # Switch to forecast tab
+            self.notebook.select(1)
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load the file: {str(e)}")
+            import traceback
+            traceback.print_exc()
     
-    def clean_data(self):
-        # Skip the first two rows which contain header information and set row 3 (index 2) as column headers
+    @timed('load_data')
+    def load_data(self, file_path):
+        # Detect the header row, index by account and convert values to numbers (or reuse the sidecar)
+        self.df, self.quarter_cols, self.periods = load_statement(file_path)
         if not self.df.empty:
             try:
-                # Find where the quarter headers are (usually row 3, index 2)
-                header_row = None
-                for i in range(5):  # Check first 5 rows
-                    row = self.df.iloc[i]
-                    # Look for cells that might contain quarter formatting like "Q1 2023"
-                    quarter_pattern = [str(cell).strip() for cell in row if isinstance(cell, str) and re.match(r'Q\d 20\d\d', str(cell).strip())]
-                    if quarter_pattern:
-                        header_row = i
-                        break
-                
-                if header_row is None:
-                    header_row = 2  # Default to row 3 (index 2) if no quarter headers found
-                    
-                # Use the identified row as column headers
-                header_data = self.df.iloc[header_row]
-                self.df.columns = [str(x).strip() if isinstance(x, str) else x for x in header_data]
-                
-                # Skip rows up to and including the header row
-                self.df = self.df.iloc[header_row+1:].reset_index(drop=True)
-                
-                # Replace empty strings with NaN
-                self.df = self.df.replace(['', 'nan', 'NaN', 'None'], np.nan)
-                
-                # Find the Account column (first column containing text data)
-                account_col = None
-                for col in self.df.columns:
-                    if self.df[col].dtype == 'object':  # Look for string/object column
-                        account_col = col
-                        break
-                
-                if account_col is None:
-                    account_col = self.df.columns[0]  # Default to first column
-                    
-                # Set the account column as index
-                self.df.set_index(account_col, inplace=True)
-                
-                # Convert numeric columns to float
-                for col in self.df.columns:
-                    try:
-                        self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
-                    except:
-                        pass
-                
-                # Convert quarter column headers to date format if they are in "Q# YYYY" format
-                self.quarter_cols = []
-                for col in self.df.columns:
-                    if isinstance(col, str) and re.match(r'Q\d 20\d\d', col):
-                        self.quarter_cols.append(col)
+                # Build the accounts x periods panel once for all historical statistics
+                self.panel = StatementPanel(self.df, self.periods, self.quarter_cols)
                 
-                # Sort quarter columns chronologically
-                self.quarter_cols = sorted(self.quarter_cols, 
-                                          key=lambda x: (int(re.search(r'20(\d\d)', x).group(1)), 
-                                                         int(re.search(r'Q(\d)', x).group(1))))
+                # Resolved accounts, annual revenue and latest yearly values, shared by the
+                # statistics display, the prefill and every lookback window
+                self.historical_panel = HistoricalPanel(self.panel)
+                self.latest_year_data = dict(self.historical_panel.latest_data)
                 
-                # If we found quarter columns, print diagnostics
-                if self.quarter_cols:
-                    print(f"Found {len(self.quarter_cols)} quarter columns: {self.quarter_cols}")
-                else:
-                    print("Warning: No quarter columns (Q# YYYY format) found in the data")
+                # Precompute parameters for every lookback window so switching windows is a lookup
+                self.lookback_cache = LookbackCache(self.historical_panel)
             
             except Exception as e:
                 messagebox.showerror("Error", f"Error cleaning data: {str(e)}")
                 import traceback
                 traceback.print_exc()
     
+    @timed('render_historical_data')
     def display_historical_data(self):
         # Clear existing widgets
         for widget in self.hist_frame.winfo_children():
             widget.destroy()
         
         if self.df is not None:
-            # Create a treeview for the data
-            tree = ttk.Treeview(self.hist_frame)
-            tree.pack(fill=tk.BOTH, expand=True)
-            
-            # Add vertical scrollbar
-            vsb = ttk.Scrollbar(tree, orient="vertical", command=tree.yview)
-            vsb.pack(side='right', fill='y')
-            tree.configure(yscrollcommand=vsb.set)
-            
-            # Add horizontal scrollbar
-            hsb = ttk.Scrollbar(self.hist_frame, orient="horizontal", command=tree.xview)
-            hsb.pack(side='bottom', fill='x')
-            tree.configure(xscrollcommand=hsb.set)
-            
-            # Define columns
-            df_display = self.df.reset_index()
-            tree["columns"] = list(df_display.columns)
-            
-            # Format columns
-            tree.column("#0", width=0, stretch=tk.NO)
-            for col in df_display.columns:
-                tree.column(col, anchor=tk.W, width=100)
-                tree.heading(col, text=str(col), anchor=tk.W)  # Convert to string in case column name is a date
-            
-            # Add data to treeview
-            for i, row in df_display.iterrows():
-                tree.insert("", i, text="", values=[str(val) if pd.isna(val) else val for val in row])
+            # Virtualized table: only the rows/columns in view are rendered and formatted
+            table = VirtualTable(self.hist_frame, self.df.index, self.df.columns, self.panel.values,
+                                 label_heading=str(self.df.index.name or "Account"))
+            table.pack(fill=tk.BOTH, expand=True)
     
+    @timed('recalculate_stats')
     def recalculate_stats(self, event=None):
         """Recalculate statistics and prefill parameters based on selected date range"""
         if not hasattr(self, 'quarter_cols') or not self.quarter_cols:
             messagebox.showwarning("Warning", "No quarterly data available")
             return
         
-        # Get the selected number of quarters
-        selection = self.quarters_var.get()
-        
-        if selection.startswith("4"):
-            quarters_to_use = min(4, len(self.quarter_cols))
-        elif selection.startswith("8"):
-            quarters_to_use = min(8, len(self.quarter_cols))
-        elif selection.startswith("12"):
-            quarters_to_use = min(12, len(self.quarter_cols))
-        elif selection.startswith("16"):
-            quarters_to_use = min(16, len(self.quarter_cols))
-        else:  # "All"
-            quarters_to_use = len(self.quarter_cols)
-        
         # Store the selected range
-        self.selected_quarters = self.quarter_cols[-quarters_to_use:] if quarters_to_use > 0 else self.quarter_cols
+        self.selected_quarters = select_quarters(self.quarter_cols, self.quarters_var.get())
         
-        print(f"Selected date range: {self.selected_quarters[0]} to {self.selected_quarters[-1]}")
+        self.timings.log(f"Selected date range: {self.selected_quarters[0]} to {self.selected_quarters[-1]}")
         
         # Update historical stats display
         self.calculate_historical_stats(self.selected_quarters)
@@ -432,9 +493,30 @@ class DCFValuationCalculator:
         # Prefill parameters based on the selected range
         self.prefill_forecast_parameters(self.selected_quarters)
     
+    def export_window_table(self):
+        """Save the window-by-window parameter table for the loaded file"""
+        if self.lookback_cache is None:
+            messagebox.showwarning("Warning", "Load a consolidated statement first")
+            return
+        
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV Files", "*.csv"), ("Excel Files", "*.xlsx")]
+        )
+        if file_path:
+            try:
+                table = self.lookback_cache.table()
+                if file_path.endswith('.xlsx'):
+                    table.to_excel(file_path, index=False)
+                else:
+                    table.to_csv(file_path, index=False)
+                messagebox.showinfo("Export Complete", f"Saved {len(table)} windows to {file_path}")
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to export window table: {str(e)}")
+    
     def reset_parameter_fields(self):
         """Reset all parameter fields to ensure they're recalculated from scratch"""
-        print("Resetting all parameter fields for recalculation")
+        self.timings.log("Resetting all parameter fields for recalculation")
         
         # Reset growth parameters
         self.revenue_growth_var.set("")
@@ -447,6 +529,7 @@ class DCFValuationCalculator:
         for label in self.auto_calc_labels.values():
             label.config(text="")
     
+    @timed('prefill_forecast_parameters')
     def prefill_forecast_parameters(self, selected_cols=None):
         """Prefill forecast parameters from historical data"""
         if self.df is not None:
@@ -460,155 +543,102 @@ class DCFValuationCalculator:
                     selected_cols = self.quarter_cols
                     
                 # Show what range is being used
-                quarters_used = f"{selected_cols[0]} to {selected_cols[-1]}" if selected_cols else "No data"
-                print(f"Using data range: {quarters_used} ({len(selected_cols)} quarters)")
-                
-                # Calculate base revenue (annual) from quarterly data
-                if 'Revenue' in self.df.index:
-                    # Calculate average quarterly revenue from selected quarters
-                    quarterly_revenue = []
-                    for col in selected_cols:
-                        try:
-                            value = self.df.loc['Revenue', col]
-                            if pd.notna(value) and value > 0:
-                                quarterly_revenue.append(value)
-                        except Exception as e:
-                            print(f"Error getting revenue for {col}: {str(e)}")
-                            continue
-                    
-                    if quarterly_revenue:
-                        # Get average quarterly revenue and annualize
-                        avg_quarterly_revenue = sum(quarterly_revenue) / len(quarterly_revenue)
-                        annual_revenue = avg_quarterly_revenue * 4
-                        
-                        # Update the base revenue field
-                        self.base_revenue_entry.delete(0, tk.END)
-                        self.base_revenue_entry.insert(0, f"{annual_revenue:.2f}")
-                        self.auto_calc_labels["base_revenue"].config(
-                            text=f"(Calculated from quarterly data, annualized)"
-                        )
-                        print(f"Set base revenue to {annual_revenue:.2f}M (annualized from {len(quarterly_revenue)} quarters)")
-                
-                # Look for "Revenue Y/Y Growth" row in the data
-                growth_rows = ['Revenue Y/Y Growth', 'Revenue Growth Y/Y', 'Revenue Growth YoY', 'Revenue YoY Growth']
-                growth_values = []
-                growth_row_found = False
-                
-                print("Searching for Revenue Growth rows")
-                for growth_row in growth_rows:
-                    if growth_row in self.df.index:
-                        growth_row_found = True
-                        print(f"Found '{growth_row}' in the spreadsheet, using these values")
-                        for col in selected_cols:
-                            try:
-                                growth_value = self.df.loc[growth_row, col]
-                                # Check if it's a percentage (could be formatted as decimal or percentage)
-                                if pd.notna(growth_value):
-                                    # If it's likely a decimal (e.g. 0.05 for 5%), convert to percentage
-                                    if -1 < growth_value < 1:
-                                        growth_value = growth_value * 100
-                                    growth_values.append(growth_value)
-                                    print(f"Found growth value for {col}: {growth_value:.2f}%")
-                            except Exception as e:
-                                print(f"Error getting growth for {col}: {str(e)}")
-                                continue
-                        break
-                
-                if growth_values:
-                    # Use the average of existing growth values 
-                    avg_growth = sum(growth_values) / len(growth_values)
-                    self.revenue_growth_var.set(f"{avg_growth:.2f}")
-                    
-                    # Format growth values for display
-                    growth_text = f"(Avg from {len(growth_values)} values in selected range)"
-                    self.auto_calc_labels["revenue_growth"].config(text=growth_text)
-                    print(f"Updated revenue growth to {avg_growth:.2f}% from {len(growth_values)} existing growth values")
-                    
-                elif not growth_row_found:
-                    # Fall back to calculated growth if no growth row found
-                    print("No 'Revenue Y/Y Growth' row found in the data, calculating from revenue values")
-                    self.calculate_revenue_growth(selected_cols)
-                else:
-                    print("Growth row found but no valid values in selected range")
-                    self.calculate_revenue_growth(selected_cols)
-                
-                # Operating Margin - Use all selected columns, not just the last 4
-                if 'Operating Income' in self.df.index and 'Revenue' in self.df.index and len(selected_cols) >= 1:
-                    # Calculate average operating margin across all selected quarters
-                    margins = []
-                    for col in selected_cols:  # Use all selected columns
-                        try:
-                            op_income = self.df.loc['Operating Income', col]
-                            revenue = self.df.loc['Revenue', col]
-                            if pd.notna(op_income) and pd.notna(revenue) and revenue > 0:
-                                margin = (op_income / revenue) * 100
-                                margins.append(margin)
-                        except Exception as e:
-                            print(f"Error calculating margin for {col}: {str(e)}")
-                            continue
-                    
-                    if margins:
-                        avg_margin = sum(margins) / len(margins)
-                        self.operating_margin.delete(0, tk.END)
-                        self.operating_margin.insert(0, f"{avg_margin:.2f}")
-                        self.auto_calc_labels["operating_margin"].config(
-                            text=f"(Avg from {len(margins)} quarters in range {quarters_used})"
-                        )
-                
-                # Tax Rate - Use all selected columns, not just the last 4
-                if 'Income Taxes' in self.df.index and 'Pretax Income' in self.df.index and len(selected_cols) >= 1:
-                    # Calculate average tax rate across all selected quarters
-                    rates = []
-                    for col in selected_cols:  # Use all selected columns
-                        try:
-                            tax = self.df.loc['Income Taxes', col]
-                            pretax = self.df.loc['Pretax Income', col]
-                            if pd.notna(tax) and pd.notna(pretax) and pretax > 0:
-                                rate = (tax / pretax) * 100
-                                rates.append(rate)
-                        except Exception as e:
-                            print(f"Error calculating tax rate for {col}: {str(e)}")
-                            continue
-                    
-                    if rates:
-                        avg_tax_rate = sum(rates) / len(rates)
-                        self.tax_rate.delete(0, tk.END)
-                        self.tax_rate.insert(0, f"{avg_tax_rate:.2f}")
-                        self.auto_calc_labels["tax_rate"].config(
-                            text=f"(Avg from {len(rates)} quarters in range {quarters_used})"
-                        )
-                
-                # First, populate the latest_year_data dictionary with yearly data
-                try:
-                    self.update_latest_financial_data(selected_cols)
-                    print("Successfully updated latest financial data from yearly columns")
-                except Exception as e:
-                    print(f"Error updating latest financial data: {str(e)}")
-                
-                # Then update CapEx and Working Capital calculations
-                try:
-                    self.calculate_capex_wc_from_selected_quarters(selected_cols)
-                    print("Successfully calculated CapEx and Working Capital values")
-                except Exception as e:
-                    print(f"Error calculating CapEx and Working Capital: {str(e)}")
-                
-                # Set the base revenue from the most recent yearly value if available
-                if self.latest_year_data.get('Revenue'):
-                    base_revenue = self.latest_year_data['Revenue']
-                    self.base_revenue_entry.delete(0, tk.END)
-                    self.base_revenue_entry.insert(0, f"{base_revenue:.1f}")
-                    self.auto_calc_labels["base_revenue"].config(
-                        text=f"(From latest yearly data)"
-                    )
-                    print(f"Set base revenue to {base_revenue:.1f}M from yearly data")
-                else:
-                    print("No yearly revenue data found to prefill base revenue")
+                self.timings.log(f"Using data range: {selected_cols[0]} to {selected_cols[-1]} ({len(selected_cols)} quarters)")
+                
+                entry = self.lookback_cache.get(selected_cols)
+                params, notes = entry['params'], entry['notes']
+                peer_stats = self.current_peer_statistics()
+                if peer_stats is not None:
+                    weight = float(self.peer_weight_var.get().split('%')[0]) / 100
+                    statistic = next(key for key, label in STATISTIC_LABELS.items()
+                                     if label == self.peer_statistic_var.get())
+                    params, notes = blend_parameters(params, notes, peer_stats, weight, statistic)
+                self.apply_forecast_parameters(params, notes)
             
             except Exception as e:
                 messagebox.showwarning("Warning", f"Error pre-filling parameters: {str(e)}")
                 import traceback
                 traceback.print_exc()
     
+    def peer_statistics_key(self):
+        """The workbook, peer group and lookback the peer statistics depend on, or None without a group"""
+        group = self.peer_group_var.get()
+        if group == "None" or not self.file_path:
+            return None
+        return self.file_path, group, self.quarters_var.get()
+    
+    def current_peer_statistics(self):
+        """Statistics of the selected peer group, or None while none is selected or they are loading"""
+        key = self.peer_statistics_key()
+        if key is None:
+            return None
+        if self.peer_stats_key == key:
+            return self.peer_stats
+        self.load_peer_statistics(key)
+        return None
+    
+    def load_peer_statistics(self, key):
+        """Fetch peer statistics from the peer index in the background, then prefill again.
+        
+        The load runs on its own task so it never cancels a valuation in progress; results for
+        a workbook, group or lookback that is no longer selected are dropped.
+        """
+        if self.peer_task is not None and self.peer_task.running:
+            if self.peer_task_key == key:
+                return
+            self.peer_task.cancel()
+        if self.peer_index is None:
+            self.peer_index = PeerIndex(statements_dir_for(self.file_path))
+        peer_index = self.peer_index
+        file_path, group, quarters = key
+        ticker = ticker_from_path(file_path)
+        
+        def loaded(stats):
+            if key != self.peer_statistics_key():
+                return
+            self.peer_stats, self.peer_stats_key = stats, key
+            self.timings.log(f"Peer statistics for {group} ({len(stats['peers'])} tickers)")
+            self.prefill_forecast_parameters(select_quarters(self.quarter_cols, quarters))
+        
+        def failed(e):
+            if key == self.peer_statistics_key():
+                messagebox.showerror("Error", f"Failed to load peer statistics: {str(e)}")
+        
+        def evaluate(progress, cancelled):
+            with self.timings.span('peer_statistics', group=group):
+                return peer_index.statistics(group, quarters, exclude=ticker)
+        
+        self.peer_task_key = key
+        self.peer_task = BackgroundTask(self.root, evaluate, on_done=loaded, on_error=failed).start()
+    
+    def apply_forecast_parameters(self, params, notes):
+        """Write derived forecast parameters into the form and note where each came from"""
+        entries = {
+            'base_revenue': self.base_revenue_entry,
+            'operating_margin': self.operating_margin,
+            'tax_rate': self.tax_rate,
+            'capex_percent': self.capex_percent,
+            'wc_percent': self.wc_percent,
+            'shares_outstanding': self.shares_outstanding,
+            'current_debt': self.current_debt,
+            'cash_equivalents': self.cash_equivalents,
+        }
+        for name, value in params.items():
+            # Yearly base revenue and cash keep one decimal, everything else two
+            one_decimal = name == 'cash_equivalents' or notes.get(name) == "(From latest yearly data)"
+            text = f"{value:.1f}" if one_decimal else f"{value:.2f}"
+            if name == 'revenue_growth':
+                self.revenue_growth_var.set(text)
+            elif name in entries:
+                entries[name].delete(0, tk.END)
+                entries[name].insert(0, text)
+            else:
+                continue
+            if name in notes:
+                self.auto_calc_labels[name].config(text=notes[name])
+            self.timings.log(f"Set {name} to {text} {notes.get(name, '')}")
+    
+    @timed('calculate_historical_stats')
     def calculate_historical_stats(self, selected_cols=None):
         if self.df is None:
             return
@@ -641,145 +671,54 @@ class DCFValuationCalculator:
             # Store latest quarter
             self.latest_quarter = latest_cols[-1] if latest_cols else None
             
-            # Check if we have revenue data
-            if 'Revenue' in self.df.index:
-                # Group revenue data by year - ALWAYS use ALL available quarters for annual revenue data
-                revenue_data = {}
-                all_quarters = self.quarter_cols  # Use all quarters regardless of selection
-                
-                for col in all_quarters:
-                    try:
-                        value = self.df.loc['Revenue', col]
-                        if pd.notna(value):
-                            # Extract year and quarter
-                            year_match = re.search(r'20(\d\d)', col)
-                            quarter_match = re.search(r'Q(\d)', col)
-                            if year_match and quarter_match:
-                                year = int("20" + year_match.group(1))
-                                quarter = int(quarter_match.group(1))
-                                
-                                # Initialize year in dictionary if not exists
-                                if year not in revenue_data:
-                                    revenue_data[year] = {}
-                                    
-                                # Store revenue for this quarter
-                                revenue_data[year][quarter] = value
-                    except Exception as e:
-                        print(f"Error processing {col}: {str(e)}")
-                
-                # Calculate annual revenue by summing quarters for each year
-                annual_revenue = {}
-                for year, quarters in revenue_data.items():
-                    # Only include years with all 4 quarters
-                    if len(quarters) == 4:
-                        annual_revenue[year] = sum(quarters.values())
-                
-                # Calculate year-over-year growth rates
-                years = sorted(annual_revenue.keys())
+            stats = self.lookback_cache.get(latest_cols)['stats']
+            historical = self.historical_panel
+            
+            # Annual revenue and year-over-year growth (always from ALL available quarters)
+            if 'Revenue' in historical:
+                years = historical.years.tolist()
                 if len(years) >= 2:
-                    growth_rates = []
-                    for i in range(1, len(years)):
-                        prev_year = years[i-1]
-                        curr_year = years[i]
-                        if annual_revenue[prev_year] > 0:
-                            growth_rate = (annual_revenue[curr_year] / annual_revenue[prev_year] - 1) * 100
-                            growth_rates.append(growth_rate)
-                    
-                    if growth_rates:
+                    if historical.avg_growth is not None:
                         # Display each year's revenue and growth
                         self.hist_stats.insert(tk.END, "Annual Revenue:\n")
                         for i, year in enumerate(years):
-                            self.hist_stats.insert(tk.END, f"{year}: ${annual_revenue[year]:.2f}M")
+                            self.hist_stats.insert(tk.END, f"{year}: ${historical.annual_revenue[i]:.2f}M")
                             if i > 0:
-                                growth = (annual_revenue[year] / annual_revenue[years[i-1]] - 1) * 100
-                                self.hist_stats.insert(tk.END, f" (YoY: {growth:.2f}%)")
+                                self.hist_stats.insert(tk.END, f" (YoY: {historical.growth_rates[i-1]:.2f}%)")
                             self.hist_stats.insert(tk.END, "\n")
                         
                         # Display average annual growth rate
-                        avg_growth = np.mean(growth_rates)
-                        self.hist_stats.insert(tk.END, f"\nAverage Annual Revenue Growth: {avg_growth:.2f}%\n\n")
+                        self.hist_stats.insert(tk.END, f"\nAverage Annual Revenue Growth: {historical.avg_growth:.2f}%\n\n")
                         
                         # Always update the revenue growth info box with ALL years' data
-                        self.update_revenue_growth_info(years, annual_revenue)
+                        self.update_revenue_growth_info(years, dict(zip(years, historical.annual_revenue)))
                 else:
                     self.hist_stats.insert(tk.END, "Insufficient complete years for Revenue Growth calculation\n\n")
             else:
                 self.hist_stats.insert(tk.END, "Revenue data not found\n\n")
             
-            # Calculate average operating margin
-            if 'Operating Income' in self.df.index and 'Revenue' in self.df.index:
-                operating_income = self.df.loc['Operating Income', latest_cols].dropna()
-                revenue = self.df.loc['Revenue', latest_cols].dropna()
-                
-                # Match indices
-                common_cols = operating_income.index.intersection(revenue.index)
-                operating_income = operating_income[common_cols]
-                revenue = revenue[common_cols]
-                
-                if len(operating_income) > 0 and len(revenue) > 0:
-                    margins = (operating_income / revenue) * 100
-                    avg_margin = np.mean(margins)
-                    self.hist_stats.insert(tk.END, f"Average Operating Margin: {avg_margin:.2f}%\n\n")
+            # Average operating margin
+            if 'Operating Income' in historical and 'Revenue' in historical:
+                if stats['avg_margin'] is not None:
+                    self.hist_stats.insert(tk.END, f"Average Operating Margin: {stats['avg_margin']:.2f}%\n\n")
                 else:
                     self.hist_stats.insert(tk.END, "Insufficient data for Operating Margin calculation\n\n")
             else:
                 self.hist_stats.insert(tk.END, "Operating Income or Revenue data not found\n\n")
             
-            # Calculate average tax rate
-            if 'Income Taxes' in self.df.index and 'Pretax Income' in self.df.index:
-                taxes = self.df.loc['Income Taxes', latest_cols].dropna()
-                pretax = self.df.loc['Pretax Income', latest_cols].dropna()
-                
-                # Match indices
-                common_cols = taxes.index.intersection(pretax.index)
-                taxes = taxes[common_cols]
-                pretax = pretax[common_cols]
-                
-                if len(taxes) > 0 and len(pretax) > 0:
-                    rates = (taxes / pretax) * 100
-                    avg_tax_rate = np.mean(rates)
-                    self.hist_stats.insert(tk.END, f"Average Tax Rate: {avg_tax_rate:.2f}%\n\n")
+            # Average tax rate
+            if 'Income Taxes' in historical and 'Pretax Income' in historical:
+                if stats['avg_tax_rate'] is not None:
+                    self.hist_stats.insert(tk.END, f"Average Tax Rate: {stats['avg_tax_rate']:.2f}%\n\n")
                 else:
                     self.hist_stats.insert(tk.END, "Insufficient data for Tax Rate calculation\n\n")
             else:
                 self.hist_stats.insert(tk.END, "Income Taxes or Pretax Income data not found\n\n")
             
-            # Store latest financial data
-            self.latest_year_data = {}
-            
-            # Define financial keys with alternative names
-            financial_keys = {
-                'Revenue': ['Revenue'],
-                'Operating Income': ['Operating Income'],
-                'Income Taxes': ['Income Taxes'],
-                'Pretax Income': ['Pretax Income'],
-                'Current Assets': ['Current Assets'],
-                'Current Liabilities': ['Current Liabilities'],
-                'Cash & Equivalents': ['Cash & Equivalents', 'Cash and Equivalents', 'Cash and Cash Equivalents'],
-                'Long Term Debt': ['Long Term Debt', 'Long-Term Debt'],
-                'Short Term Debt': ['Short Term Debt', 'Short-Term Debt'],
-                'Purchase of PP&E': ['Purchase of PP&E', 'CapEx', 'Capital Expenditure', 'Purchase of Investment', 'Acquisitions']
-            }
-            
-            # Helper function to find most recent non-NaN value with alternative keys
-            def find_most_recent_value(key_list):
-                for key in key_list:
-                    if key in self.df.index:
-                        # Try to find a non-NaN value starting from the most recent quarter
-                        for col in reversed(latest_cols):
-                            try:
-                                value = self.df.loc[key, col]
-                                if pd.notna(value) and value != 'nan' and value != 'NaN':
-                                    return value, key
-                            except:
-                                continue
-                return None, None
-            
-            # Get most recent values for each financial key group
-            for primary_key, alt_keys in financial_keys.items():
-                value, found_key = find_most_recent_value(alt_keys)
-                if value is not None:
-                    self.latest_year_data[primary_key] = value
+            # Latest quarterly values in the window (base revenue and the prefill use the yearly ones)
+            for primary_key in LATEST_QUARTER_KEYS:
+                if primary_key in stats['latest']:
+                    value, found_key = stats['latest'][primary_key]
                     self.hist_stats.insert(tk.END, f"Latest {primary_key}: {value:.2f} (from '{found_key}')\n")
                 else:
                     self.hist_stats.insert(tk.END, f"No valid data found for {primary_key}\n")
@@ -813,459 +752,99 @@ class DCFValuationCalculator:
         # Disable text widget
         self.revenue_growth_info.config(state=tk.DISABLED)
     
-    def calculate_revenue_growth(self, selected_cols):
-        """Calculate revenue growth from revenue values when Revenue Y/Y Growth is not available"""
-        print("Calculating revenue growth from raw revenue values...")
-        
-        # Try to get direct quarterly growth first
-        if 'Revenue' in self.df.index and len(selected_cols) >= 2:  # Need at least 2 quarters for QoQ
-            # Get revenue data for the selected quarters
-            quarterly_growth_rates = []
-            
-            # Calculate quarter-over-quarter growth
-            for i in range(1, len(selected_cols)):
-                try:
-                    current_revenue = self.df.loc['Revenue', selected_cols[i]]
-                    prev_revenue = self.df.loc['Revenue', selected_cols[i-1]]
-                    
-                    if pd.notna(current_revenue) and pd.notna(prev_revenue) and prev_revenue > 0:
-                        # Get the quarter numbers to check if we're comparing same quarters from different years
-                        current_quarter_match = re.search(r'Q(\d)', selected_cols[i])
-                        prev_quarter_match = re.search(r'Q(\d)', selected_cols[i-1])
-                        
-                        if current_quarter_match and prev_quarter_match:
-                            current_quarter = int(current_quarter_match.group(1))
-                            prev_quarter = int(prev_quarter_match.group(1))
-                            
-                            current_year_match = re.search(r'20(\d\d)', selected_cols[i])
-                            prev_year_match = re.search(r'20(\d\d)', selected_cols[i-1])
-                            
-                            if current_year_match and prev_year_match:
-                                current_year = int("20" + current_year_match.group(1))
-                                prev_year = int("20" + prev_year_match.group(1))
-                                
-                                # If same quarter of different years (e.g., Q1 2022 vs Q1 2023)
-                                if current_quarter == prev_quarter and current_year > prev_year:
-                                    growth_rate = ((current_revenue / prev_revenue) - 1) * 100
-                                    quarterly_growth_rates.append((growth_rate, f"Q{current_quarter} {prev_year}-{current_year}"))
-                                    print(f"Found YoY growth for {selected_cols[i]} vs {selected_cols[i-1]}: {growth_rate:.2f}%")
-                    
-                except Exception as e:
-                    print(f"Error calculating YoY growth for {selected_cols[i]}: {str(e)}")
-            
-            # If we have at least one quarter-over-quarter growth rate from the same quarter in different years
-            if quarterly_growth_rates:
-                # Calculate average growth rate
-                avg_growth = sum(rate for rate, _ in quarterly_growth_rates) / len(quarterly_growth_rates)
-                self.revenue_growth_var.set(f"{avg_growth:.2f}")
-                
-                # Format for display
-                growth_text = ", ".join([f"{period}: {rate:.2f}%" for rate, period in quarterly_growth_rates])
-                self.auto_calc_labels["revenue_growth"].config(
-                    text=f"(Avg from quarterly YoY: {avg_growth:.2f}%)"
-                )
-                print(f"Set revenue growth to {avg_growth:.2f}% from quarterly YoY comparisons")
-                return
-        
-        # If quarterly comparison didn't work, fall back to annual comparison
-        if 'Revenue' in self.df.index:
-            # Get revenue data for ALL quarters (not just selected) to build complete years
-            revenue_data = {}
-            for col in self.quarter_cols:  # Use all available quarters to build complete years
+    def valuation_context(self):
+        """Cache context for the loaded file and the selected lookback window"""
+        fingerprint = file_fingerprint(self.file_path) if self.file_path else None
+        return fingerprint, tuple(select_quarters(self.quarter_cols, self.quarters_var.get()))
+    
+    def open_history(self):
+        """The shared valuation history database, or None if it cannot be opened"""
+        with self.history_lock:
+            if self.history is None:
                 try:
-                    value = self.df.loc['Revenue', col]
-                    if pd.notna(value):
-                        # Extract year and quarter
-                        year_match = re.search(r'20(\d\d)', col)
-                        quarter_match = re.search(r'Q(\d)', col)
-                        if year_match and quarter_match:
-                            year = int("20" + year_match.group(1))
-                            quarter = int(quarter_match.group(1))
-                            
-                            # Initialize year in dictionary if not exists
-                            if year not in revenue_data:
-                                revenue_data[year] = {}
-                                
-                            # Store revenue for this quarter
-                            revenue_data[year][quarter] = value
-                except Exception as e:
-                    print(f"Error processing {col}: {str(e)}")
-            
-            # Calculate annual revenue by summing quarters for each year
-            annual_revenue = {}
-            for year, quarters in revenue_data.items():
-                # Only include years with all 4 quarters
-                if len(quarters) == 4:
-                    annual_revenue[year] = sum(quarters.values())
-            
-            # Sort years and calculate growth rates
-            years = sorted(annual_revenue.keys())
-            if len(years) >= 2:
-                # Calculate all year-over-year growth rates
-                growth_rates = []
-                for i in range(1, len(years)):
-                    prev_year = years[i-1]
-                    curr_year = years[i]
-                    if annual_revenue[prev_year] > 0:
-                        growth_rate = ((annual_revenue[curr_year] / annual_revenue[prev_year]) - 1) * 100
-                        growth_rates.append((growth_rate, f"{prev_year}-{curr_year}"))
-                
-                if growth_rates:
-                    # Use the most recent growth rate as default
-                    most_recent_growth = growth_rates[-1][0]
-                    self.revenue_growth_var.set(f"{most_recent_growth:.2f}")
-                    
-                    # Average of all growth rates as fallback
-                    if len(growth_rates) > 1:
-                        avg_growth = sum(rate for rate, _ in growth_rates) / len(growth_rates)
-                    else:
-                        avg_growth = most_recent_growth
-                    
-                    # Format for display
-                    growth_text = ", ".join([f"{period}: {rate:.2f}%" for rate, period in growth_rates])
-                    self.auto_calc_labels["revenue_growth"].config(
-                        text=f"(Using most recent: {most_recent_growth:.2f}%)"
-                    )
-                    print(f"Set revenue growth to {most_recent_growth:.2f}% (most recent annual)")
-                    return
-            
-            # If we still don't have anything, use a default growth rate
-            print("Warning: No complete years for annual growth calculation, using default growth rate")
-            self.revenue_growth_var.set("5.00")
-            self.auto_calc_labels["revenue_growth"].config(
-                text="(Default value - no historical data available)"
-            )
+                    self.history = ValuationHistory()
+                except (sqlite3.Error, OSError) as e:
+                    self.timings.log(f"Valuation history unavailable: {e}")
+            return self.history
     
-    def calculate_capex_wc_from_selected_quarters(self, selected_cols):
-        """Calculate CapEx and Working Capital percentages from selected quarters"""
-        if not selected_cols or len(selected_cols) < 1:
+    def record_valuation(self, kind, inputs, outputs):
+        """Append a finished valuation to the history; a history failure never blocks the result"""
+        history = self.open_history()
+        if history is None:
             return
-        
-        # Extract years from the selected date range
-        selected_years = set()
-        for col in selected_cols:
-            if isinstance(col, str) and re.match(r'Q\d 20\d\d', col):
-                year_match = re.search(r'20(\d\d)', col)
-                if year_match:
-                    year = int("20" + year_match.group(1))
-                    selected_years.add(year)
-        
-        print(f"Extracted years from selected date range: {sorted(selected_years)}")
-        
-        # Identify all yearly columns
-        all_yearly_cols = []
-        for col in self.df.columns:
-            if isinstance(col, str):
-                # Try different yearly formats: "FY20XX", "FY XX", "FY XX-XX", etc.
-                if col.startswith('FY'):
-                    all_yearly_cols.append(col)
-                    year_str = col.replace('FY', '').strip()
-                    # Try to extract a year if available
-                    if re.match(r'20\d\d', year_str):
-                        print(f"Found yearly column: {col} (format: FY20XX)")
-                    elif re.match(r'\d\d', year_str):
-                        print(f"Found yearly column: {col} (format: FY XX)")
-                    else:
-                        print(f"Found yearly column: {col} (other format)")
-        
-        print(f"All yearly columns found: {all_yearly_cols}")
-        
-        # Filter yearly columns to match selected years
-        yearly_cols = []
-        for col in all_yearly_cols:
-            # Try to extract a year from the column name
-            if isinstance(col, str):
-                # Try different formats
-                fy_year = None
-                
-                # Format: "FY20XX"
-                fy_year_match = re.search(r'FY\s*20(\d\d)', col)
-                if fy_year_match:
-                    fy_year = int("20" + fy_year_match.group(1))
-                
-                # Format: "FY XX"
-                if not fy_year:
-                    fy_year_match = re.search(r'FY\s*(\d\d)', col)
-                    if fy_year_match:
-                        fy_year = int("20" + fy_year_match.group(1))
-                
-                # If we found a year and it's in our selected years, add it
-                if fy_year and fy_year in selected_years:
-                    yearly_cols.append(col)
-                    print(f"Including yearly column {col} (year: {fy_year})")
-        
-        # If no columns matched our specific years, try to use the most recent years
-        if not yearly_cols and selected_years and all_yearly_cols:
-            # If we're looking at a specific year, prioritize that year
-            target_year = max(selected_years)
-            print(f"No exact year matches, looking for FY {target_year}")
-            
-            # Try to find exact matches first
-            for col in all_yearly_cols:
-                if f"{target_year}" in col:
-                    yearly_cols.append(col)
-                    print(f"Adding column {col} as it contains the target year {target_year}")
-            
-            # If still no matches, use the most recent years (up to 3)
-            if not yearly_cols:
-                print(f"No columns found for target year {target_year}, using most recent years")
-                # Sort yearly columns by year if possible
-                year_cols = []
-                for col in all_yearly_cols:
-                    year_match = re.search(r'20(\d\d)', col)
-                    if year_match:
-                        year = int("20" + year_match.group(1))
-                        year_cols.append((year, col))
-                if year_cols:
-                    year_cols.sort(reverse=True)  # Sort by year descending
-                    for i, (year, col) in enumerate(year_cols[:3]):  # Take up to 3 most recent
-                        yearly_cols.append(col)
-                        print(f"Using recent yearly column: {col} (year: {year})")
-                else:
-                    # If we can't extract years, just use the last 3 columns
-                    yearly_cols = all_yearly_cols[-3:] if len(all_yearly_cols) > 3 else all_yearly_cols
-                    print(f"Using last {len(yearly_cols)} yearly columns: {yearly_cols}")
-        
-        if not yearly_cols:
-            print("No yearly columns found for Working Capital calculation in the selected date range")
-            # Try to use the quarterly data if no yearly data is available
-            print("Attempting to use quarterly data for Working Capital calculation")
-            self.calculate_wc_from_quarterly_data(selected_cols)
-        else:
-            print(f"Found {len(yearly_cols)} yearly columns for WC calculation: {yearly_cols}")
-            self.calculate_wc_from_yearly_data(yearly_cols)
-        
-        # CapEx calculation from all selected quarters
-        self.calculate_capex(selected_cols)
+        ticker = ticker_from_path(self.file_path) if self.file_path else None
+        try:
+            fingerprint = file_fingerprint(self.file_path) if self.file_path else None
+            history.record(ticker, kind, inputs, outputs, fingerprint)
+        except (sqlite3.Error, OSError) as e:
+            self.timings.log(f"Could not record valuation history: {e}")
     
-    def calculate_capex(self, selected_cols):
-        """Calculate CapEx from selected quarters"""
-        quarters_used = f"{selected_cols[0]} to {selected_cols[-1]}" if selected_cols else "No data"
-        print(f"Calculating CapEx from quarters: {quarters_used}")
-        
-        capex_ratios = []
-        capex_keys = ['Purchase of PP&E', 'CapEx', 'Capital Expenditure', 'Capital Expenditures',
-                     'Purchase of Investment', 'Acquisitions']
-        
-        # Try each possible CapEx key
-        for capex_field in capex_keys:
-            if capex_field in self.df.index:
-                for col in selected_cols:
-                    try:
-                        capex = self.df.loc[capex_field, col]
-                        revenue = self.df.loc['Revenue', col]
-                        if pd.notna(capex) and pd.notna(revenue) and revenue > 0:
-                            # Use absolute value since CapEx is often negative in cash flow statements
-                            capex_ratio = (abs(capex) / revenue) * 100
-                            capex_ratios.append(capex_ratio)
-                            print(f"Found CapEx for {col}: {capex} / {revenue} = {capex_ratio:.2f}%")
-                    except Exception as e:
-                        print(f"Error calculating CapEx ratio for {col} with field {capex_field}: {str(e)}")
-                        continue
-                
-                # If we found values with this field, no need to check other fields
-                if capex_ratios:
-                    break
-                
-        if capex_ratios:
-            avg_capex_ratio = sum(capex_ratios) / len(capex_ratios)
-            self.capex_percent.delete(0, tk.END)
-            self.capex_percent.insert(0, f"{avg_capex_ratio:.2f}")
-            self.auto_calc_labels["capex_percent"].config(
-                text=f"(Avg from {len(capex_ratios)} quarters in range {quarters_used})"
-            )
-            print(f"Updated CapEx to {avg_capex_ratio:.2f}% from {len(capex_ratios)} quarters")
-        else:
-            print("No CapEx data found in the selected range")
+    def stored_valuation(self, kind, inputs, compute):
+        """Reuse a stored result for identical inputs, otherwise compute and record it (worker thread)"""
+        history = self.open_history()
+        try:
+            stored = history.find(kind, inputs) if history is not None else None
+        except sqlite3.Error as e:
+            self.timings.log(f"Could not read valuation history: {e}")
+            stored = None
+        if stored is not None:
+            self.timings.log(f"Reusing stored {kind} result")
+            return stored
+        outputs = compute()
+        self.record_valuation(kind, inputs, outputs)
+        return outputs
     
-    def calculate_wc_from_yearly_data(self, yearly_cols):
-        """Calculate Working Capital from yearly data"""
-        print(f"Calculating Working Capital from {len(yearly_cols)} yearly columns")
-        wc_ratios = []
-        
-        # Try different combinations of asset/liability fields
-        asset_fields = ['Current Assets', 'Total Current Assets']
-        liability_fields = ['Current Liabilities', 'Total Current Liabilities']
-        
-        for asset_field in asset_fields:
-            for liability_field in liability_fields:
-                if asset_field in self.df.index and liability_field in self.df.index and 'Revenue' in self.df.index:
-                    for col in yearly_cols:  # Only use yearly columns from the filtered list
-                        try:
-                            current_assets = self.df.loc[asset_field, col]
-                            current_liabilities = self.df.loc[liability_field, col]
-                            revenue = self.df.loc['Revenue', col]
-                            
-                            if (pd.notna(current_assets) and pd.notna(current_liabilities) and 
-                                pd.notna(revenue) and revenue > 0):
-                                wc = current_assets - current_liabilities
-                                wc_ratio = (wc / revenue) * 100
-                                wc_ratios.append(wc_ratio)
-                                print(f"Found WC for {col}: ({current_assets} - {current_liabilities}) / {revenue} = {wc_ratio:.2f}%")
-                        except Exception as e:
-                            print(f"Error calculating WC ratio for {col}: {str(e)}")
-                            continue
-                    
-                    # If we found values with this combination, no need to check others
-                    if wc_ratios:
-                        break
-                
-                # Break out of outer loop too if we found values
-                if wc_ratios:
-                    break
-                
-        if wc_ratios:
-            avg_wc_ratio = sum(wc_ratios) / len(wc_ratios)
-            self.wc_percent.delete(0, tk.END)
-            self.wc_percent.insert(0, f"{avg_wc_ratio:.2f}")
-            self.auto_calc_labels["wc_percent"].config(
-                text=f"(Avg from {len(wc_ratios)} yearly periods)"
-            )
-            print(f"Updated Working Capital to {avg_wc_ratio:.2f}% from {len(wc_ratios)} yearly periods")
-        else:
-            print("Could not calculate Working Capital percentage - no valid yearly data found")
-            
-    def calculate_wc_from_quarterly_data(self, selected_cols):
-        """Fall back to calculating Working Capital from quarterly data if no yearly data is available"""
-        print("Calculating Working Capital from quarterly data as fallback")
-        wc_ratios = []
-        
-        # Try different combinations of asset/liability fields
-        asset_fields = ['Current Assets', 'Total Current Assets']
-        liability_fields = ['Current Liabilities', 'Total Current Liabilities']
-        
-        for asset_field in asset_fields:
-            for liability_field in liability_fields:
-                if asset_field in self.df.index and liability_field in self.df.index and 'Revenue' in self.df.index:
-                    for col in selected_cols:
-                        try:
-                            current_assets = self.df.loc[asset_field, col]
-                            current_liabilities = self.df.loc[liability_field, col]
-                            revenue = self.df.loc['Revenue', col]
-                            
-                            if (pd.notna(current_assets) and pd.notna(current_liabilities) and 
-                                pd.notna(revenue) and revenue > 0):
-                                wc = current_assets - current_liabilities
-                                wc_ratio = (wc / revenue) * 100
-                                wc_ratios.append(wc_ratio)
-                                print(f"Found WC for {col}: ({current_assets} - {current_liabilities}) / {revenue} = {wc_ratio:.2f}%")
-                        except Exception as e:
-                            print(f"Error calculating WC ratio for {col}: {str(e)}")
-                            continue
-                    
-                    # If we found values with this combination, no need to check others
-                    if wc_ratios:
-                        break
-                
-                # Break out of outer loop too if we found values
-                if wc_ratios:
-                    break
-                
-        if wc_ratios:
-            avg_wc_ratio = sum(wc_ratios) / len(wc_ratios)
-            self.wc_percent.delete(0, tk.END)
-            self.wc_percent.insert(0, f"{avg_wc_ratio:.2f}")
-            self.auto_calc_labels["wc_percent"].config(
-                text=f"(Avg from {len(wc_ratios)} quarterly periods - no yearly data available)"
-            )
-            print(f"Updated Working Capital to {avg_wc_ratio:.2f}% from {len(wc_ratios)} quarterly periods (fallback)")
-        else:
-            print("Could not calculate Working Capital percentage - no valid data found")
+    def run_task(self, func, message, on_done, on_error):
+        """Run ``func(progress, cancelled)`` on a worker thread, replacing any task still running"""
+        if self.task is not None and self.task.running:
+            self.task.cancel()
+        
+        self.progress_label.config(text=message)
+        self.progress_bar.config(mode="indeterminate")
+        self.progress_bar.start(10)
+        self.cancel_button.config(state=tk.NORMAL)
+        
+        def finish(callback):
+            # Results and errors of a superseded task would land on top of the newer task's view
+            def handler(*args):
+                if self.task is task:
+                    self.end_task()
+                    callback(*args)
+            return handler
+        
+        def cancelled():
+            # A task superseded by a newer one must not overwrite the newer task's status
+            if self.task is task:
+                self.end_task()
+                self.progress_label.config(text="Calculation cancelled")
+
+        task = BackgroundTask(self.root, func, on_done=finish(on_done), on_error=finish(on_error),
+                              on_progress=self.update_progress, on_cancel=cancelled)
+        self.task = task.start()
     
-    def update_latest_financial_data(self, selected_cols):
-        """Update the latest year data dictionary with values from the dataframe"""
-        self.latest_year_data = {}
-        
-        # Look for yearly columns (FY columns)
-        yearly_cols = [col for col in self.df.columns if col.startswith('FY')]
-        if yearly_cols:
-            # Sort yearly columns to find most recent
-            yearly_cols.sort(reverse=True)
-            most_recent_yearly = yearly_cols[0]
-            print(f"Using most recent yearly column: {most_recent_yearly}")
-            
-            # Define helper function to find most recent value - MOVED UP BEFORE USAGE
-            def find_most_recent_value(key_list):
-                for key in key_list:
-                    if key in self.df.index:
-                        if most_recent_yearly in self.df.columns:
-                            value = self.df.loc[key, most_recent_yearly]
-                            if pd.notna(value):
-                                return value
-                return None
-            
-            # Extract key financial metrics from most recent yearly data
-            key_metrics = {
-                'Revenue': ['Revenue', 'Total Revenue'],
-                'Operating Income': ['Operating Income', 'Operating Profit'],
-                'Income Taxes': ['Income Taxes', 'Tax Expense', 'Income Tax Expense'],
-                'Pretax Income': ['Pretax Income', 'Income Before Tax', 'EBT'],
-                'Current Assets': ['Current Assets', 'Total Current Assets'],
-                'Current Liabilities': ['Current Liabilities', 'Total Current Liabilities'],
-                'Cash & Equivalents': ['Cash & Equivalents', 'Cash and Cash Equivalents', 'Cash'],
-                'Long Term Debt': ['Long Term Debt', 'Long-Term Debt'],
-                'Short Term Debt': ['Short Term Debt', 'Short-Term Debt'],
-                'Purchase of PP&E': ['Purchase of PP&E', 'CapEx', 'Capital Expenditure', 'Capital Expenditures', 'Purchase of Investment', 'Acquisitions']
-            }
-            
-            for metric, keys in key_metrics.items():
-                value = find_most_recent_value(keys)
-                if value is not None:
-                    print(f"Found {metric}: {value}")
-                    self.latest_year_data[metric] = value
-        
-        else:
-            print("No yearly (FY) columns found in the data")
-        
-        # Update shares outstanding - this separate process is kept to handle older code paths
-        share_fields = ['Shares Outstanding', 'shares outstanding']
-        for field in share_fields:
-            if field in self.df.index:
-                # Find most recent value
-                for col in reversed(selected_cols):
-                    try:
-                        shares = self.df.loc[field, col]
-                        if pd.notna(shares):
-                            self.shares_outstanding.delete(0, tk.END)
-                            self.shares_outstanding.insert(0, f"{shares:.2f}")
-                            self.auto_calc_labels["shares_outstanding"].config(text=f"(From {field}, {col})")
-                            print(f"Updated shares outstanding to {shares:.2f} from {field}, {col}")
-                            break
-                    except Exception as e:
-                        print(f"Error getting shares from {field}, {col}: {e}")
-                        continue
-                break  # Stop after we find the first valid field
-        
-        # Debt
-        if 'Long Term Debt' in self.latest_year_data:
-            debt = self.latest_year_data['Long Term Debt']
-            self.current_debt.delete(0, tk.END)
-            self.current_debt.insert(0, f"{debt:.2f}")
-            self.auto_calc_labels["current_debt"].config(text=f"(From most recent yearly value)")
-            print(f"Updated debt to {debt:.2f} from most recent yearly value")
-        
-        # Cash and Equivalents
-        if self.latest_year_data.get('Cash & Equivalents'):
-            cash = self.latest_year_data['Cash & Equivalents']
-            self.cash_equivalents.delete(0, tk.END)
-            self.cash_equivalents.insert(0, f"{cash:.1f}")
-            self.auto_calc_labels["cash_equivalents"].config(
-                text=f"(From most recent yearly value)"
-            )
+    def update_progress(self, fraction, message=None):
+        # Switch to a determinate bar as soon as the task reports real progress
+        if str(self.progress_bar.cget("mode")) != "determinate":
+            self.progress_bar.stop()
+            self.progress_bar.config(mode="determinate")
+        self.progress_bar.config(value=fraction)
+        if message:
+            self.progress_label.config(text=message)
+    
+    def end_task(self):
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate")
+        self.progress_bar.config(value=0)
+        self.progress_label.config(text="")
+        self.cancel_button.config(state=tk.DISABLED)
+    
+    def cancel_task(self):
+        if self.task is not None and self.task.running:
+            self.task.cancel()
+            self.progress_label.config(text="Cancelling...")
     
     def calculate_valuation(self):
         try:
-            # Switch to DCF tab first to show it's calculating
-            self.notebook.select(2)
-            
-            # Display a status message
-            for widget in self.dcf_frame.winfo_children():
-                widget.destroy()
-            
-            status_label = ttk.Label(self.dcf_frame, text="Calculating valuation... Please wait.", font=("Arial", 12, "bold"))
-            status_label.pack(pady=20)
-            self.root.update()  # Force GUI update to show the status message
-            
             # Validate all inputs before proceeding
             required_fields = {
                 'Forecast Years': self.forecast_years_entry,
@@ -1300,18 +879,18 @@ class DCFValuationCalculator:
                 return
             
             try:
-                revenue_growth = float(self.revenue_growth_var.get()) / 100
+                revenue_growth = parse_schedule(self.revenue_growth_var.get(), self.forecast_years, 0.01)
             except ValueError:
-                messagebox.showerror("Input Error", "Revenue growth rate must be a valid number")
+                messagebox.showerror("Input Error", "Revenue growth rate must be a valid number or schedule")
                 return
             
             try:
-                operating_margin = float(self.operating_margin.get()) / 100
-                if not (0 <= operating_margin <= 1):
+                operating_margin = parse_schedule(self.operating_margin.get(), self.forecast_years, 0.01)
+                if not (0 <= np.min(operating_margin) and np.max(operating_margin) <= 1):
                     messagebox.showwarning("Warning", 
-                        f"Operating margin is {operating_margin*100:.2f}%, which is outside normal range (0-100%)")
+                        f"Operating margin is {describe_schedule(operating_margin)}, which is outside normal range (0-100%)")
             except ValueError:
-                messagebox.showerror("Input Error", "Operating margin must be a valid number")
+                messagebox.showerror("Input Error", "Operating margin must be a valid number or schedule")
                 return
             
             try:
@@ -1324,19 +903,19 @@ class DCFValuationCalculator:
                 return
             
             try:
-                capex_percent = float(self.capex_percent.get()) / 100
+                capex_percent = parse_schedule(self.capex_percent.get(), self.forecast_years, 0.01)
             except ValueError:
-                messagebox.showerror("Input Error", "CapEx percentage must be a valid number")
+                messagebox.showerror("Input Error", "CapEx percentage must be a valid number or schedule")
                 return
             
             try:
-                wc_percent = float(self.wc_percent.get()) / 100
-                if wc_percent > 0.5:  # If WC % is over 50%, show a warning
+                wc_percent = parse_schedule(self.wc_percent.get(), self.forecast_years, 0.01)
+                if np.max(wc_percent) > 0.5:  # If WC % is over 50%, show a warning
                     messagebox.showwarning("Warning", 
-                        f"Working capital percentage is {wc_percent*100:.2f}%, which is unusually high. "
+                        f"Working capital percentage is {describe_schedule(wc_percent)}, which is unusually high. "
                         f"This could lead to negative valuations.")
             except ValueError:
-                messagebox.showerror("Input Error", "Working capital percentage must be a valid number")
+                messagebox.showerror("Input Error", "Working capital percentage must be a valid number or schedule")
                 return
             
             try:
@@ -1390,280 +969,279 @@ class DCFValuationCalculator:
             
             # If base revenue is not provided, calculate it from historical data
             if not base_revenue_provided:
-                if 'Revenue' in self.latest_year_data:
-                    # Try to get the last 12 quarters of revenue data
-                    revenue_values = []
-                    if hasattr(self, 'quarter_cols') and len(self.quarter_cols) > 0:
-                        # Get the most recent quarters (up to 12)
-                        quarters_to_use = self.quarter_cols[-min(12, len(self.quarter_cols)):]
-                        
-                        # Collect non-NaN revenue values from these quarters
-                        for col in quarters_to_use:
-                            try:
-                                value = self.df.loc['Revenue', col]
-                                if pd.notna(value) and value > 0:
-                                    revenue_values.append(value)
-                            except Exception as e:
-                                print(f"Warning: Could not get revenue for {col}: {e}")
-                        
-                        if revenue_values:
-                            # Calculate average quarterly revenue and annualize
-                            avg_quarterly_revenue = sum(revenue_values) / len(revenue_values)
-                            base_revenue = avg_quarterly_revenue * 4
-                            print(f"Using average of {len(revenue_values)} quarters for base revenue calculation")
-                        else:
-                            # Fallback to latest revenue value if no historical data found
-                            base_revenue = self.latest_year_data['Revenue'] * 4
-                            print("Warning: No historical quarterly data found, using latest quarter * 4")
-                    else:
-                        # Fallback to latest revenue value if no quarter columns defined
-                        base_revenue = self.latest_year_data['Revenue'] * 4
-                        print("Warning: No quarter columns defined, using latest quarter * 4")
-                else:
+                base_revenue = self.valuation_cache.base_revenue(self.valuation_context(), self.panel,
+                                                                 self.latest_year_data)
+                if base_revenue is None:
                     messagebox.showerror("Error", "Could not find revenue data in the financial statement. Please enter base revenue manually.")
                     return
             
             # Print inputs for debugging
-            print(f"DCF Model Inputs:")
-            print(f"  Base Revenue: ${base_revenue:.2f}M")
-            print(f"  Forecast Years: {self.forecast_years}")
-            print(f"  Revenue Growth: {revenue_growth*100:.2f}%")
-            print(f"  Operating Margin: {operating_margin*100:.2f}%")
-            print(f"  Tax Rate: {tax_rate*100:.2f}%")
-            print(f"  CapEx %: {capex_percent*100:.2f}%")
-            print(f"  Working Capital %: {wc_percent*100:.2f}%")
-            print(f"  Discount Rate: {discount_rate*100:.2f}%")
-            print(f"  Terminal Growth: {terminal_growth*100:.2f}%")
-            print(f"  Shares Outstanding: {shares_outstanding}M")
-            print(f"  Debt: ${debt}M")
-            print(f"  Cash: ${cash}M")
-            
-            # Create forecast model
-            years = list(range(1, self.forecast_years + 1))
-            revenue = [base_revenue * (1 + revenue_growth) ** year for year in years]
-            ebit = [rev * operating_margin for rev in revenue]
-            tax = [op * tax_rate for op in ebit]
-            nopat = [op - tx for op, tx in zip(ebit, tax)]
-            
-            # Calculate CapEx and Working Capital changes
-            capex = [rev * capex_percent for rev in revenue]
-            
-            # For working capital, we need to calculate the change year over year
-            wc = [rev * wc_percent for rev in revenue]
-            wc_change = [0] * len(wc)  # Initialize with zeros
-            
-            # Calculate working capital changes with a more stable approach
-            wc_initial = base_revenue * wc_percent  # Initial working capital
-            wc_change[0] = wc[0] - wc_initial  # Change in first year
-            
-            # Calculate changes for remaining years
-            for i in range(1, len(wc)):
-                wc_change[i] = wc[i] - wc[i-1]
-            
-            # Print working capital info for debugging
-            print("\nWorking Capital Calculations (using YEARLY data):")
-            print(f"  Initial WC: ${wc_initial:.2f}M")
-            for i in range(len(wc)):
-                print(f"  Year {i+1}: WC ${wc[i]:.2f}M, Change ${wc_change[i]:.2f}M")
-            
-            # Free Cash Flow - Fixed calculation
-            fcf = [nopat[i] - capex[i] - wc_change[i] for i in range(len(nopat))]
-            
-            # Print FCF values for debugging
-            print("\nFree Cash Flow Calculations:")
-            for i in range(len(fcf)):
-                print(f"  Year {i+1}: NOPAT ${nopat[i]:.2f}M - CapEx ${capex[i]:.2f}M - WC Change ${wc_change[i]:.2f}M = FCF ${fcf[i]:.2f}M")
-            
-            # Calculate Terminal Value
-            terminal_value = fcf[-1] * (1 + terminal_growth) / (discount_rate - terminal_growth)
-            
-            # Discounted Cash Flows
-            dcf = [flow / (1 + discount_rate) ** year for year, flow in zip(years, fcf)]
-            
-            # Discounted Terminal Value
-            discounted_tv = terminal_value / (1 + discount_rate) ** self.forecast_years
-            
-            # Enterprise Value
-            ev = sum(dcf) + discounted_tv
-            
-            # Equity Value
-            equity_value = ev - debt + cash
+            self.timings.log(f"DCF Model Inputs:")
+            self.timings.log(f"  Base Revenue: ${base_revenue:.2f}M")
+            self.timings.log(f"  Forecast Years: {self.forecast_years}")
+            self.timings.log(f"  Revenue Growth: {describe_schedule(revenue_growth)}")
+            self.timings.log(f"  Operating Margin: {describe_schedule(operating_margin)}")
+            self.timings.log(f"  Tax Rate: {tax_rate*100:.2f}%")
+            self.timings.log(f"  CapEx %: {describe_schedule(capex_percent)}")
+            self.timings.log(f"  Working Capital %: {describe_schedule(wc_percent)}")
+            self.timings.log(f"  Discount Rate: {discount_rate*100:.2f}%")
+            self.timings.log(f"  Terminal Growth: {terminal_growth*100:.2f}%")
+            self.timings.log(f"  Shares Outstanding: {shares_outstanding}M")
+            self.timings.log(f"  Debt: ${debt}M")
+            self.timings.log(f"  Cash: ${cash}M")
+            
+            # Build the forecast model off the main thread so the window stays responsive
+            inputs = dict(base_revenue=base_revenue, forecast_years=self.forecast_years, revenue_growth=revenue_growth,
+                          operating_margin=operating_margin, tax_rate=tax_rate, capex_percent=capex_percent,
+                          wc_percent=wc_percent, discount_rate=discount_rate, terminal_growth=terminal_growth,
+                          shares_outstanding=shares_outstanding, debt=debt, cash=cash)
+            context = self.valuation_context()
+            valuation = self.valuation_cache.dcf
+            kind = 'dcf'
+            if self.quarterly_var.get():
+                inputs = self.quarterly_inputs(inputs, context)
+                valuation = self.valuation_cache.quarterly_dcf
+                kind = 'quarterly_dcf'
+                self.timings.log(f"  Quarterly periods, seasonality (Q1-Q4): "
+                      f"{', '.join(f'{x:.3f}' for x in inputs.get('seasonality', (1.0,) * 4))}")
+            def evaluate(progress, cancelled):
+                with self.timings.span('engine', kind=kind):
+                    return valuation(context, **inputs)
+            
+            self.run_task(
+                evaluate,
+                "Calculating valuation...",
+                lambda model: self.finish_valuation(kind, inputs, model, debt, cash, shares_outstanding),
+                self.show_valuation_error,
+            )
             
-            # Price per Share
-            price_per_share = equity_value / shares_outstanding
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to calculate valuation: {str(e)}")
+            import traceback
+            traceback.print_exc()
+    
+    def quarterly_inputs(self, inputs, context):
+        """Forecast on a quarterly grid shaped by the selected quarters' revenue profile"""
+        inputs = dict(inputs)
+        if self.panel is not None:
+            inputs['seasonality'] = seasonality_profile(self.panel, selected_cols=list(context[1]) or None)
+        inputs['first_quarter'] = next_quarter(self.panel)
+        return inputs
+    
+    def finish_valuation(self, kind, inputs, model, debt, cash, shares_outstanding):
+        """Record a finished valuation, keep it for export and show it"""
+        self.record_valuation(kind, inputs, model)
+        self.live_unrecorded = None
+        self.last_valuation = (model, inputs)
+        self.display_valuation(model, debt, cash, shares_outstanding)
+    
+    def show_valuation_error(self, error):
+        messagebox.showerror("Error", f"Failed to calculate valuation: {str(error)}")
+    
+    def schedule_live_update(self, event=None):
+        """Debounce edits so a burst of keystrokes triggers a single recalculation"""
+        if self.live_after_id is not None:
+            self.root.after_cancel(self.live_after_id)
+            self.live_after_id = None
+        if self.live_var.get():
+            self.live_after_id = self.root.after(LIVE_DELAY_MS, self.live_recalculate)
+    
+    def read_live_inputs(self):
+        """Parse the forecast form without prompting; returns None while any input is incomplete"""
+        try:
+            forecast_years = int(self.forecast_years_entry.get())
+            if forecast_years <= 0:
+                return None
+            inputs = {
+                'forecast_years': forecast_years,
+                'revenue_growth': parse_schedule(self.revenue_growth_var.get(), forecast_years, 0.01),
+                'operating_margin': parse_schedule(self.operating_margin.get(), forecast_years, 0.01),
+                'tax_rate': float(self.tax_rate.get()) / 100,
+                'capex_percent': parse_schedule(self.capex_percent.get(), forecast_years, 0.01),
+                'wc_percent': parse_schedule(self.wc_percent.get(), forecast_years, 0.01),
+                'discount_rate': float(self.discount_rate.get()) / 100,
+                'terminal_growth': float(self.terminal_growth.get()) / 100,
+                'shares_outstanding': float(self.shares_outstanding.get()),
+                'debt': float(self.current_debt.get()),
+                'cash': float(self.cash_equivalents.get()),
+            }
+            if self.base_revenue_var.get().strip():
+                inputs['base_revenue'] = float(self.base_revenue_var.get())
+            else:
+                inputs['base_revenue'] = self.valuation_cache.base_revenue(self.valuation_context(), self.panel,
+                                                                           self.latest_year_data)
+        except ValueError:
+            return None
+        
+        if (inputs['base_revenue'] is None or inputs['shares_outstanding'] <= 0
+                or inputs['terminal_growth'] >= inputs['discount_rate']):
+            return None
+        return inputs
+    
+    def live_recalculate(self):
+        self.live_after_id = None
+        inputs = self.read_live_inputs()
+        if inputs is None:
+            self.live_summary.config(text="Waiting for valid inputs...")
+            self.live_unrecorded = None
+            return
+        
+        start = time.perf_counter()
+        with self.timings.span('live_update'):
+            with self.timings.span('engine', kind='live'):
+                if self.quarterly_var.get():
+                    kind = 'quarterly_dcf'
+                    context = self.valuation_context()
+                    inputs = self.quarterly_inputs(inputs, context)
+                    model = self.valuation_cache.quarterly_dcf(context, **inputs)
+                else:
+                    # Only the stages downstream of the edited inputs are re-run
+                    kind = 'dcf'
+                    model = self.live_model.evaluate(**inputs)
+            self.forecast_years = inputs['forecast_years']
+            self.last_valuation = (model, inputs)
+            self.live_summary.config(text=(
+                f"Enterprise Value: ${model['ev']:.2f} million\n"
+                f"Equity Value: ${model['equity_value']:.2f} million\n"
+                f"Price per Share: ${model['price_per_share']:.2f}"
+            ))
             
-            # Clear the DCF frame and display results
+            # The results tab is refreshed in place when the frame budget allows, otherwise once
+            # pending keystrokes have been handled; only the newest deferred refresh is drawn
+            if self.live_render_id is not None:
+                self.root.after_cancel(self.live_render_id)
+                self.live_render_id = None
+            if self.results_view is not None:
+                if (time.perf_counter() - start) * 1000 <= LIVE_FRAME_BUDGET_MS:
+                    self.render_live_valuation(model, inputs)
+                else:
+                    self.live_render_id = self.root.after_idle(self.render_live_valuation, model, inputs)
+        if kind == 'dcf':
+            self.timings.log(f"Live update recomputed: {', '.join(self.live_model.recomputed) or 'cached'}")
+        # Intermediate values (a half-typed margin) stay out of the history
+        self.live_unrecorded = (kind, inputs, model)
+    
+    def record_live_valuation(self, event=None):
+        """Record the live result once the user leaves the edited field"""
+        if self.live_after_id is not None:
+            # Catch up with the last keystrokes first
+            self.root.after_cancel(self.live_after_id)
+            self.live_recalculate()
+        if self.live_unrecorded is not None:
+            self.record_valuation(*self.live_unrecorded)
+            self.live_unrecorded = None
+    
+    @timed('render_live_valuation')
+    def render_live_valuation(self, model, inputs):
+        self.live_render_id = None
+        self.results_view.update_results(model, inputs['debt'], inputs['cash'], inputs['shares_outstanding'])
+    
+    def calculate_sensitivities(self):
+        """Rank every input by its effect on price per share with one batched evaluation"""
+        inputs = self.read_live_inputs()
+        if inputs is None:
+            messagebox.showerror("Input Error",
+                                 "Please fill in all forecast parameters with valid values before calculating sensitivities")
+            return
+        context = self.valuation_context()
+        # Shock the same engine the valuation uses, so the tornado matches the quarterly price
+        if self.quarterly_var.get():
+            inputs = self.quarterly_inputs(inputs, context)
+        
+        def evaluate(progress, cancelled):
+            with self.timings.span('engine', kind='sensitivities'):
+                return self.valuation_cache.sensitivities(context, **inputs)
+        
+        self.run_task(
+            evaluate,
+            "Calculating sensitivities...",
+            self.display_sensitivities,
+            lambda e: messagebox.showerror("Error", f"Failed to calculate sensitivities: {str(e)}"),
+        )
+    
+    @timed('render_sensitivities')
+    def display_sensitivities(self, table):
+        self.create_sensitivity_view().update_results(table, PERCENT_PARAMETERS)
+        self.notebook.select(self.sensitivity_frame)
+        self.timings.log(self.valuation_cache.summary())
+    
+    def export_results(self):
+        """Save the last valuation's detail, summary, sensitivities and price grid"""
+        if self.last_valuation is None:
+            messagebox.showwarning("Warning", "Calculate a valuation first")
+            return
+        
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=EXPORT_FILETYPES)
+        if not file_path:
+            return
+        
+        model, inputs = self.last_valuation
+        try:
+            sensitivities = grid = None
+            # Quarterly inputs carry their seasonality, so both run on the quarterly engine
+            if inputs.get('shares_outstanding'):
+                sensitivities = self.valuation_cache.sensitivities(self.valuation_context(), **inputs)
+                grid = price_grid(inputs)
+            written = export_tables(valuation_tables(model, inputs, sensitivities, grid), file_path)
+            messagebox.showinfo("Export Complete", "Saved:\n" + "\n".join(written))
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Failed to export results: {str(e)}")
+    
+    def refresh_diagnostics(self, event=None):
+        """Redraw the Diagnostics tab while it is shown (spans finished on workers wait for the next one)"""
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if self.notebook.select() == str(self.diagnostics_frame):
+            self.diagnostics_view.refresh()
+    
+    def create_sensitivity_view(self):
+        """Build the Sensitivities tab contents the first time sensitivities are shown"""
+        if self.sensitivity_view is None:
+            # matplotlib is only imported once a chart is needed, keeping startup fast
+            from dcf_results_view import SensitivityView
+            self.sensitivity_view = SensitivityView(self.sensitivity_frame)
+            self.sensitivity_view.pack(fill=tk.BOTH, expand=True)
+        return self.sensitivity_view
+    
+    def create_results_view(self):
+        """Build the DCF tab contents the first time a valuation is shown"""
+        if self.results_view is None:
+            from dcf_results_view import DCFResultsView
             for widget in self.dcf_frame.winfo_children():
                 widget.destroy()
+            self.results_view = DCFResultsView(self.dcf_frame, on_edit=lambda: self.notebook.select(1),
+                                               on_recalculate=self.calculate_valuation,
+                                               on_export=self.export_results)
+            self.results_view.pack(fill=tk.BOTH, expand=True)
+        return self.results_view
+    
+    @timed('render_valuation')
+    def display_valuation(self, model, debt, cash, shares_outstanding):
+        """Render a finished DCF model in the DCF Valuation tab"""
+        try:
+            wc, wc_change = model['wc'], model['wc_change']
+            nopat, capex, fcf = model['nopat'], model['capex'], model['fcf']
             
-            # Create main container for results and ensure fixed control panel at bottom
-            main_container = ttk.Frame(self.dcf_frame)
-            main_container.pack(fill=tk.BOTH, expand=True)
-            
-            # Control panel that will stay at bottom even when resized
-            control_panel = ttk.Frame(self.dcf_frame)
-            control_panel.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
-            
-            # Add buttons to the fixed control panel
-            recalc_button = ttk.Button(
-                control_panel, 
-                text="Edit Parameters",
-                command=lambda: self.notebook.select(1)
-            )
-            recalc_button.pack(side=tk.LEFT, padx=5, pady=5)
-            
-            # Add a direct recalculate button that stays on the current tab
-            calc_again_button = ttk.Button(
-                control_panel, 
-                text="Recalculate Valuation",
-                command=self.calculate_valuation
-            )
-            calc_again_button.pack(side=tk.RIGHT, padx=5, pady=5)
-            
-            # Create results frame within main container
-            results_frame = ttk.Frame(main_container)
-            results_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Left panel for DCF summary
-            left_panel = ttk.Frame(results_frame)
-            left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # DCF Summary
-            summary_frame = ttk.LabelFrame(left_panel, text="DCF Valuation Summary", padding=10)
-            summary_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            ttk.Label(summary_frame, text=f"Enterprise Value: ${ev:.2f} million").grid(row=0, column=0, sticky="w", padx=5, pady=5)
-            ttk.Label(summary_frame, text=f"- Debt: ${debt:.2f} million").grid(row=1, column=0, sticky="w", padx=5, pady=5)
-            ttk.Label(summary_frame, text=f"+ Cash: ${cash:.2f} million").grid(row=2, column=0, sticky="w", padx=5, pady=5)
-            ttk.Label(summary_frame, text=f"= Equity Value: ${equity_value:.2f} million").grid(row=3, column=0, sticky="w", padx=5, pady=5)
-            ttk.Label(summary_frame, text=f"÷ Shares Outstanding: {shares_outstanding:.2f} million").grid(row=4, column=0, sticky="w", padx=5, pady=5)
-            ttk.Label(summary_frame, text=f"= Price per Share: ${price_per_share:.2f}").grid(row=5, column=0, sticky="w", padx=5, pady=5)
-            
-            # Add a new FCF Projection Table
-            fcf_table_frame = ttk.LabelFrame(left_panel, text="Free Cash Flow Projections", padding=10)
-            fcf_table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Create a simple table for FCF projections
-            fcf_table = ttk.Treeview(fcf_table_frame, height=len(years))
-            fcf_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Define columns: Year and FCF
-            fcf_table["columns"] = ["Year", "FCF", "Present Value"]
-            
-            # Format columns
-            fcf_table.column("#0", width=0, stretch=tk.NO)
-            fcf_table.column("Year", anchor=tk.W, width=100)
-            fcf_table.column("FCF", anchor=tk.E, width=150)
-            fcf_table.column("Present Value", anchor=tk.E, width=150)
-            
-            # Create column headings
-            fcf_table.heading("#0", text="", anchor=tk.W)
-            fcf_table.heading("Year", text="Year", anchor=tk.W)
-            fcf_table.heading("FCF", text="Free Cash Flow (millions)", anchor=tk.CENTER)
-            fcf_table.heading("Present Value", text="Present Value (millions)", anchor=tk.CENTER)
-            
-            # Add data to the table
-            for i in range(self.forecast_years):
-                fcf_table.insert("", i, text="", values=(
-                    f"Year {i+1}",
-                    f"${fcf[i]:.2f}",
-                    f"${dcf[i]:.2f}"
-                ))
-            
-            # Add terminal value as the last row
-            fcf_table.insert("", self.forecast_years, text="", values=(
-                "Terminal Value",
-                f"${terminal_value:.2f}",
-                f"${discounted_tv:.2f}"
-            ))
+            # Print working capital info for debugging
+            self.timings.log("\nWorking Capital Calculations (using YEARLY data):")
+            self.timings.log(f"  Initial WC: ${model['wc_initial']:.2f}M")
+            for i in range(len(wc)):
+                self.timings.log(f"  Year {i+1}: WC ${wc[i]:.2f}M, Change ${wc_change[i]:.2f}M")
             
-            # Add row for sum of present values
-            fcf_table.insert("", self.forecast_years + 1, text="", values=(
-                "Total Enterprise Value",
-                "",
-                f"${ev:.2f}"
-            ))
+            # Print FCF values for debugging
+            self.timings.log("\nFree Cash Flow Calculations:")
+            for i in range(len(fcf)):
+                self.timings.log(f"  Year {i+1}: NOPAT ${nopat[i]:.2f}M - CapEx ${capex[i]:.2f}M - WC Change ${wc_change[i]:.2f}M = FCF ${fcf[i]:.2f}M")
             
-            # Add visualization
-            fig_frame = ttk.LabelFrame(left_panel, text="Cash Flow Visualization", padding=10)
-            fig_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            fig, ax = plt.subplots(figsize=(8, 4))
-            years_labels = [f"Year {i+1}" for i in range(self.forecast_years)]
-            
-            # Bar plot of FCF
-            ax.bar(years_labels, fcf, color='skyblue', label='FCF')
-            
-            # Add TV as a separate bar
-            ax.bar("Terminal Value", terminal_value, color='orange', label='Terminal Value')
-            
-            ax.set_ylabel('Value (millions)')
-            ax.set_title('Forecasted Free Cash Flows')
-            ax.legend()
-            
-            # Embed plot in tkinter
-            canvas = FigureCanvasTkAgg(fig, master=fig_frame)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-            
-            # Right panel for visualization
-            right_panel = ttk.Frame(results_frame)
-            right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Create a detailed table of the DCF calculation
-            table_frame = ttk.LabelFrame(right_panel, text="DCF Calculation Details", padding=10)
-            table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-            
-            # Create treeview for DCF details
-            tree = ttk.Treeview(table_frame)
-            tree.pack(fill=tk.BOTH, expand=True)
-            
-            # Add scrollbar
-            vsb = ttk.Scrollbar(tree, orient="vertical", command=tree.yview)
-            vsb.pack(side='right', fill='y')
-            tree.configure(yscrollcommand=vsb.set)
-            
-            # Define columns
-            tree["columns"] = ["Year", "Revenue", "EBIT", "Tax", "NOPAT", "CapEx", "WC Change", "FCF", "DCF"]
-            
-            # Format columns
-            tree.column("#0", width=0, stretch=tk.NO)
-            for col in tree["columns"]:
-                tree.column(col, anchor=tk.CENTER, width=100)
-                tree.heading(col, text=col, anchor=tk.CENTER)
-            
-            # Add DCF data to treeview
-            for i in range(self.forecast_years):
-                tree.insert("", i, text="", values=(
-                    f"Year {i+1}",
-                    f"${revenue[i]:.2f}",
-                    f"${ebit[i]:.2f}",
-                    f"${tax[i]:.2f}",
-                    f"${nopat[i]:.2f}",
-                    f"${capex[i]:.2f}",
-                    f"${wc_change[i]:.2f}",
-                    f"${fcf[i]:.2f}",
-                    f"${dcf[i]:.2f}"
-                ))
-            
-            # Add terminal value
-            tree.insert("", self.forecast_years, text="", values=(
-                "Terminal Value",
-                "-",
-                "-",
-                "-",
-                "-",
-                "-",
-                "-",
-                f"${terminal_value:.2f}",
-                f"${discounted_tv:.2f}"
-            ))
+            # Build the results view once, then update it in place on every recalculation
+            self.create_results_view().update_results(model, debt, cash, shares_outstanding)
+            self.timings.log(self.valuation_cache.summary())
             
             # Switch to DCF tab
             self.notebook.select(2)
             
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to calculate valuation: {str(e)}")
+            messagebox.showerror("Error", f"Failed to display valuation: {str(e)}")
             import traceback
             traceback.print_exc()
 
@@ -1704,15 +1282,15 @@ class DCFValuationCalculator:
                 return
                 
             try:
-                revenue_growth = float(self.revenue_growth_var.get()) / 100
+                revenue_growth = parse_schedule(self.revenue_growth_var.get(), forecast_years, 0.01)
             except ValueError:
-                messagebox.showerror("Input Error", "Revenue growth rate must be a valid number")
+                messagebox.showerror("Input Error", "Revenue growth rate must be a valid number or schedule")
                 return
                 
             try:
-                operating_margin = float(self.operating_margin.get()) / 100
+                operating_margin = parse_schedule(self.operating_margin.get(), forecast_years, 0.01)
             except ValueError:
-                messagebox.showerror("Input Error", "Operating margin must be a valid number")
+                messagebox.showerror("Input Error", "Operating margin must be a valid number or schedule")
                 return
                 
             try:
@@ -1722,15 +1300,15 @@ class DCFValuationCalculator:
                 return
                 
             try:
-                capex_percent = float(self.capex_percent.get()) / 100
+                capex_percent = parse_schedule(self.capex_percent.get(), forecast_years, 0.01)
             except ValueError:
-                messagebox.showerror("Input Error", "CapEx percentage must be a valid number")
+                messagebox.showerror("Input Error", "CapEx percentage must be a valid number or schedule")
                 return
                 
             try:
-                wc_percent = float(self.wc_percent.get()) / 100
+                wc_percent = parse_schedule(self.wc_percent.get(), forecast_years, 0.01)
             except ValueError:
-                messagebox.showerror("Input Error", "Working capital percentage must be a valid number")
+                messagebox.showerror("Input Error", "Working capital percentage must be a valid number or schedule")
                 return
                 
             try:
@@ -1768,136 +1346,54 @@ class DCFValuationCalculator:
                 return
             
             # Calculate base revenue in the same way as the forward DCF model
-            if 'Revenue' in self.latest_year_data:
-                # Try to get the last 12 quarters of revenue data
-                revenue_values = []
-                if hasattr(self, 'quarter_cols') and len(self.quarter_cols) > 0:
-                    # Get the most recent quarters (up to 12)
-                    quarters_to_use = self.quarter_cols[-min(12, len(self.quarter_cols)):]
-                    
-                    # Collect non-NaN revenue values from these quarters
-                    for col in quarters_to_use:
-                        try:
-                            value = self.df.loc['Revenue', col]
-                            if pd.notna(value) and value > 0:
-                                revenue_values.append(value)
-                        except Exception as e:
-                            print(f"Warning: Could not get revenue for {col}: {e}")
-                    
-                    if revenue_values:
-                        # Calculate average quarterly revenue and annualize
-                        avg_quarterly_revenue = sum(revenue_values) / len(revenue_values)
-                        base_revenue = avg_quarterly_revenue * 4
-                        print(f"Using average of {len(revenue_values)} quarters for base revenue calculation")
-                    else:
-                        # Fallback to latest revenue value if no historical data found
-                        base_revenue = self.latest_year_data['Revenue'] * 4
-                        print("Warning: No historical quarterly data found, using latest quarter * 4")
-                else:
-                    # Fallback to latest revenue value if no quarter columns defined
-                    base_revenue = self.latest_year_data['Revenue'] * 4
-                    print("Warning: No quarter columns defined, using latest quarter * 4")
-            else:
+            context = self.valuation_context()
+            base_revenue = self.valuation_cache.base_revenue(context, self.panel, self.latest_year_data)
+            if base_revenue is None:
                 messagebox.showerror("Error", "Could not find revenue data in the financial statement")
                 return
             
-            # Calculate the target equity value from the current share price
-            target_equity_value = current_price * shares_outstanding
-            
-            # Calculate the target enterprise value
-            target_ev = target_equity_value + debt - cash
-            
-            # Implement a binary search algorithm to find the discount rate that matches the target EV
-            def calculate_ev_with_discount_rate(discount_rate):
-                # Create forecast model
-                years = list(range(1, forecast_years + 1))
-                revenue = [base_revenue * (1 + revenue_growth) ** year for year in years]
-                ebit = [rev * operating_margin for rev in revenue]
-                tax_amount = [op * tax_rate for op in ebit]
-                nopat = [op - tx for op, tx in zip(ebit, tax_amount)]
-                
-                # Calculate CapEx and Working Capital changes
-                capex = [rev * capex_percent for rev in revenue]
-                
-                # For working capital, we need to calculate the change year over year
-                wc = [rev * wc_percent for rev in revenue]
-                wc_change = [0] + [wc[i] - wc[i-1] for i in range(1, len(wc))]
-                wc_change[0] = wc[0] - (base_revenue * wc_percent)
-                
-                # Free Cash Flow
-                fcf = [nopat[i] - capex[i] - wc_change[i] for i in range(len(nopat))]
-                
-                # Terminal Value
-                terminal_value = fcf[-1] * (1 + terminal_growth) / (discount_rate - terminal_growth)
-                
-                # Discounted Cash Flows
-                dcf_values = [flow / (1 + discount_rate) ** year for year, flow in zip(years, fcf)]
-                
-                # Discounted Terminal Value
-                discounted_tv = terminal_value / (1 + discount_rate) ** forecast_years
-                
-                # Enterprise Value
-                ev = sum(dcf_values) + discounted_tv
-                
-                return ev
-            
-            # Binary search to find the implied discount rate
-            low_rate = 0.01  # 1%
-            high_rate = 0.50  # 50%
-            mid_rate = (low_rate + high_rate) / 2
-            tolerance = 0.0001  # Acceptable error in enterprise value
-            max_iterations = 100
-            
-            # Check if terminal growth is less than the lowest discount rate we'll try
-            if terminal_growth >= low_rate:
-                low_rate = terminal_growth + 0.01  # Set low_rate just above terminal growth
-                if low_rate >= high_rate:
-                    messagebox.showerror("Error", 
-                        "Terminal growth rate is too high to find a valid discount rate solution")
-                    return
-            
-            # Ensure we can bracket the solution
-            ev_at_low = calculate_ev_with_discount_rate(low_rate)
-            ev_at_high = calculate_ev_with_discount_rate(high_rate)
-            
-            if (ev_at_low < target_ev and ev_at_high < target_ev) or (ev_at_low > target_ev and ev_at_high > target_ev):
-                messagebox.showerror("Error", 
-                    f"Cannot find a solution in the range {low_rate*100:.1f}% to {high_rate*100:.1f}%. "
-                    f"The current price may be outside the model's realistic valuation range.")
-                return
-            
-            # Perform binary search
-            iteration = 0
-            while iteration < max_iterations:
-                mid_rate = (low_rate + high_rate) / 2
-                
-                # Check if mid_rate would lead to invalid terminal value calculation
-                if mid_rate <= terminal_growth:
-                    low_rate = mid_rate
-                    continue
-                
-                ev_at_mid = calculate_ev_with_discount_rate(mid_rate)
-                error = abs(ev_at_mid - target_ev)
-                
-                # If within tolerance, we found our solution
-                if error < tolerance * target_ev:
-                    break
-                
-                # Adjust search range
-                if ev_at_mid > target_ev:
-                    low_rate = mid_rate
-                else:
-                    high_rate = mid_rate
-                
-                iteration += 1
+            # Binary search for the discount rate that matches the target EV, off the main thread
+            inputs = dict(base_revenue=base_revenue, forecast_years=forecast_years, revenue_growth=revenue_growth,
+                          operating_margin=operating_margin, tax_rate=tax_rate, capex_percent=capex_percent,
+                          wc_percent=wc_percent, terminal_growth=terminal_growth,
+                          shares_outstanding=shares_outstanding, debt=debt, cash=cash)
+            assumptions = (current_price, base_revenue, revenue_growth, operating_margin, terminal_growth)
+            def solve(progress, cancelled):
+                with self.timings.span('engine', kind='implied_discount_rate'):
+                    return self.stored_valuation(
+                        'implied_discount_rate', dict(inputs, target_price=current_price),
+                        lambda: self.valuation_cache.implied_discount_rate(
+                            context, current_price, progress=progress, cancelled=cancelled, **inputs))
+            
+            self.run_task(
+                solve,
+                "Solving for implied discount rate...",
+                lambda solution: self.display_implied_discount_rate(solution, *assumptions),
+                self.show_implied_discount_rate_error,
+            )
             
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to calculate implied discount rate: {str(e)}")
+            import traceback
+            traceback.print_exc()
+    
+    def show_implied_discount_rate_error(self, error):
+        # The solver raises ValueError with a user-facing message when the price cannot be bracketed
+        if isinstance(error, ValueError):
+            messagebox.showerror("Error", str(error))
+        else:
+            messagebox.showerror("Error", f"Failed to calculate implied discount rate: {str(error)}")
+    
+    @timed('render_implied_discount_rate')
+    def display_implied_discount_rate(self, solution, current_price, base_revenue, revenue_growth,
+                                      operating_margin, terminal_growth):
+        """Show the reverse DCF result window"""
+        try:
             # Get the resulting values for displaying
-            implied_discount_rate = mid_rate
-            ev_at_implied_rate = calculate_ev_with_discount_rate(implied_discount_rate)
-            
-            # Calculate implied price per share for validation
-            implied_equity_value = ev_at_implied_rate - debt + cash
-            implied_price = implied_equity_value / shares_outstanding
+            implied_discount_rate = solution['implied_discount_rate']
+            target_equity_value = solution['target_equity_value']
+            target_ev = solution['target_ev']
+            self.timings.log(self.valuation_cache.summary())
             
             # Display results
             result_window = tk.Toplevel(self.root)
@@ -1930,8 +1426,10 @@ class DCFValuationCalculator:
             ttk.Label(result_frame, text="Key Assumptions:", 
                     font=("Arial", 11, "bold")).pack(anchor="w", pady=(15, 5))
             ttk.Label(result_frame, text=f"Base Revenue: ${base_revenue:.2f} million").pack(anchor="w", pady=2)
-            ttk.Label(result_frame, text=f"Revenue Growth: {revenue_growth*100:.2f}%").pack(anchor="w", pady=2)
-            ttk.Label(result_frame, text=f"Operating Margin: {operating_margin*100:.2f}%").pack(anchor="w", pady=2)
+            ttk.Label(result_frame, text=f"Revenue Growth: {describe_schedule(revenue_growth)}",
+                      wraplength=450).pack(anchor="w", pady=2)
+            ttk.Label(result_frame, text=f"Operating Margin: {describe_schedule(operating_margin)}",
+                      wraplength=450).pack(anchor="w", pady=2)
             ttk.Label(result_frame, text=f"Terminal Growth Rate: {terminal_growth*100:.2f}%").pack(anchor="w", pady=2)
             
             # Add interpretation
@@ -1954,10 +1452,110 @@ class DCFValuationCalculator:
             self.discount_rate.insert(0, f"{implied_discount_rate*100:.2f}")
             
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to calculate implied discount rate: {str(e)}")
+            messagebox.showerror("Error", f"Failed to display implied discount rate: {str(e)}")
             import traceback
             traceback.print_exc()
     
+    def get_form_parameters(self):
+        """Read every forecast entry as a number in form units; empty entries become None"""
+        params = {}
+        for name, entry in self.form_entries.items():
+            text = entry.get().strip()
+            if not text:
+                params[name] = None
+                continue
+            try:
+                params[name] = int(text) if name == 'forecast_years' else float(text)
+            except ValueError:
+                # Schedules ("30, 25, 20" or "30>5") are stored as typed and expanded when evaluated
+                if name in SCHEDULE_PARAMETERS and (',' in text or '>' in text):
+                    params[name] = text
+                    continue
+                raise ValueError(f"{name.replace('_', ' ').capitalize()} must be a valid number")
+        return params
+    
+    def set_form_parameters(self, params):
+        for name, entry in self.form_entries.items():
+            if name in params:
+                entry.delete(0, tk.END)
+                if params[name] is not None:
+                    entry.insert(0, str(params[name]))
+        self.schedule_live_update()
+    
+    def save_scenario(self):
+        name = self.scenario_var.get().strip()
+        if not self.file_path:
+            messagebox.showerror("Error", "Please load a financial statement file first")
+            return
+        if not name:
+            messagebox.showerror("Input Error", "Please enter a scenario name")
+            return
+        try:
+            self.scenarios[name] = self.get_form_parameters()
+            save_scenarios(scenario_path(self.file_path), self.scenarios, ticker_from_path(self.file_path))
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Failed to save scenario: {str(e)}")
+            return
+        self.scenario_dropdown['values'] = sorted(self.scenarios)
+        self.timings.log(f"Saved scenario '{name}' to {scenario_path(self.file_path)}")
+    
+    def load_scenario(self):
+        name = self.scenario_var.get().strip()
+        if name not in self.scenarios:
+            messagebox.showerror("Input Error", f"No saved scenario named '{name}'")
+            return
+        self.set_form_parameters(self.scenarios[name])
+    
+    def delete_scenario(self):
+        name = self.scenario_var.get().strip()
+        if name not in self.scenarios or not self.file_path:
+            return
+        del self.scenarios[name]
+        try:
+            save_scenarios(scenario_path(self.file_path), self.scenarios, ticker_from_path(self.file_path))
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save scenarios: {str(e)}")
+        self.scenario_dropdown['values'] = sorted(self.scenarios)
+        self.scenario_var.set("")
+    
+    def evaluate_all_scenarios(self):
+        """Value every saved scenario in one batch and show them side by side"""
+        if not self.scenarios:
+            messagebox.showinfo("Scenarios", "No saved scenarios for this ticker yet")
+            return
+        scenarios = dict(self.scenarios)
+        base_revenue = self.valuation_cache.base_revenue(self.valuation_context(), self.panel, self.latest_year_data)
+        self.run_task(
+            lambda progress, cancelled: evaluate_scenarios(scenarios, base_revenue),
+            "Evaluating scenarios...",
+            self.display_scenario_table,
+            lambda e: messagebox.showerror("Error", f"Failed to evaluate scenarios: {str(e)}"),
+        )
+    
+    def display_scenario_table(self, table):
+        window = tk.Toplevel(self.root)
+        window.title("Scenario Comparison")
+        window.geometry("800x400")
+        
+        columns = ["Scenario", "Enterprise Value", "Equity Value", "Price per Share", "Status"]
+        tree = ttk.Treeview(window, columns=columns, show="headings")
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for col in columns:
+            tree.column(col, anchor=tk.W if col in ("Scenario", "Status") else tk.E, width=140)
+            tree.heading(col, text=col)
+        
+        def money(value, suffix=" M"):
+            return "" if value != value else f"${value:,.2f}{suffix}"
+        
+        for row in table.itertuples(index=False):
+            tree.insert("", tk.END, values=(
+                row.scenario,
+                money(row.enterprise_value),
+                money(row.equity_value),
+                money(row.price_per_share, suffix=""),
+                row.status,
+            ))
+    
     def apply_implied_discount_rate(self, discount_rate, window):
         """Apply the calculated discount rate to the main model and close the window"""
         # Update the discount rate in the main form
@@ -1972,9 +1570,24 @@ class DCFValuationCalculator:
                            f"The implied discount rate of {discount_rate*100:.2f}% has been applied to your DCF model.")
 
 def main():
+    parser = argparse.ArgumentParser(description='DCF valuation calculator.')
+    parser.add_argument('--verbose', action='store_true', help='Print debugging output and stage timings')
+    parser.add_argument('--timings-json', help='Write stage timings to this JSON file on exit')
+    parser.add_argument('--profile', help='Run under cProfile and write the statistics to this file on exit')
+    args = parser.parse_args()
+    
+    timings = Timings(verbose=args.verbose, profile=bool(args.profile))
+    # Workbook loading diagnostics print with the rest of the debugging output
+    timings.capture_logging('valuation_core')
     root = tk.Tk()
-    app = DCFValuationCalculator(root)
-    root.mainloop()
+    app = DCFValuationCalculator(root, timings)
+    try:
+        root.mainloop()
+    finally:
+        if args.timings_json:
+            timings.write_json(args.timings_json)
+        if args.profile:
+            timings.write_profile(args.profile)
 
 if __name__ == "__main__":
     main()
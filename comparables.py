@@ -0,0 +1,178 @@
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from valuation_core import (DEFAULT_PARAMETERS, load_panel, select_quarters, lookback_length, forecast_parameters,
+                            default_base_revenue, file_fingerprint, model_inputs, dcf_batch, batch_cash_flows,
+                            implied_discount_rates, verbose_logging)
+from batch_valuation import discover_workbooks, load_overrides, write_results
+
+# Prefilled parameters kept per ticker in the universe panel (form units: percentages, millions)
+UNIVERSE_COLUMNS = ['base_revenue', 'revenue_growth', 'operating_margin', 'tax_rate', 'capex_percent', 'wc_percent',
+                    'shares_outstanding', 'current_debt', 'cash_equivalents']
+
+SCREEN_COLUMNS = ['ticker', 'status', 'latest_quarter', 'base_revenue', 'revenue_growth', 'operating_margin',
+                  'tax_rate', 'capex_percent', 'wc_percent', 'next_year_fcf', 'enterprise_value', 'equity_value',
+                  'price_per_share', 'current_share_price', 'market_cap', 'fcf_yield', 'upside',
+                  'implied_discount_rate']
+
+
+def ticker_profile(ticker, file_path, quarters="All available data", verbose=False):
+    """One universe row: the ticker's prefilled parameters for the lookback, plus where they came from"""
+    row = {'ticker': ticker, 'file': file_path}
+    if verbose:
+        verbose_logging()
+    try:
+        row['fingerprint'] = file_fingerprint(file_path)
+        panel = load_panel(file_path)
+        selected_cols = select_quarters(panel.quarter_cols, quarters)
+        params, _, latest_data = forecast_parameters(panel, selected_cols)
+        if params.get('base_revenue') is None:
+            params['base_revenue'] = default_base_revenue(panel, latest_data)
+        row['latest_quarter'] = panel.quarter_cols[-1] if panel.quarter_cols else None
+        row['quarters'] = len(selected_cols)
+        row.update({name: params.get(name, np.nan) for name in UNIVERSE_COLUMNS})
+        row['status'] = 'ok'
+    except Exception as e:
+        row['status'] = f"error: {e}"
+    return row
+
+
+def load_universe(workbooks, quarters="All available data", workers=None, verbose=False):
+    """Prefilled parameters of every workbook as one ticker-indexed frame, loaded in a process pool.
+
+    Workbooks are read through their sidecars, so a universe of hundreds of tickers loads in
+    seconds; the frame is the compact panel every screen and peer statistic is computed from.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = list(pool.map(ticker_profile, *zip(*[(ticker, path, quarters, verbose) for ticker, path in workbooks])))
+    if not rows:
+        return pd.DataFrame(columns=['status', *UNIVERSE_COLUMNS]).rename_axis('ticker')
+    return pd.DataFrame(rows).set_index('ticker').sort_index()
+
+
+def screen(universe, overrides=None):
+    """Value every ticker of a universe frame together and add the comparison metrics.
+
+    ``overrides`` maps ``"default"`` and/or tickers to form-unit parameters (as in the batch
+    overrides file); a ``current_share_price`` there enables market cap, FCF yield, upside and
+    the implied discount rate. All tickers go through one ``dcf_batch`` and one vectorized
+    reverse DCF. Rates are reported in percent, amounts in millions.
+    """
+    overrides = overrides or {}
+    rows, scenarios, prices = [], [], []
+    for ticker, profile in universe.iterrows():
+        row = {'ticker': ticker, 'status': profile['status'], 'latest_quarter': profile.get('latest_quarter')}
+        if profile['status'] == 'ok':
+            inputs = dict(DEFAULT_PARAMETERS)
+            inputs.update({name: profile[name] for name in UNIVERSE_COLUMNS if not pd.isna(profile[name])})
+            inputs.update(overrides.get('default', {}))
+            inputs.update(overrides.get(ticker, {}))
+            row.update({name: inputs.get(name) for name in UNIVERSE_COLUMNS})
+            row['current_share_price'] = inputs.get('current_share_price')
+            try:
+                if inputs.get('base_revenue') is None:
+                    raise ValueError("Could not find revenue data")
+                scenarios.append(model_inputs(inputs))
+                prices.append(float(inputs.get('current_share_price') or np.nan))
+                row['_scenario'] = len(scenarios) - 1
+            except ValueError as e:
+                row['status'] = f"error: {e}"
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    if scenarios:
+        positions = table.pop('_scenario')
+        valued = positions.notna().to_numpy()
+        index = positions[valued].astype(int).to_numpy()
+        results = dcf_batch(scenarios)
+        fcf, _ = batch_cash_flows(scenarios)
+        prices = np.array(prices)
+        shares = np.array([s.get('shares_outstanding') or np.nan for s in scenarios], dtype=float)
+        market_cap = prices * shares
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics = {
+                'enterprise_value': results['ev'],
+                'equity_value': results['equity_value'],
+                'price_per_share': results['price_per_share'],
+                'next_year_fcf': fcf[:, 0],
+                'market_cap': market_cap,
+                'fcf_yield': np.where(market_cap > 0, fcf[:, 0] / market_cap * 100, np.nan),
+                'upside': (results['price_per_share'] / prices - 1) * 100,
+                'implied_discount_rate': implied_discount_rates(scenarios, prices) * 100,
+            }
+        for name, values in metrics.items():
+            table[name] = np.nan
+            table.loc[valued, name] = values[index]
+    ordered = [col for col in SCREEN_COLUMNS if col in table.columns]
+    return table[ordered + [col for col in table.columns if col not in ordered]]
+
+
+def filter_screen(table, expressions):
+    """Rows matching every pandas query expression, e.g. ``"operating_margin > 20"``"""
+    for expression in expressions or []:
+        try:
+            table = table.query(expression)
+        except Exception as e:
+            raise ValueError(f"Invalid filter '{expression}': {e}")
+    return table
+
+
+def sort_screen(table, column, ascending=False):
+    if column not in table.columns:
+        raise ValueError(f"Unknown sort column '{column}'; choose from {', '.join(table.columns)}")
+    return table.sort_values(column, ascending=ascending, na_position='last', kind='stable')
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Compare every consolidated ticker side by side.')
+    parser.add_argument('tickers', nargs='*', help='Only screen these tickers (default: all)')
+    parser.add_argument('--statements-dir', default=os.path.join(script_dir, 'statements'),
+                        help='Folder containing one sub-folder per ticker')
+    parser.add_argument('--quarters', default="All available data",
+                        help='Lookback used for the prefill: 4, 8, 12 or 16 quarters, or "all" (default)')
+    parser.add_argument('--overrides', help='JSON file with "default" and per-ticker parameter overrides '
+                                            '(share counts and current_share_price enable the market metrics)')
+    parser.add_argument('--filter', action='append', default=[],
+                        help='Keep rows matching a pandas query, e.g. "operating_margin > 20" (repeatable)')
+    parser.add_argument('--sort', default='operating_margin', help='Column to sort by')
+    parser.add_argument('--ascending', action='store_true', help='Sort smallest first')
+    parser.add_argument('--top', type=int, help='Only show the first N rows')
+    parser.add_argument('--output', help='Also save the screen (.csv or .xlsx)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    parser.add_argument('--verbose', action='store_true', help='Show per-ticker diagnostics')
+    args = parser.parse_args()
+    try:
+        lookback_length(args.quarters)
+    except ValueError as e:
+        parser.error(str(e))
+
+    workbooks = discover_workbooks(args.statements_dir, {ticker.upper() for ticker in args.tickers})
+    if not workbooks:
+        print(f"No consolidated workbooks found in {args.statements_dir}")
+        sys.exit(1)
+
+    universe = load_universe(workbooks, args.quarters, args.workers, args.verbose)
+    try:
+        table = sort_screen(filter_screen(screen(universe, load_overrides(args.overrides)), args.filter),
+                            args.sort, args.ascending)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if args.top:
+        table = table.head(args.top)
+
+    with pd.option_context('display.max_columns', None, 'display.width', 200, 'display.float_format', '{:,.2f}'.format):
+        print(table.to_string(index=False))
+    if args.output:
+        write_results(table, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
 import os
 import pandas as pd
 import numpy as np
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
 import re
 import argparse
 import sys
 
+from valuation_core import refresh_sidecar
+
 class FinancialStatementConsolidator:
     def __init__(self, statements_dir):
         self.statements_dir = statements_dir
@@ -282,6 +281,11 @@ class FinancialStatementConsolidator:
             print("No data to save")
             return
         
+        # Styling is only needed when a workbook is actually written
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        from openpyxl.utils import get_column_letter
+        
         # Debug print section ranges    
         print("Section ranges for styling:")
         for section, (start, end) in section_ranges.items():
@@ -407,6 +411,11 @@ class FinancialStatementConsolidator:
         # Save the workbook
         wb.save(output_path)
         print(f"Consolidated statements saved to {output_path}")
+        
+        # Cleaned columnar copy so the valuation tools can skip parsing the workbook
+        sidecar = refresh_sidecar(output_path)
+        if sidecar:
+            print(f"Cleaned data sidecar saved to {sidecar}")
 
     def _add_yearly_data(self, df):
         """Add in yearly data to the consolidated dataframe."""
@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+
+import numpy as np
+
+from valuation_core import (DEFAULT_PARAMETERS, DCFGraph, load_panel, forecast_parameters, model_inputs,
+                            dcf_valuation, dcf_batch, quarterly_dcf_valuation, price_sensitivities, price_grid,
+                            solve_implied_discount_rate)
+from batch_valuation import discover_workbooks
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_PATH = os.path.join(SCRIPT_DIR, 'dcf_golden.json')
+
+# Sample workbooks have no share counts, so the golden runs fix one
+GOLDEN_SHARES = 1000.0
+# Reverse DCF target: the model price at this discount rate, which the solver should recover
+GOLDEN_TARGET_RATE = 0.12
+RTOL = 1e-9
+ATOL = 1e-9
+
+
+def golden_inputs(panel):
+    """Prefilled inputs for all available quarters, with the fixed share count"""
+    params, _, _ = forecast_parameters(panel)
+    inputs = dict(DEFAULT_PARAMETERS)
+    inputs.update(params)
+    inputs['shares_outstanding'] = GOLDEN_SHARES
+    return model_inputs(inputs)
+
+
+def golden_outputs(kwargs):
+    """Every number the golden file pins down for one set of inputs"""
+    model = dcf_valuation(**kwargs)
+    quarterly = quarterly_dcf_valuation(**kwargs)
+    sensitivities = price_sensitivities(kwargs)
+    grid = price_grid(kwargs)
+    outputs = {
+        'inputs': kwargs,
+        'dcf': {name: model[name] for name in ('revenue', 'fcf', 'dcf', 'terminal_value', 'discounted_tv', 'ev',
+                                               'equity_value', 'price_per_share')},
+        'batch_price_per_share': float(dcf_batch([kwargs])['price_per_share'][0]),
+        'quarterly_ev': quarterly['ev'],
+        'sensitivity_derivatives': dict(zip(sensitivities['input'], sensitivities['derivative'])),
+        'price_grid': grid.to_numpy().tolist(),
+    }
+
+    target = dcf_valuation(**dict(kwargs, discount_rate=GOLDEN_TARGET_RATE))['price_per_share']
+    solve_kwargs = {name: value for name, value in kwargs.items() if name != 'discount_rate'}
+    try:
+        outputs['implied_discount_rate'] = solve_implied_discount_rate(target, **solve_kwargs)['implied_discount_rate']
+    except ValueError as e:
+        outputs['implied_discount_rate'] = f"error: {e}"
+    return outputs
+
+
+def compute_golden(statements_dir):
+    results = {}
+    for ticker, path in discover_workbooks(statements_dir):
+        panel = load_panel(path)
+        results[ticker] = golden_outputs(golden_inputs(panel))
+    return results
+
+
+def _plain(value):
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return _plain(value.tolist())
+    return value
+
+
+def compare(expected, actual, path=''):
+    """List every difference between golden and current outputs beyond the tolerances"""
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict) or set(expected) != set(actual):
+            return [f"{path}: keys differ"]
+        return [diff for key in expected for diff in compare(expected[key], actual[key], f"{path}.{key}")]
+    if isinstance(expected, list):
+        if not isinstance(actual, list) or len(expected) != len(actual):
+            return [f"{path}: length differs"]
+        return [diff for i, (e, a) in enumerate(zip(expected, actual)) for diff in compare(e, a, f"{path}[{i}]")]
+    if isinstance(expected, float) or isinstance(actual, float):
+        if expected is None or actual is None:
+            return [] if expected == actual else [f"{path}: expected {expected}, got {actual}"]
+        if np.isnan(expected) and np.isnan(actual):
+            return []
+        if np.isclose(actual, expected, rtol=RTOL, atol=ATOL):
+            return []
+        return [f"{path}: expected {expected!r}, got {actual!r}"]
+    return [] if expected == actual else [f"{path}: expected {expected!r}, got {actual!r}"]
+
+
+def check_golden(statements_dir, update=False):
+    """Compare current outputs with ``dcf_golden.json`` (or rewrite it); returns the differences"""
+    actual = json.loads(json.dumps(_plain(compute_golden(statements_dir))))
+    if update or not os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH, 'w') as f:
+            json.dump(actual, f, indent=1, sort_keys=True)
+        print(f"Golden outputs for {len(actual)} tickers written to {GOLDEN_PATH}")
+        return []
+    with open(GOLDEN_PATH) as f:
+        expected = json.load(f)
+    return compare(expected, actual)
+
+
+def latencies(func, repeat):
+    """Per-call wall times in seconds"""
+    times = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def report(name, times, valuations_per_call=1):
+    p50, p90, p99 = np.percentile(times, [50, 90, 99]) * 1000
+    throughput = valuations_per_call * len(times) / times.sum()
+    print(f"{name:<34}{throughput:>14,.0f}/s{p50:>10.3f}{p90:>10.3f}{p99:>10.3f}")
+
+
+def run_benchmarks(kwargs, repeat, grid_size, monte_carlo):
+    print(f"{'benchmark':<34}{'valuations':>16}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+
+    report('dcf_valuation', latencies(lambda: dcf_valuation(**kwargs), repeat))
+
+    # Alternate two discount rates so every call re-runs the valuation nodes
+    graph = DCFGraph()
+    rates = itertools.cycle([kwargs['discount_rate'], kwargs['discount_rate'] + 0.01])
+    report('DCFGraph (discount rate change)',
+           latencies(lambda: graph.evaluate(**dict(kwargs, discount_rate=next(rates))), repeat))
+
+    rates = list(np.linspace(kwargs['terminal_growth'] + 0.01, kwargs['terminal_growth'] + 0.15, grid_size))
+    growths = list(np.linspace(0.0, kwargs['terminal_growth'], grid_size))
+    report(f'price_grid {grid_size}x{grid_size}',
+           latencies(lambda: price_grid(kwargs, rates, growths), max(repeat // 100, 3)), grid_size ** 2)
+
+    # Seeded random draws around the base case, valued in one vectorized batch
+    rng = np.random.default_rng(0)
+    draws = [dict(kwargs, revenue_growth=float(g), operating_margin=float(m), discount_rate=float(r))
+             for g, m, r in zip(rng.normal(kwargs['revenue_growth'], 0.03, monte_carlo),
+                                rng.normal(kwargs['operating_margin'], 0.03, monte_carlo),
+                                rng.uniform(kwargs['terminal_growth'] + 0.02, 0.15, monte_carlo))]
+    report(f'dcf_batch Monte Carlo ({monte_carlo:,})', latencies(lambda: dcf_batch(draws), max(repeat // 100, 3)),
+           monte_carlo)
+
+    # One base case plus four bumped scenarios per input
+    scenarios = 1 + 4 * len(price_sensitivities(kwargs))
+    report('price_sensitivities', latencies(lambda: price_sensitivities(kwargs), max(repeat // 10, 3)), scenarios)
+
+    target = dcf_valuation(**dict(kwargs, discount_rate=GOLDEN_TARGET_RATE))['price_per_share']
+    solve_kwargs = {name: value for name, value in kwargs.items() if name != 'discount_rate'}
+    report('solve_implied_discount_rate',
+           latencies(lambda: solve_implied_discount_rate(target, **solve_kwargs), max(repeat // 10, 3)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the DCF engine and check it against golden outputs.')
+    parser.add_argument('--statements-dir', default=os.path.join(SCRIPT_DIR, 'statements'),
+                        help='Folder containing one sub-folder per ticker')
+    parser.add_argument('--update-golden', action='store_true', help='Rewrite dcf_golden.json from the current code')
+    parser.add_argument('--golden-only', action='store_true', help='Only check the golden outputs')
+    parser.add_argument('--repeat', type=int, default=1000, help='Calls per single-valuation benchmark')
+    parser.add_argument('--grid-size', type=int, default=200, help='Discount rate / terminal growth grid size')
+    parser.add_argument('--monte-carlo', type=int, default=10000, help='Random scenarios per Monte Carlo batch')
+    args = parser.parse_args()
+
+    differences = check_golden(args.statements_dir, args.update_golden)
+    for difference in differences[:20]:
+        print(f"Golden mismatch {difference}")
+    if differences:
+        print(f"Error: {len(differences)} outputs differ from {GOLDEN_PATH}")
+    else:
+        print("Golden outputs match")
+
+    if not args.golden_only:
+        kwargs = model_inputs(dict(DEFAULT_PARAMETERS, base_revenue=10000.0, revenue_growth=8.0, operating_margin=15.0,
+                                   tax_rate=21.0, capex_percent=5.0, wc_percent=10.0,
+                                   shares_outstanding=GOLDEN_SHARES))
+        run_benchmarks(kwargs, args.repeat, args.grid_size, args.monte_carlo)
+
+    sys.exit(1 if differences else 0)
+
+
+if __name__ == "__main__":
+    main()
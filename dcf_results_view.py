@@ -0,0 +1,241 @@
+import tkinter as tk
+from tkinter import ttk
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+DETAIL_COLUMNS = ["Year", "Revenue", "EBIT", "Tax", "NOPAT", "CapEx", "WC Change", "FCF", "DCF"]
+
+
+class DCFResultsView(ttk.Frame):
+    """DCF Valuation tab contents, built once and updated in place on every recalculation.
+
+    The figure is a plain ``matplotlib.figure.Figure`` rather than ``plt.subplots`` so it
+    never enters pyplot's global registry; the bars, table rows and summary labels are
+    reused between runs and only rebuilt when the number of forecast years changes.
+    """
+
+    def __init__(self, master, on_edit=None, on_recalculate=None, on_export=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.bars = []
+        self.tv_bar = None
+        self.n_years = None
+
+        # Create main container for results and ensure fixed control panel at bottom
+        main_container = ttk.Frame(self)
+        main_container.pack(fill=tk.BOTH, expand=True)
+
+        # Control panel that will stay at bottom even when resized
+        control_panel = ttk.Frame(self)
+        control_panel.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+
+        ttk.Button(control_panel, text="Edit Parameters", command=on_edit).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(control_panel, text="Recalculate Valuation",
+                   command=on_recalculate).pack(side=tk.RIGHT, padx=5, pady=5)
+        ttk.Button(control_panel, text="Export Results", command=on_export).pack(side=tk.RIGHT, padx=5, pady=5)
+
+        results_frame = ttk.Frame(main_container)
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # Left panel for DCF summary
+        left_panel = ttk.Frame(results_frame)
+        left_panel.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        summary_frame = ttk.LabelFrame(left_panel, text="DCF Valuation Summary", padding=10)
+        summary_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.summary_labels = []
+        for row in range(6):
+            label = ttk.Label(summary_frame, text="")
+            label.grid(row=row, column=0, sticky="w", padx=5, pady=5)
+            self.summary_labels.append(label)
+
+        # FCF Projection Table
+        fcf_table_frame = ttk.LabelFrame(left_panel, text="Free Cash Flow Projections", padding=10)
+        fcf_table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self.fcf_table = ttk.Treeview(fcf_table_frame, columns=["Year", "FCF", "Present Value"])
+        self.fcf_table.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.fcf_table.column("#0", width=0, stretch=tk.NO)
+        self.fcf_table.column("Year", anchor=tk.W, width=100)
+        self.fcf_table.column("FCF", anchor=tk.E, width=150)
+        self.fcf_table.column("Present Value", anchor=tk.E, width=150)
+        self.fcf_table.heading("#0", text="", anchor=tk.W)
+        self.fcf_table.heading("Year", text="Year", anchor=tk.W)
+        self.fcf_table.heading("FCF", text="Free Cash Flow (millions)", anchor=tk.CENTER)
+        self.fcf_table.heading("Present Value", text="Present Value (millions)", anchor=tk.CENTER)
+
+        # Visualization
+        fig_frame = ttk.LabelFrame(left_panel, text="Cash Flow Visualization", padding=10)
+        fig_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self.figure = Figure(figsize=(8, 4))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=fig_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        # Right panel for the detailed table of the DCF calculation
+        right_panel = ttk.Frame(results_frame)
+        right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        table_frame = ttk.LabelFrame(right_panel, text="DCF Calculation Details", padding=10)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        self.detail_table = ttk.Treeview(table_frame, columns=DETAIL_COLUMNS)
+        self.detail_table.pack(fill=tk.BOTH, expand=True)
+        vsb = ttk.Scrollbar(self.detail_table, orient="vertical", command=self.detail_table.yview)
+        vsb.pack(side='right', fill='y')
+        self.detail_table.configure(yscrollcommand=vsb.set)
+        self.detail_table.column("#0", width=0, stretch=tk.NO)
+        for col in DETAIL_COLUMNS:
+            self.detail_table.column(col, anchor=tk.CENTER, width=100)
+            self.detail_table.heading(col, text=col, anchor=tk.CENTER)
+
+        self.fcf_items = []
+        self.detail_items = []
+
+    def update_results(self, model, debt, cash, shares_outstanding):
+        """Write a DCF model into the existing widgets and redraw the chart"""
+        n_years = len(model['years'])
+        if n_years != self.n_years:
+            self._rebuild_rows(n_years)
+
+        self._update_summary(model, debt, cash, shares_outstanding)
+        self._update_tables(model)
+        self._update_chart(model)
+
+    def _rebuild_rows(self, n_years):
+        """Recreate table rows and bars, only needed when the forecast length changes"""
+        self.n_years = n_years
+
+        # Forecast years, terminal value and total enterprise value
+        self.fcf_table.delete(*self.fcf_table.get_children())
+        self.fcf_items = [self.fcf_table.insert("", tk.END) for _ in range(n_years + 2)]
+        self.fcf_table.configure(height=n_years)
+
+        # Forecast years and terminal value
+        self.detail_table.delete(*self.detail_table.get_children())
+        self.detail_items = [self.detail_table.insert("", tk.END) for _ in range(n_years + 1)]
+
+        self.ax.clear()
+        years_labels = [f"Year {i+1}" for i in range(n_years)]
+        self.bars = list(self.ax.bar(years_labels, [0] * n_years, color='skyblue', label='FCF'))
+        self.tv_bar = self.ax.bar("Terminal Value", 0, color='orange', label='Terminal Value')[0]
+        self.ax.set_ylabel('Value (millions)')
+        self.ax.set_title('Forecasted Free Cash Flows')
+        self.ax.legend()
+
+    def _update_summary(self, model, debt, cash, shares_outstanding):
+        lines = [
+            f"Enterprise Value: ${model['ev']:.2f} million",
+            f"- Debt: ${debt:.2f} million",
+            f"+ Cash: ${cash:.2f} million",
+            f"= Equity Value: ${model['equity_value']:.2f} million",
+            f"÷ Shares Outstanding: {shares_outstanding:.2f} million",
+            f"= Price per Share: ${model['price_per_share']:.2f}",
+        ]
+        for label, text in zip(self.summary_labels, lines):
+            label.config(text=text)
+
+    def _update_tables(self, model):
+        fcf, dcf = model['fcf'], model['dcf']
+        for i in range(self.n_years):
+            self.fcf_table.item(self.fcf_items[i], values=(f"Year {i+1}", f"${fcf[i]:.2f}", f"${dcf[i]:.2f}"))
+            self.detail_table.item(self.detail_items[i], values=(
+                f"Year {i+1}",
+                f"${model['revenue'][i]:.2f}",
+                f"${model['ebit'][i]:.2f}",
+                f"${model['tax'][i]:.2f}",
+                f"${model['nopat'][i]:.2f}",
+                f"${model['capex'][i]:.2f}",
+                f"${model['wc_change'][i]:.2f}",
+                f"${fcf[i]:.2f}",
+                f"${dcf[i]:.2f}"
+            ))
+
+        terminal_value, discounted_tv = model['terminal_value'], model['discounted_tv']
+        self.fcf_table.item(self.fcf_items[-2], values=(
+            "Terminal Value", f"${terminal_value:.2f}", f"${discounted_tv:.2f}"))
+        self.fcf_table.item(self.fcf_items[-1], values=("Total Enterprise Value", "", f"${model['ev']:.2f}"))
+        self.detail_table.item(self.detail_items[-1], values=(
+            "Terminal Value", "-", "-", "-", "-", "-", "-", f"${terminal_value:.2f}", f"${discounted_tv:.2f}"))
+
+    def _update_chart(self, model):
+        for bar, value in zip(self.bars, model['fcf']):
+            bar.set_height(value)
+        self.tv_bar.set_height(model['terminal_value'])
+
+        # Rescale to the new bar heights without rebuilding the axes
+        self.ax.relim()
+        self.ax.autoscale_view()
+        self.canvas.draw_idle()
+
+    def destroy(self):
+        # Release the figure's artists explicitly; it is not tracked by pyplot
+        self.figure.clear()
+        super().destroy()
+
+
+class SensitivityView(ttk.Frame):
+    """Tornado chart and table of price-per-share sensitivities, built once and redrawn in place"""
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+
+        chart_frame = ttk.LabelFrame(self, text="Price per Share Sensitivity", padding=10)
+        chart_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.figure = Figure(figsize=(8, 4))
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvasTkAgg(self.figure, master=chart_frame)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        table_frame = ttk.LabelFrame(self, text="Sensitivities", padding=10)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        columns = ["Input", "Value", "dPrice / dInput", "Shock", "Price (Low)", "Price (High)"]
+        self.table = ttk.Treeview(table_frame, columns=columns, show="headings", height=11)
+        self.table.pack(fill=tk.BOTH, expand=True)
+        for col in columns:
+            self.table.column(col, anchor=tk.W if col == "Input" else tk.E, width=120)
+            self.table.heading(col, text=col)
+
+    @staticmethod
+    def format_input(value, is_rate):
+        if is_rate:
+            rates = value if isinstance(value, (tuple, list)) else [value]
+            return " / ".join(f"{rate*100:.2f}%" for rate in rates)
+        return f"{value:,.2f}"
+
+    def update_results(self, table, rate_inputs):
+        """Redraw the tornado chart and table for a ``price_sensitivities`` result"""
+        base_price = table.attrs['price_per_share']
+
+        self.table.delete(*self.table.get_children())
+        for row in table.itertuples(index=False):
+            is_rate = row.input in rate_inputs
+            self.table.insert("", tk.END, values=(
+                row.label,
+                self.format_input(row.value, is_rate),
+                f"{row.derivative / 100:,.4f} per pt" if is_rate else f"{row.derivative:,.4f}",
+                f"±{row.shock*100:.0f} pt" if is_rate else f"±{row.shock:,.2f}",
+                f"${row.price_low:,.2f}",
+                f"${row.price_high:,.2f}",
+            ))
+
+        # Largest swing at the top
+        ordered = table.iloc[::-1]
+        positions = range(len(ordered))
+        self.ax.clear()
+        self.ax.barh(positions, ordered['price_low'] - base_price, left=base_price, color='indianred',
+                     label='Input lowered')
+        self.ax.barh(positions, ordered['price_high'] - base_price, left=base_price, color='seagreen',
+                     label='Input raised')
+        self.ax.axvline(base_price, color='black', linewidth=1)
+        self.ax.set_yticks(list(positions))
+        self.ax.set_yticklabels(ordered['label'])
+        self.ax.set_xlabel('Price per Share ($)')
+        self.ax.set_title(f'Sensitivity around ${base_price:.2f} (rates ±1 pt, amounts ±10%)')
+        self.ax.legend(loc='lower right')
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+    def destroy(self):
+        self.figure.clear()
+        super().destroy()
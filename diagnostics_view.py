@@ -0,0 +1,81 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+SUMMARY_COLUMNS = ["Stage", "Calls", "Last (ms)", "Mean (ms)", "Median (ms)", "Max (ms)"]
+SPAN_COLUMNS = ["Started", "Stage", "Duration (ms)", "Thread", "Detail"]
+
+# Spans listed in the recent-activity table
+RECENT_SPANS = 200
+
+
+class DiagnosticsView(ttk.Frame):
+    """Stage timings from a ``Timings`` recorder: a per-stage summary and the most recent spans"""
+
+    def __init__(self, master, timings, **kwargs):
+        super().__init__(master, **kwargs)
+        self.timings = timings
+
+        controls = ttk.Frame(self)
+        controls.pack(fill=tk.X, pady=(0, 5))
+        ttk.Button(controls, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        self.verbose_var = tk.BooleanVar(value=timings.verbose)
+        ttk.Checkbutton(controls, text="Print debugging output", variable=self.verbose_var,
+                        command=self.toggle_verbose).pack(side=tk.LEFT, padx=5)
+        ttk.Button(controls, text="Save Timings (JSON)", command=self.save_json).pack(side=tk.RIGHT, padx=5)
+        if timings.profiler is not None:
+            ttk.Button(controls, text="Save Profile", command=self.save_profile).pack(side=tk.RIGHT, padx=5)
+
+        summary_frame = ttk.LabelFrame(self, text="Stages", padding=5)
+        summary_frame.pack(fill=tk.X, pady=5)
+        self.summary = ttk.Treeview(summary_frame, columns=SUMMARY_COLUMNS, show="headings", height=10)
+        self.summary.pack(fill=tk.X)
+        for col in SUMMARY_COLUMNS:
+            self.summary.column(col, anchor=tk.W if col == "Stage" else tk.E, width=220 if col == "Stage" else 110)
+            self.summary.heading(col, text=col)
+
+        spans_frame = ttk.LabelFrame(self, text="Recent Activity", padding=5)
+        spans_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        self.spans = ttk.Treeview(spans_frame, columns=SPAN_COLUMNS, show="headings")
+        scrollbar = ttk.Scrollbar(spans_frame, orient="vertical", command=self.spans.yview)
+        self.spans.configure(yscrollcommand=scrollbar.set)
+        self.spans.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        for col in SPAN_COLUMNS:
+            self.spans.column(col, anchor=tk.E if col == "Duration (ms)" else tk.W,
+                              width=260 if col in ("Stage", "Detail") else 120)
+            self.spans.heading(col, text=col)
+
+    def refresh(self):
+        self.summary.delete(*self.summary.get_children())
+        for row in self.timings.summary():
+            self.summary.insert("", tk.END, values=(
+                row['name'], row['calls'], f"{row['last_ms']:.1f}", f"{row['mean_ms']:.1f}",
+                f"{row['median_ms']:.1f}", f"{row['max_ms']:.1f}"))
+
+        # Newest first, children indented under the stage that called them
+        self.spans.delete(*self.spans.get_children())
+        for record in reversed(self.timings.recent(RECENT_SPANS)):
+            detail = ", ".join(f"{key}={value}" for key, value in record.items()
+                               if key not in ('name', 'started', 'duration_ms', 'depth', 'thread'))
+            self.spans.insert("", tk.END, values=(
+                record['started'][11:23], "    " * record['depth'] + record['name'],
+                f"{record['duration_ms']:.1f}", record['thread'], detail))
+
+    def toggle_verbose(self):
+        self.timings.verbose = self.verbose_var.get()
+
+    def save_json(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON Files", "*.json")])
+        if file_path:
+            try:
+                self.timings.write_json(file_path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save timings: {str(e)}")
+
+    def save_profile(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".prof", filetypes=[("Profile Files", "*.prof")])
+        if file_path:
+            try:
+                self.timings.write_profile(file_path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save profile: {str(e)}")
@@ -0,0 +1,120 @@
+import json
+import time
+import logging
+import cProfile
+import functools
+import threading
+import statistics
+import contextlib
+from collections import deque
+from datetime import datetime, timezone
+
+# Completed spans kept for the diagnostics panel and JSON output
+MAX_RECORDS = 2000
+
+
+class Timings:
+    """Wall-clock durations of named stages, safe to record from worker threads.
+
+    ``span(name)`` times a block; spans opened inside another span on the same thread are
+    recorded with their depth, so a load shows ``load_file`` and its ``load_data``,
+    ``calculate_historical_stats`` and ``prefill_forecast_parameters`` children.
+    ``log`` replaces debugging prints and only prints when ``verbose`` is set. With
+    ``profile`` set, the main thread runs under cProfile until ``write_profile``.
+    """
+
+    def __init__(self, verbose=False, profile=False):
+        self.verbose = verbose
+        self.records = deque(maxlen=MAX_RECORDS)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # Called with each finished top-level span, e.g. to refresh a diagnostics view
+        self.listeners = []
+        self.profiler = None
+        if profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def log(self, *args, **kwargs):
+        if self.verbose:
+            print(*args, **kwargs)
+
+    @contextlib.contextmanager
+    def span(self, name, **detail):
+        depth = getattr(self.local, 'depth', 0)
+        self.local.depth = depth + 1
+        started = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.local.depth = depth
+            record = {'name': name, 'started': started.isoformat(timespec='milliseconds'),
+                      'duration_ms': elapsed_ms, 'depth': depth, 'thread': threading.current_thread().name,
+                      **detail}
+            with self.lock:
+                self.records.append(record)
+            self.log(f"{'  ' * depth}{name}: {elapsed_ms:.1f} ms")
+            if depth == 0:
+                for listener in self.listeners:
+                    listener(record)
+
+    def recent(self, count=None):
+        """The most recent spans, newest last"""
+        with self.lock:
+            records = list(self.records)
+        return records if count is None else records[-count:]
+
+    def summary(self):
+        """Per-stage call count, last, mean, median and max duration in ms, in first-seen order"""
+        durations = {}
+        for record in self.recent():
+            durations.setdefault(record['name'], []).append(record['duration_ms'])
+        return [{'name': name, 'calls': len(values), 'last_ms': values[-1], 'mean_ms': statistics.mean(values),
+                 'median_ms': statistics.median(values), 'max_ms': max(values)}
+                for name, values in durations.items()]
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'summary': self.summary(), 'spans': self.recent()}, f, indent=1)
+
+    def capture_logging(self, *names):
+        """Route these loggers through ``log`` so their diagnostics follow ``verbose``; warnings always print"""
+        handler = TimingsLogHandler(self)
+        for name in names:
+            logger = logging.getLogger(name)
+            logger.addHandler(handler)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+
+    def write_profile(self, path):
+        """Dump the cProfile statistics collected so far (readable with ``pstats``)"""
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(path)
+            self.profiler.enable()
+
+
+class TimingsLogHandler(logging.Handler):
+    def __init__(self, timings):
+        super().__init__()
+        self.timings = timings
+
+    def emit(self, record):
+        message = self.format(record)
+        if record.levelno >= logging.WARNING:
+            print(message)
+        else:
+            self.timings.log(message)
+
+
+def timed(name):
+    """Method decorator recording each call as a span on the instance's ``timings``"""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.timings.span(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
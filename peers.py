@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from valuation_core import lookback_length, file_fingerprint
+from batch_valuation import discover_workbooks
+from comparables import ticker_profile
+
+# Group of every ticker in the statements folder, always available
+ALL_PEERS = "All tickers"
+
+# Ratio parameters that can be prefilled from peers (company-specific amounts never are)
+PEER_PARAMETERS = ['revenue_growth', 'operating_margin', 'tax_rate', 'capex_percent', 'wc_percent']
+
+# Peer statistics offered for the prefill, as percentiles across the group
+PEER_STATISTICS = {'median': 50, 'p25': 25, 'p75': 75}
+STATISTIC_LABELS = {'median': "median", 'p25': "25th percentile", 'p75': "75th percentile"}
+
+INDEX_VERSION = 1
+
+
+def statements_dir_for(file_path):
+    """The statements folder a consolidated workbook lives in: statements/<TICKER>/<workbook>"""
+    return os.path.dirname(os.path.dirname(os.path.abspath(file_path)))
+
+
+def load_peer_groups(statements_dir):
+    """Peer groups from ``statements/peer_groups.json`` (``{name: [tickers]}``) plus ``ALL_PEERS``"""
+    groups = {ALL_PEERS: [ticker for ticker, _ in discover_workbooks(statements_dir)]}
+    path = os.path.join(statements_dir, 'peer_groups.json')
+    if os.path.exists(path):
+        with open(path) as f:
+            groups.update({name: [ticker.upper() for ticker in tickers] for name, tickers in json.load(f).items()})
+    return groups
+
+
+def lookback_key(quarters):
+    """Index key for a lookback selection: its length in quarters, or "all" """
+    return str(lookback_length(quarters) or 'all')
+
+
+def peer_statistics(values, exclude=None):
+    """Count and 25th/50th/75th percentiles of each peer parameter across ``{ticker: params}``"""
+    tickers = [ticker for ticker in sorted(values) if ticker != exclude]
+    matrix = np.array([[values[ticker].get(name, np.nan) for name in PEER_PARAMETERS] for ticker in tickers],
+                      dtype=float).reshape(len(tickers), len(PEER_PARAMETERS))
+    stats = {}
+    for j, name in enumerate(PEER_PARAMETERS):
+        column = matrix[:, j][~np.isnan(matrix[:, j])]
+        stats[name] = {'count': int(len(column))}
+        for statistic, percentile in PEER_STATISTICS.items():
+            stats[name][statistic] = float(np.percentile(column, percentile)) if len(column) else None
+    return {'peers': tickers, 'parameters': stats}
+
+
+def blend_parameters(params, notes, stats, weight=1.0, statistic='median'):
+    """Move the prefilled ratios toward the peer statistic: ``(1 - weight) * own + weight * peer``.
+
+    Parameters the company's own history could not provide take the peer value outright.
+    Returns new ``(params, notes)``; parameters without peer data are left as they were.
+    """
+    params, notes = dict(params), dict(notes)
+    label = STATISTIC_LABELS[statistic]
+    count = len(stats['peers'])
+    for name in PEER_PARAMETERS:
+        peer = stats['parameters'][name][statistic]
+        if peer is None:
+            continue
+        own = params.get(name)
+        if own is None or weight >= 1:
+            params[name] = peer
+            notes[name] = f"(Peer {label} of {count} tickers)"
+        elif weight > 0:
+            params[name] = (1 - weight) * own + weight * peer
+            notes[name] = f"(Blend: own {own:.2f}%, peer {label} {peer:.2f}%, {weight*100:.0f}% peer)"
+    return params, notes
+
+
+class PeerIndex:
+    """Peer-group statistics of the prefilled parameters, cached on disk and keyed by peer group.
+
+    ``statements/peer_index.json`` holds each ticker's prefilled parameters per lookback and,
+    per peer group and lookback, the group's member fingerprints and statistics. A lookup only
+    stats the members' workbooks; the statistics are recomputed (re-reading only changed
+    tickers) when a member was added, removed or re-consolidated.
+    """
+
+    def __init__(self, statements_dir, path=None):
+        self.statements_dir = statements_dir
+        self.path = path or os.path.join(statements_dir, 'peer_index.json')
+        self.lock = threading.Lock()
+        self.data = self._read()
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                return data
+        except (OSError, ValueError):
+            pass
+        return {'version': INDEX_VERSION, 'profiles': {}, 'groups': {}}
+
+    def _write(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not write peer index {self.path}: {e}")
+
+    def _profile(self, ticker, file_path, quarters, fingerprint):
+        """A ticker's prefilled peer parameters, from the index while its workbook is unchanged"""
+        profiles = self.data['profiles'].setdefault(lookback_key(quarters), {})
+        cached = profiles.get(ticker)
+        if cached is None or cached['fingerprint'] != fingerprint:
+            row = ticker_profile(ticker, file_path, quarters)
+            params = {name: float(row[name]) for name in PEER_PARAMETERS
+                      if row['status'] == 'ok' and not pd.isna(row.get(name))}
+            cached = profiles[ticker] = {'fingerprint': fingerprint, 'params': params}
+        return cached['params']
+
+    def statistics(self, group, quarters="All available data", exclude=None):
+        """Statistics of ``group`` for a lookback selection, leaving out ``exclude`` (the company itself)"""
+        groups = load_peer_groups(self.statements_dir)
+        if group not in groups:
+            raise ValueError(f"Unknown peer group '{group}'")
+        workbooks = dict(discover_workbooks(self.statements_dir))
+        members = {ticker: list(file_fingerprint(workbooks[ticker])[1:])
+                   for ticker in groups[group] if ticker in workbooks}
+
+        with self.lock:
+            entries = self.data['groups'].setdefault(group, {})
+            entry = entries.get(lookback_key(quarters))
+            if entry is None or entry['members'] != members:
+                values = {ticker: self._profile(ticker, workbooks[ticker], quarters, fingerprint)
+                          for ticker, fingerprint in members.items()}
+                entry = entries[lookback_key(quarters)] = {'members': members, 'values': values,
+                                                           'stats': peer_statistics(values)}
+                self._write()
+        if exclude in entry['values']:
+            return peer_statistics(entry['values'], exclude)
+        return entry['stats']
+
+
+def statistics_table(stats):
+    """Peer statistics as a parameter-indexed DataFrame"""
+    return pd.DataFrame.from_dict(stats['parameters'], orient='index')[['count', *PEER_STATISTICS]]
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Show (and refresh the index of) peer-group parameter statistics.')
+    parser.add_argument('group', nargs='?', default=ALL_PEERS, help=f'Peer group (default: "{ALL_PEERS}")')
+    parser.add_argument('--statements-dir', default=os.path.join(script_dir, 'statements'),
+                        help='Folder containing one sub-folder per ticker and optionally peer_groups.json')
+    parser.add_argument('--quarters', default="All available data",
+                        help='Lookback used for the prefill: 4, 8, 12 or 16 quarters, or "all" (default)')
+    parser.add_argument('--exclude', help='Leave this ticker out of its peers')
+    args = parser.parse_args()
+    try:
+        lookback_length(args.quarters)
+    except ValueError as e:
+        parser.error(str(e))
+
+    index = PeerIndex(args.statements_dir)
+    try:
+        stats = index.statistics(args.group, args.quarters, args.exclude.upper() if args.exclude else None)
+    except ValueError as e:
+        print(f"Error: {e}; groups: {', '.join(load_peer_groups(args.statements_dir))}")
+        sys.exit(1)
+    print(f"{args.group} ({len(stats['peers'])} tickers: {', '.join(stats['peers'])})")
+    with pd.option_context('display.float_format', '{:,.2f}'.format):
+        print(statistics_table(stats).to_string())
+
+
+if __name__ == "__main__":
+    main()
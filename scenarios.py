@@ -0,0 +1,65 @@
+import os
+import re
+import json
+
+import pandas as pd
+
+from valuation_core import DEFAULT_PARAMETERS, value_parameter_sets
+
+# Everything the forecast form holds, in form units (percentages, millions)
+SCENARIO_FIELDS = list(DEFAULT_PARAMETERS) + ['current_share_price']
+
+SCENARIO_COLUMNS = ['scenario', 'status', 'enterprise_value', 'equity_value', 'price_per_share']
+
+
+def ticker_from_path(file_path):
+    """Ticker for a consolidated workbook, from consolidated_statements_<TICKER>.xlsx or its folder name"""
+    match = re.match(r'consolidated_statements_(.+)\.\w+$', os.path.basename(file_path))
+    if match:
+        return match.group(1).upper()
+    return os.path.basename(os.path.dirname(os.path.abspath(file_path))).upper()
+
+
+def scenario_path(file_path):
+    """Scenario file stored next to the workbook: statements/<TICKER>/scenarios_<TICKER>.json"""
+    return os.path.join(os.path.dirname(os.path.abspath(file_path)), f"scenarios_{ticker_from_path(file_path)}.json")
+
+
+def load_scenarios(path):
+    """Read ``{name: {field: value}}`` from a scenario file; a missing file means no scenarios"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get('scenarios', {})
+
+
+def save_scenarios(path, scenarios, ticker=None):
+    # One compact JSON document per ticker; unset fields are left out
+    compact = {name: {field: value for field, value in params.items() if value is not None}
+               for name, params in scenarios.items()}
+    with open(path, 'w') as f:
+        json.dump({'ticker': ticker, 'scenarios': compact}, f, separators=(',', ':'), sort_keys=True)
+
+
+def evaluate_scenarios(scenarios, default_base_revenue=None):
+    """Value every scenario in one vectorized batch and return a side-by-side results table.
+
+    Missing fields fall back to ``DEFAULT_PARAMETERS``; an empty base revenue uses
+    ``default_base_revenue``. Scenarios with invalid inputs are reported in ``status``.
+    """
+    rows = []
+    for name, params in scenarios.items():
+        inputs = dict(DEFAULT_PARAMETERS)
+        inputs.update({field: value for field, value in params.items() if value is not None})
+        if inputs.get('base_revenue') is None:
+            inputs['base_revenue'] = default_base_revenue
+        rows.append({'scenario': name, **inputs})
+
+    results, errors = value_parameter_sets(rows, missing_revenue="Could not find revenue data; enter a base revenue")
+    for i, (row, error) in enumerate(zip(rows, errors)):
+        row['status'] = 'ok' if error is None else f"error: {error}"
+        if error is None:
+            row.update({name: values[i] for name, values in results.items()})
+
+    table = pd.DataFrame(rows, columns=SCENARIO_COLUMNS + [f for f in SCENARIO_FIELDS if f not in SCENARIO_COLUMNS])
+    return table
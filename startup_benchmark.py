@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Entry points and whether they must stay free of GUI/plotting imports
+ENTRY_POINTS = [
+    ('valuation_core', True),
+    ('scenarios', True),
+    ('valuation_history', True),
+    ('batch_valuation', True),
+    ('consolidator2', True),
+    ('valuation_server', True),
+    ('comparables', True),
+    ('peers', True),
+    ('calculate_valuation', False),
+]
+
+# Modules that are expensive to import and only needed by some code paths
+HEAVY_MODULES = ['tkinter', 'matplotlib', 'openpyxl', 'pandas', 'numpy']
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'import_s': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=5):
+    """Import ``module`` in ``repeat`` fresh interpreters; returns median import and process times"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    import_times, process_times = [], []
+    loaded = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=script_dir, capture_output=True, text=True, check=True).stdout
+        process_times.append(time.perf_counter() - start)
+        result = json.loads(output.strip().splitlines()[-1])
+        import_times.append(result['import_s'])
+        loaded = result['loaded']
+    return statistics.median(import_times), statistics.median(process_times), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup (import) time of each entry point.')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per entry point')
+    args = parser.parse_args()
+
+    print(f"{'module':<22}{'import':>10}{'process':>10}  heavy modules loaded")
+    failures = []
+    for module, headless in ENTRY_POINTS:
+        import_s, process_s, loaded = measure(module, args.repeat)
+        print(f"{module:<22}{import_s*1000:>8.0f}ms{process_s*1000:>8.0f}ms  {', '.join(loaded) or '-'}")
+        leaked = [m for m in ('tkinter', 'matplotlib') if m in loaded]
+        if headless and leaked:
+            failures.append(f"{module} imports {', '.join(leaked)} on its headless path")
+
+    for failure in failures:
+        print(f"Error: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
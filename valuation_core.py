@@ -0,0 +1,1536 @@
+import os
+import sys
+import logging
+import zipfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Loading diagnostics and fallbacks; silent unless a front end asks for them (--verbose)
+logger = logging.getLogger(__name__)
+
+
+def verbose_logging():
+    """Print this module's diagnostics to stdout, as the command-line tools do with --verbose"""
+    logging.basicConfig(format='%(message)s', stream=sys.stdout)
+    logger.setLevel(logging.DEBUG)
+
+
+# Default forecast inputs, in the same units the forecast form uses
+# (percentages for rates, millions for currency amounts)
+DEFAULT_PARAMETERS = {
+    'base_revenue': None,
+    'revenue_growth': 5.0,
+    'operating_margin': 20.0,
+    'tax_rate': 25.0,
+    'capex_percent': 3.0,
+    'wc_percent': 5.0,
+    'discount_rate': 10.0,
+    'terminal_growth': 2.0,
+    'forecast_years': 5,
+    'shares_outstanding': None,
+    'current_debt': 0.0,
+    'cash_equivalents': 0.0,
+}
+
+# Parameters entered as percentages on the forecast form
+PERCENT_PARAMETERS = ['revenue_growth', 'operating_margin', 'tax_rate', 'capex_percent',
+                      'wc_percent', 'discount_rate', 'terminal_growth']
+
+# Rates that may also be given as a per-year schedule: a list of rates, or text such as
+# "30, 25, 20" (per year) or "30>5" (linear fade over the horizon, "30>5:3" over 3 years)
+SCHEDULE_PARAMETERS = ['revenue_growth', 'operating_margin', 'capex_percent', 'wc_percent']
+
+GROWTH_ROWS = ['Revenue Y/Y Growth', 'Revenue Growth Y/Y', 'Revenue Growth YoY', 'Revenue YoY Growth']
+CAPEX_KEYS = ['Purchase of PP&E', 'CapEx', 'Capital Expenditure', 'Capital Expenditures',
+              'Purchase of Investment', 'Acquisitions']
+ASSET_FIELDS = ['Current Assets', 'Total Current Assets']
+LIABILITY_FIELDS = ['Current Liabilities', 'Total Current Liabilities']
+SHARE_FIELDS = ['Shares Outstanding', 'shares outstanding']
+
+# Accounts pulled from the most recent yearly (FY) column
+LATEST_YEAR_METRICS = {
+    'Revenue': ['Revenue', 'Total Revenue'],
+    'Operating Income': ['Operating Income', 'Operating Profit'],
+    'Income Taxes': ['Income Taxes', 'Tax Expense', 'Income Tax Expense'],
+    'Pretax Income': ['Pretax Income', 'Income Before Tax', 'EBT'],
+    'Current Assets': ['Current Assets', 'Total Current Assets'],
+    'Current Liabilities': ['Current Liabilities', 'Total Current Liabilities'],
+    'Cash & Equivalents': ['Cash & Equivalents', 'Cash and Cash Equivalents', 'Cash'],
+    'Long Term Debt': ['Long Term Debt', 'Long-Term Debt'],
+    'Short Term Debt': ['Short Term Debt', 'Short-Term Debt'],
+    'Purchase of PP&E': CAPEX_KEYS,
+}
+
+
+def read_statement(file_path):
+    """Read a consolidated statement file without assuming a header row"""
+    if file_path.endswith(('.xlsx', '.xls')):
+        # For Excel files, don't specify a header row initially
+        return pd.read_excel(file_path, header=None)
+    return pd.read_csv(file_path, skipinitialspace=True)
+
+
+QUARTER_PATTERN = r'^Q(\d) (20\d\d)'
+FY_PATTERN = r'^FY\s*(?:20)?(\d\d)'
+
+
+def parse_periods(columns):
+    """Parse column labels once into a period index.
+
+    Returns a frame with one row per column (in column order) holding the label, its
+    kind (``'Q'``, ``'FY'`` or ``None``), the calendar year and the quarter number.
+    """
+    labels = pd.Series(list(columns), dtype=object)
+    text = labels.where(labels.map(lambda x: isinstance(x, str)), '').astype(str)
+    quarters = text.str.extract(QUARTER_PATTERN)
+    fiscal = text.str.extract(FY_PATTERN)
+
+    is_quarter = quarters[0].notna()
+    is_fy = fiscal[0].notna() & ~is_quarter
+    year = pd.Series(pd.NA, index=labels.index, dtype='Int64')
+    year[is_quarter] = quarters.loc[is_quarter, 1].astype(int)
+    year[is_fy] = 2000 + fiscal.loc[is_fy, 0].astype(int)
+
+    periods = pd.DataFrame({
+        'label': labels,
+        'kind': np.where(is_quarter, 'Q', np.where(is_fy, 'FY', None)),
+        'year': year,
+        'quarter': pd.to_numeric(quarters[0]).astype('Int64'),
+    })
+    return periods
+
+
+def clean_statement(df):
+    """Turn a raw consolidated sheet into an account-indexed numeric frame.
+
+    Returns the cleaned frame, its quarter columns in chronological order and the
+    parsed period index of its columns (see ``parse_periods``).
+    """
+    if df.empty:
+        return df, [], parse_periods([])
+
+    # Find where the quarter headers are (usually row 3, index 2) in one pass over the first 5 rows
+    head = df.iloc[:5].stack()
+    head = head[head.map(lambda cell: isinstance(cell, str))]
+    hits = head[head.astype(str).str.strip().str.match(r'Q\d 20\d\d')]
+    header_row = hits.index.get_level_values(0).min() if not hits.empty else 2
+
+    # Use the identified row as column headers
+    header = [str(x).strip() if isinstance(x, str) else x for x in df.iloc[header_row]]
+    body = df.iloc[header_row+1:]
+
+    # Find the Account column (first column containing text data)
+    account_pos = 0  # Default to first column
+    for i, dtype in enumerate(body.dtypes):
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            account_pos = i
+            break
+
+    accounts = body.iloc[:, account_pos].replace(['', 'nan', 'NaN', 'None'], np.nan)
+    value_positions = [i for i in range(len(header)) if i != account_pos]
+
+    # Convert every value column to float in a single vectorized step
+    raw_values = body.iloc[:, value_positions].to_numpy(dtype=object)
+    values = pd.to_numeric(raw_values.ravel(), errors='coerce').astype(float).reshape(raw_values.shape)
+
+    columns = [header[i] for i in value_positions]
+    cleaned = pd.DataFrame(values, columns=columns,
+                           index=pd.Index(accounts.to_numpy(), name=header[account_pos]))
+
+    # Sort quarter columns chronologically from the parsed period index
+    periods = parse_periods(columns)
+    quarter_rows = periods[periods['kind'] == 'Q'].sort_values(['year', 'quarter'], kind='stable')
+    quarter_cols = quarter_rows['label'].tolist()
+
+    if quarter_cols:
+        logger.debug(f"Found {len(quarter_cols)} quarter columns: {quarter_cols}")
+    else:
+        logger.info("No quarter columns (Q# YYYY format) found in the data")
+
+    return cleaned, quarter_cols, periods
+
+
+# Bumped whenever the sidecar layout or the cleaning rules change, invalidating old sidecars
+SIDECAR_VERSION = 1
+
+
+def sidecar_path(file_path):
+    """Cleaned-data sidecar stored next to a workbook: consolidated_statements_<TICKER>.panel.npz"""
+    return os.path.splitext(file_path)[0] + '.panel.npz'
+
+
+def _encode_labels(items):
+    """Labels as a string array plus a missing-value mask; None if any label is not a string or NaN"""
+    items = list(items)
+    missing = np.array([not isinstance(item, str) for item in items], dtype=bool)
+    if any(not (isinstance(item, str) or pd.isna(item)) for item in items):
+        return None
+    return np.array([item if isinstance(item, str) else '' for item in items], dtype=str), missing
+
+
+def _decode_labels(text, missing):
+    return [np.nan if gone else str(item) for item, gone in zip(text, missing)]
+
+
+def write_sidecar(file_path, df, quarter_cols):
+    """Save a cleaned statement next to its workbook, tagged with the workbook's size and mtime.
+
+    Written to a temporary file and renamed into place so concurrent readers never see a
+    partial file. Returns the sidecar path, or None when the labels cannot be stored.
+    """
+    encoded = [_encode_labels(labels) for labels in (df.index, df.columns, [df.index.name])]
+    if any(labels is None for labels in encoded):
+        return None
+    (accounts, accounts_missing), (columns, columns_missing), (name, name_missing) = encoded
+
+    stat = os.stat(file_path)
+    path = sidecar_path(file_path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        np.savez(f, version=np.array(SIDECAR_VERSION), source=np.array([stat.st_size, stat.st_mtime_ns]),
+                 values=df.to_numpy(dtype=float), accounts=accounts, accounts_missing=accounts_missing,
+                 columns=columns, columns_missing=columns_missing, index_name=name,
+                 index_name_missing=name_missing, quarter_cols=np.array(quarter_cols, dtype=str))
+    os.replace(temp_path, path)
+    return path
+
+
+def read_sidecar(file_path):
+    """Cleaned ``(df, quarter_cols, periods)`` from a workbook's sidecar, or None if missing or stale"""
+    path = sidecar_path(file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        stat = os.stat(file_path)
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != SIDECAR_VERSION or data['source'].tolist() != [stat.st_size, stat.st_mtime_ns]:
+                return None
+            columns = _decode_labels(data['columns'], data['columns_missing'])
+            index = pd.Index(_decode_labels(data['accounts'], data['accounts_missing']), dtype=object,
+                             name=_decode_labels(data['index_name'], data['index_name_missing'])[0])
+            df = pd.DataFrame(data['values'], index=index, columns=columns)
+            quarter_cols = data['quarter_cols'].tolist()
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    logger.debug(f"Loaded {len(quarter_cols)} quarter columns from {os.path.basename(path)}")
+    return df, quarter_cols, parse_periods(columns)
+
+
+def load_statement(file_path, use_sidecar=True):
+    """Read and clean a consolidated statement file.
+
+    Workbooks are loaded from their ``.panel.npz`` sidecar when it is up to date; otherwise
+    the workbook is read and cleaned and the sidecar is (re)written for the next load.
+    """
+    is_workbook = file_path.endswith(('.xlsx', '.xls'))
+    if use_sidecar and is_workbook:
+        loaded = read_sidecar(file_path)
+        if loaded is not None:
+            return loaded
+
+    loaded = clean_statement(read_statement(file_path))
+    if use_sidecar and is_workbook:
+        try:
+            write_sidecar(file_path, loaded[0], loaded[1])
+        except OSError as e:
+            logger.warning(f"Could not write sidecar for {file_path}: {e}")
+    return loaded
+
+
+def refresh_sidecar(file_path):
+    """Rebuild a workbook's sidecar from the workbook itself, e.g. right after writing it"""
+    df, quarter_cols, _ = load_statement(file_path, use_sidecar=False)
+    return write_sidecar(file_path, df, quarter_cols)
+
+
+def load_panel(file_path):
+    """Read and clean a consolidated statement file into a ``StatementPanel``"""
+    df, quarter_cols, periods = load_statement(file_path)
+    return StatementPanel(df, periods, quarter_cols)
+
+
+# Lookback lengths (in quarters) offered on the forecast form, plus the 20-quarter statistics default
+LOOKBACK_LENGTHS = (4, 8, 12, 16, 20)
+
+
+def lookback_length(selection):
+    """Quarters in a lookback selection such as "8 quarters (2 years)" or "8", or None for all available data.
+
+    Only the form's lookbacks (4, 8, 12 or 16 quarters) and "all"/"All available data" are accepted.
+    """
+    selection = str(selection).strip()
+    if selection.lower() in ('all', 'all available data'):
+        return None
+    count = selection.split(' quarters', 1)[0]
+    if count.isdigit() and int(count) in LOOKBACK_LENGTHS[:-1]:
+        return int(count)
+    raise ValueError(f"Unsupported lookback '{selection}'; use 4, 8, 12 or 16 quarters, or 'all'")
+
+
+def select_quarters(quarter_cols, selection):
+    """Return the trailing quarters for a lookback selection such as "8 quarters (2 years)"."""
+    count = lookback_length(selection)
+    quarters_to_use = len(quarter_cols) if count is None else min(count, len(quarter_cols))
+    return quarter_cols[-quarters_to_use:] if quarters_to_use > 0 else quarter_cols
+
+
+# Accounts reported as the most recent quarterly values in the historical statistics
+LATEST_QUARTER_KEYS = {
+    'Revenue': ['Revenue'],
+    'Operating Income': ['Operating Income'],
+    'Income Taxes': ['Income Taxes'],
+    'Pretax Income': ['Pretax Income'],
+    'Current Assets': ['Current Assets'],
+    'Current Liabilities': ['Current Liabilities'],
+    'Cash & Equivalents': ['Cash & Equivalents', 'Cash and Equivalents', 'Cash and Cash Equivalents'],
+    'Long Term Debt': ['Long Term Debt', 'Long-Term Debt'],
+    'Short Term Debt': ['Short Term Debt', 'Short-Term Debt'],
+    'Purchase of PP&E': ['Purchase of PP&E', 'CapEx', 'Capital Expenditure', 'Purchase of Investment', 'Acquisitions'],
+}
+
+
+class StatementPanel:
+    """Accounts x periods float array with parsed period vectors, built once per file load.
+
+    Rows follow the cleaned frame's accounts (the first row wins for duplicated names),
+    columns follow its period labels. ``year`` and ``quarter`` are integer vectors aligned
+    with the columns (0 where a label has no year/quarter).
+    """
+
+    def __init__(self, df, periods, quarter_cols):
+        self.values = df.to_numpy(dtype=float)
+        self.labels = list(df.columns)
+        self.kind = periods['kind'].to_numpy(dtype=object)
+        self.year = periods['year'].fillna(0).to_numpy(dtype=int)
+        self.quarter = periods['quarter'].fillna(0).to_numpy(dtype=int)
+        self.quarter_cols = list(quarter_cols)
+
+        self.rows = {}
+        for i, account in enumerate(df.index):
+            if isinstance(account, str) and account not in self.rows:
+                self.rows[account] = i
+        self.positions = {}
+        for i, label in enumerate(self.labels):
+            if isinstance(label, str) and label not in self.positions:
+                self.positions[label] = i
+
+        self.quarter_pos = self.columns(self.quarter_cols)
+        self.fy_pos = np.flatnonzero(self.kind == 'FY')
+
+    @classmethod
+    def from_frame(cls, df, quarter_cols=None, periods=None):
+        """Build a panel from an already cleaned frame"""
+        if periods is None:
+            periods = parse_periods(df.columns)
+        if quarter_cols is None:
+            quarter_rows = periods[periods['kind'] == 'Q'].sort_values(['year', 'quarter'], kind='stable')
+            quarter_cols = quarter_rows['label'].tolist()
+        return cls(df, periods, quarter_cols)
+
+    def __contains__(self, account):
+        return account in self.rows
+
+    def columns(self, labels):
+        """Column positions for a list of period labels"""
+        return np.array([self.positions[label] for label in labels], dtype=int)
+
+    def row(self, account, labels=None):
+        """Values of one account, for all columns or the given labels"""
+        values = self.values[self.rows[account]]
+        return values if labels is None else values[self.columns(labels)]
+
+    def latest(self, keys, labels):
+        """Most recent non-NaN value among ``labels`` for the first of ``keys`` that has one"""
+        pos = self.columns(labels)
+        for key in keys:
+            if key in self.rows:
+                values = self.values[self.rows[key], pos]
+                valid = np.flatnonzero(~np.isnan(values))
+                if len(valid):
+                    return values[valid[-1]], key, labels[valid[-1]]
+        return None, None, None
+
+    def annual_totals(self, account):
+        """Sum quarterly values into calendar years that have all four quarters"""
+        pos = self.quarter_pos
+        if account not in self.rows or not len(pos):
+            return np.array([], dtype=int), np.array([])
+        values = self.values[self.rows[account], pos]
+        valid = ~np.isnan(values)
+        years, inverse = np.unique(self.year[pos], return_inverse=True)
+        counts = np.bincount(inverse, weights=valid, minlength=len(years))
+        totals = np.bincount(inverse, weights=np.where(valid, values, 0.0), minlength=len(years))
+        complete = counts == 4
+        return years[complete], totals[complete]
+
+    def subset(self, positions, quarter_cols):
+        """Panel restricted to the columns at ``positions``, with ``quarter_cols`` as its quarters"""
+        panel = object.__new__(StatementPanel)
+        positions = np.asarray(positions, dtype=int)
+        panel.values = self.values[:, positions]
+        panel.labels = [self.labels[i] for i in positions]
+        panel.kind = self.kind[positions]
+        panel.year = self.year[positions]
+        panel.quarter = self.quarter[positions]
+        panel.quarter_cols = list(quarter_cols)
+        panel.rows = self.rows
+        panel.positions = {}
+        for i, label in enumerate(panel.labels):
+            if isinstance(label, str) and label not in panel.positions:
+                panel.positions[label] = i
+        panel.quarter_pos = panel.columns(panel.quarter_cols)
+        panel.fy_pos = np.flatnonzero(panel.kind == 'FY')
+        return panel
+
+
+def annual_growth(totals):
+    """Year-over-year growth in % between consecutive annual totals (NaN where the prior year is not positive)"""
+    prev, curr = totals[:-1], totals[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(prev > 0, (curr / prev - 1) * 100, np.nan)
+
+
+def latest_year_data(panel):
+    """Collect key metrics from the most recent yearly (FY) column"""
+    data = {}
+    if not len(panel.fy_pos):
+        logger.debug("No yearly (FY) columns found in the data")
+        return data
+
+    most_recent_yearly = panel.fy_pos[np.argmax(panel.year[panel.fy_pos])]
+    for metric, keys in LATEST_YEAR_METRICS.items():
+        for key in keys:
+            if key in panel:
+                value = panel.values[panel.rows[key], most_recent_yearly]
+                if not np.isnan(value):
+                    data[metric] = value
+                    break
+    return data
+
+
+def _window_matrix(n, windows):
+    """Boolean (windows x quarters) membership matrix for (start, end) quarter ranges"""
+    starts = np.array([start for start, _ in windows], dtype=int)
+    ends = np.array([end for _, end in windows], dtype=int)
+    idx = np.arange(n)
+    return (idx >= starts[:, None]) & (idx < ends[:, None])
+
+
+def _window_means(membership, values, valid):
+    """Mean of ``values`` over each window, counting only ``valid`` cells"""
+    cells = membership & valid
+    counts = cells.sum(axis=1)
+    sums = np.where(cells, values, 0.0).sum(axis=1)
+    means = np.divide(sums, counts, out=np.full(len(counts), np.nan), where=counts > 0)
+    return means, counts
+
+
+def _window_last(membership, values):
+    """Last non-NaN value (and its quarter position) inside each window"""
+    cells = membership & ~np.isnan(values)
+    found = cells.any(axis=1)
+    last = cells.shape[1] - 1 - np.argmax(cells[:, ::-1], axis=1)
+    return np.where(found, values[last], np.nan), np.where(found, last, -1)
+
+
+def _ratio(num, den, positive=True):
+    """Elementwise num/den in % and the cells where it is defined"""
+    valid = ~np.isnan(num) & ~np.isnan(den) & ((den > 0) if positive else (den != 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(valid, num / den * 100, np.nan), valid
+
+
+def _first_with_data(candidates):
+    """Per window, take the first candidate (means, counts) that has any data"""
+    means = np.full(len(candidates[0][0]), np.nan)
+    counts = np.zeros(len(candidates[0][0]), dtype=int)
+    for cand_means, cand_counts in candidates:
+        take = (counts == 0) & (cand_counts > 0)
+        means[take] = cand_means[take]
+        counts[take] = cand_counts[take]
+    return means, counts
+
+
+class HistoricalPanel:
+    """The window-independent part of the historical statistics, computed once per file load.
+
+    Wraps a ``StatementPanel`` (accounts and parsed periods) with the accounts resolved from
+    each alias list, the quarterly rows the statistics read, complete-year revenue totals and
+    growth, and the latest yearly (FY) values. ``window_statistics``, ``LookbackCache`` and the
+    valuation window's statistics and prefill all share one instance instead of re-resolving
+    accounts and re-aggregating years on every call.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.growth_row = next((row for row in GROWTH_ROWS if row in panel), None)
+        self.capex_fields = [field for field in CAPEX_KEYS if field in panel]
+        self.share_field = next((field for field in SHARE_FIELDS if field in panel), None)
+        self.wc_pairs = [(a, l) for a in ASSET_FIELDS for l in LIABILITY_FIELDS if a in panel and l in panel]
+        self.quarter_rows = {}
+
+        self.latest_data = latest_year_data(panel)
+        self.years, self.annual_revenue = panel.annual_totals('Revenue')
+        self.growth_rates = annual_growth(self.annual_revenue)
+        valid_growth = self.growth_rates[~np.isnan(self.growth_rates)]
+        self.avg_growth = float(valid_growth.mean()) if len(valid_growth) else None
+        self._annual_fallback = None
+
+    def __contains__(self, account):
+        return account in self.panel
+
+    @property
+    def quarter_cols(self):
+        return self.panel.quarter_cols
+
+    def quarter_row(self, account):
+        """Quarterly values of an account (NaN when the sheet does not have it)"""
+        if account not in self.quarter_rows:
+            panel = self.panel
+            self.quarter_rows[account] = (panel.values[panel.rows[account], panel.quarter_pos] if account in panel
+                                          else np.full(len(panel.quarter_pos), np.nan))
+        return self.quarter_rows[account]
+
+    def annual_revenue_growth(self):
+        """Most recent complete-year revenue growth, used when a window itself has no YoY pairs"""
+        if self._annual_fallback is None:
+            growth = self.growth_rates[~np.isnan(self.growth_rates)]
+            if len(growth):
+                self._annual_fallback = float(growth[-1]), f"(Using most recent: {growth[-1]:.2f}%)"
+            else:
+                logger.info("No complete years for annual growth calculation, using default growth rate")
+                self._annual_fallback = 5.0, "(Default value - no historical data available)"
+        return self._annual_fallback
+
+
+def historical_panel(panel):
+    """``panel`` as a ``HistoricalPanel``, building one around a plain ``StatementPanel``"""
+    return panel if isinstance(panel, HistoricalPanel) else HistoricalPanel(panel)
+
+
+def window_statistics(panel, windows):
+    """Forecast parameters and historical statistics for many quarter windows in one vectorized pass.
+
+    ``panel`` is a ``HistoricalPanel`` (or a ``StatementPanel``, wrapped on the fly) and
+    ``windows`` are ``(start, end)`` ranges over its ``quarter_cols`` (end exclusive). Returns
+    one ``{'params', 'notes', 'stats'}`` dict per window plus the latest yearly data shared by all.
+    """
+    history = historical_panel(panel)
+    panel = history.panel
+    q = panel.quarter_pos
+    n = len(q)
+    membership = _window_matrix(n, windows)
+    k = len(windows)
+    quarter_row = history.quarter_row
+
+    revenue = quarter_row('Revenue')
+    has_revenue = 'Revenue' in panel
+    columns = {}
+    counts = {}
+
+    # Base revenue (annual) from the average positive quarter
+    columns['base_revenue'], counts['base_revenue'] = _window_means(membership, revenue * 4, revenue > 0)
+
+    # Revenue growth from a Y/Y growth row if the sheet has one
+    growth_row = history.growth_row
+    growth_counts = np.zeros(k, dtype=int)
+    if growth_row:
+        growth = quarter_row(growth_row)
+        # If it's likely a decimal (e.g. 0.05 for 5%), convert to percentage
+        growth = np.where(np.abs(growth) < 1, growth * 100, growth)
+        growth_means, growth_counts = _window_means(membership, growth, ~np.isnan(growth))
+
+    # Otherwise: same quarter of consecutive years that happen to be adjacent in the window
+    prev, curr = revenue[:-1], revenue[1:]
+    pair_valid = ((panel.quarter[q][1:] == panel.quarter[q][:-1]) & (panel.year[q][1:] > panel.year[q][:-1]) &
+                  ~np.isnan(prev) & ~np.isnan(curr) & (prev > 0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pair_growth = (curr / prev - 1) * 100
+    pair_means, pair_counts = _window_means(membership[:, 1:] & membership[:, :-1], pair_growth, pair_valid)
+
+    # Operating margin, tax rate and CapEx averaged over each window
+    margin, margin_valid = _ratio(quarter_row('Operating Income'), revenue)
+    columns['operating_margin'], counts['operating_margin'] = _window_means(membership, margin, margin_valid)
+    tax, tax_valid = _ratio(quarter_row('Income Taxes'), quarter_row('Pretax Income'))
+    columns['tax_rate'], counts['tax_rate'] = _window_means(membership, tax, tax_valid)
+    capex_candidates = [_window_means(membership, *_ratio(np.abs(quarter_row(field)), revenue))
+                        for field in history.capex_fields]
+    if capex_candidates and has_revenue:
+        columns['capex_percent'], counts['capex_percent'] = _first_with_data(capex_candidates)
+
+    # Historical statistics keep quarters with a zero-or-negative denominator
+    stat_margin = _window_means(membership, *_ratio(quarter_row('Operating Income'), revenue, positive=False))
+    stat_tax = _window_means(membership, *_ratio(quarter_row('Income Taxes'), quarter_row('Pretax Income'),
+                                                 positive=False))
+
+    # Shares: most recent value inside the window from the first share field present
+    share_field = history.share_field
+    if share_field:
+        shares, share_pos = _window_last(membership, quarter_row(share_field))
+
+    # Working capital over the FY columns covering the window's years, else the window's quarters
+    fy = panel.fy_pos
+    if len(fy):
+        fy_year = panel.year[fy]
+        fy_member = (membership.astype(int) @ (panel.year[q][:, None] == fy_year[None, :])) > 0
+        # Windows matching no FY column use up to 3 of the most recent years
+        recent = np.zeros(len(fy), dtype=bool)
+        recent[np.argsort(-fy_year, kind='stable')[:3]] = True
+        fy_member[~fy_member.any(axis=1)] = recent
+        wc_member, wc_cols, wc_note = fy_member, fy, "yearly periods"
+    else:
+        wc_member, wc_cols, wc_note = membership, q, "quarterly periods - no yearly data available"
+    wc_revenue = panel.values[panel.rows['Revenue'], wc_cols] if has_revenue else np.full(len(wc_cols), np.nan)
+    wc_candidates = []
+    for asset_field, liability_field in history.wc_pairs:
+        wc = panel.values[panel.rows[asset_field], wc_cols] - panel.values[panel.rows[liability_field], wc_cols]
+        wc_candidates.append(_window_means(wc_member, *_ratio(wc, wc_revenue)))
+    if wc_candidates and has_revenue:
+        columns['wc_percent'], counts['wc_percent'] = _first_with_data(wc_candidates)
+
+    latest_data = history.latest_data
+    years, totals, growth_rates = history.years.tolist(), history.annual_revenue.tolist(), history.growth_rates.tolist()
+
+    results = []
+    for w, (start, end) in enumerate(windows):
+        params = {}
+        notes = {}
+        quarters_used = f"{panel.quarter_cols[start]} to {panel.quarter_cols[end - 1]}"
+
+        if has_revenue and counts['base_revenue'][w]:
+            params['base_revenue'] = float(columns['base_revenue'][w])
+            notes['base_revenue'] = "(Calculated from quarterly data, annualized)"
+
+        if growth_counts[w]:
+            params['revenue_growth'] = float(growth_means[w])
+            notes['revenue_growth'] = f"(Avg from {growth_counts[w]} values in selected range)"
+        elif has_revenue and pair_counts[w]:
+            params['revenue_growth'] = float(pair_means[w])
+            notes['revenue_growth'] = f"(Avg from quarterly YoY: {pair_means[w]:.2f}%)"
+        elif has_revenue:
+            params['revenue_growth'], notes['revenue_growth'] = history.annual_revenue_growth()
+
+        for name in ('operating_margin', 'tax_rate', 'capex_percent'):
+            if name in columns and counts[name][w]:
+                params[name] = float(columns[name][w])
+                notes[name] = f"(Avg from {counts[name][w]} quarters in range {quarters_used})"
+
+        if share_field and share_pos[w] >= 0:
+            params['shares_outstanding'] = float(shares[w])
+            notes['shares_outstanding'] = f"(From {share_field}, {panel.quarter_cols[share_pos[w]]})"
+
+        if 'Long Term Debt' in latest_data:
+            params['current_debt'] = latest_data['Long Term Debt']
+            notes['current_debt'] = "(From most recent yearly value)"
+
+        if latest_data.get('Cash & Equivalents'):
+            params['cash_equivalents'] = latest_data['Cash & Equivalents']
+            notes['cash_equivalents'] = "(From most recent yearly value)"
+
+        if 'wc_percent' in columns and counts['wc_percent'][w]:
+            params['wc_percent'] = float(columns['wc_percent'][w])
+            notes['wc_percent'] = f"(Avg from {counts['wc_percent'][w]} {wc_note})"
+
+        # Prefer the most recent yearly revenue as the base revenue
+        if latest_data.get('Revenue'):
+            params['base_revenue'] = latest_data['Revenue']
+            notes['base_revenue'] = "(From latest yearly data)"
+
+        stats = {
+            'years': years,
+            'annual_revenue': totals,
+            'growth_rates': growth_rates,
+            'avg_growth': history.avg_growth,
+            'avg_margin': float(stat_margin[0][w]) if stat_margin[1][w] else None,
+            'avg_tax_rate': float(stat_tax[0][w]) if stat_tax[1][w] else None,
+            'latest': {},
+        }
+        window_labels = panel.quarter_cols[start:end]
+        for primary_key, alt_keys in LATEST_QUARTER_KEYS.items():
+            value, found_key, _ = panel.latest(alt_keys, window_labels)
+            if value is not None:
+                stats['latest'][primary_key] = (value, found_key)
+
+        results.append({'params': params, 'notes': notes, 'stats': stats})
+    return results, latest_data
+
+
+def _window_bounds(panel, selected_cols):
+    """(start, end) of a contiguous selection of quarter columns"""
+    if not selected_cols:
+        return 0, len(panel.quarter_cols)
+    start = panel.quarter_cols.index(selected_cols[0])
+    return start, start + len(selected_cols)
+
+
+def forecast_parameters(panel, selected_cols=None):
+    """Derive forecast inputs from historical data, mirroring the forecast form prefill.
+
+    ``selected_cols`` is a contiguous range of quarter columns (all quarters by default).
+    Returns ``(parameters, notes, latest_data)`` where ``parameters`` holds only the
+    inputs that could be derived (in form units) and ``notes`` describes their source.
+    """
+    if panel is None or not panel.quarter_cols:
+        return {}, {}, {}
+    history = historical_panel(panel)
+    results, latest_data = window_statistics(history, [_window_bounds(history.panel, selected_cols)])
+    return results[0]['params'], results[0]['notes'], latest_data
+
+
+class LookbackCache:
+    """Forecast parameters and statistics for every lookback window, computed once per load.
+
+    Windows are keyed by their length in quarters and always end at the latest quarter.
+    ``panel`` is the load's ``HistoricalPanel`` (a ``StatementPanel`` is wrapped in one).
+    """
+
+    def __init__(self, panel, lengths=LOOKBACK_LENGTHS):
+        self.history = historical_panel(panel)
+        self.panel = self.history.panel
+        n = len(self.panel.quarter_cols)
+        self.lengths = sorted({min(length, n) for length in lengths} | {n}) if n else []
+        windows = [(n - length, n) for length in self.lengths]
+        results, _ = window_statistics(self.history, windows) if windows else ([], {})
+        self.latest_data = self.history.latest_data
+        self.entries = dict(zip(self.lengths, results))
+
+    def get(self, selected_cols):
+        """Cached entry for a trailing selection of quarters, computing it on a miss"""
+        length = len(selected_cols)
+        if length not in self.entries:
+            n = len(self.panel.quarter_cols)
+            self.entries[length] = window_statistics(self.history, [(n - length, n)])[0][0]
+        return self.entries[length]
+
+    def table(self):
+        """Window-by-window parameter table with one row per trailing length (1 quarter to all)"""
+        n = len(self.panel.quarter_cols)
+        return window_table(self.history, [(n - length, n) for length in range(1, n + 1)])
+
+
+def rolling_windows(panel, length):
+    """Every contiguous window of ``length`` quarters, one ending at each quarter"""
+    n = len(panel.quarter_cols)
+    return [(end - length, end) for end in range(length, n + 1)]
+
+
+def window_table(panel, windows):
+    """Derived parameters for each (start, end) quarter window as a DataFrame"""
+    results, _ = window_statistics(panel, windows)
+    rows = []
+    for (start, end), result in zip(windows, results):
+        row = {'start': panel.quarter_cols[start], 'end': panel.quarter_cols[end - 1], 'quarters': end - start}
+        row.update(result['params'])
+        row['avg_historical_margin'] = result['stats']['avg_margin']
+        row['avg_historical_tax_rate'] = result['stats']['avg_tax_rate']
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def default_base_revenue(panel, latest_data):
+    """Annualized average of the last 12 quarters, used when no base revenue is entered"""
+    if 'Revenue' not in latest_data:
+        return None
+    if panel is not None and panel.quarter_cols and 'Revenue' in panel:
+        revenue = panel.row('Revenue', panel.quarter_cols[-12:])
+        revenue = revenue[revenue > 0]
+        if len(revenue):
+            return float(revenue.mean()) * 4
+    # Fallback to latest revenue value if no historical data found
+    return latest_data['Revenue'] * 4
+
+
+def schedule(value, forecast_years):
+    """Per-year array for a constant rate or a sequence of rates (the last rate carries forward)"""
+    if np.ndim(value) == 0:
+        return np.full(forecast_years, float(value))
+    values = np.asarray(value, dtype=float)[:forecast_years]
+    if len(values) == 0:
+        raise ValueError("A rate schedule needs at least one value")
+    return np.concatenate([values, np.full(forecast_years - len(values), values[-1])])
+
+
+def fade(start, end, forecast_years, fade_years=None):
+    """Linear fade from ``start`` in year 1 to ``end`` in year ``fade_years`` (default: the last year)"""
+    fade_years = min(fade_years or forecast_years, forecast_years)
+    path = np.linspace(start, end, fade_years)
+    return tuple(np.concatenate([path, np.full(forecast_years - fade_years, end)]).tolist())
+
+
+def parse_schedule(text, forecast_years, scale=1.0):
+    """Parse a rate entry: "10", "30, 25, 20" or "30>5" / "30>5:3".
+
+    Returns a float for a single rate and a tuple of per-year rates otherwise, each
+    multiplied by ``scale`` (0.01 turns form percentages into fractions).
+    """
+    text = str(text).strip()
+    if '>' in text:
+        start, _, rest = text.partition('>')
+        end, _, fade_years = rest.partition(':')
+        path = fade(float(start), float(end), forecast_years, int(fade_years) if fade_years.strip() else None)
+        return tuple(value * scale for value in path)
+    if ',' in text:
+        return tuple(float(value) * scale for value in text.split(',') if value.strip())
+    return float(text) * scale
+
+
+def describe_schedule(value, scale=100):
+    """Readable form of a rate or schedule of rates, e.g. for logs and result windows"""
+    if np.ndim(value) == 0:
+        return f"{value*scale:.2f}%"
+    return " / ".join(f"{rate*scale:.2f}%" for rate in value)
+
+
+def revenue_path(base_revenue, forecast_years, revenue_growth):
+    years = list(range(1, forecast_years + 1))
+    # Compounded growth as a cumulative product, so each year can have its own rate
+    revenue = base_revenue * np.cumprod(1 + schedule(revenue_growth, forecast_years))
+    return {'years': years, 'revenue': revenue.tolist()}
+
+
+def operating_profit(revenue, operating_margin, tax_rate):
+    ebit = np.asarray(revenue) * schedule(operating_margin, len(revenue))
+    tax = ebit * tax_rate
+    return {'ebit': ebit.tolist(), 'tax': tax.tolist(), 'nopat': (ebit - tax).tolist()}
+
+
+def reinvestment(base_revenue, revenue, capex_percent, wc_percent):
+    """CapEx and Working Capital changes"""
+    revenue = np.asarray(revenue)
+    wc_rates = schedule(wc_percent, len(revenue))
+    capex = revenue * schedule(capex_percent, len(revenue))
+    wc = revenue * wc_rates
+    wc_initial = base_revenue * wc_rates[0]
+    wc_change = np.diff(wc, prepend=wc_initial)
+    return {'capex': capex.tolist(), 'wc': wc.tolist(), 'wc_initial': float(wc_initial),
+            'wc_change': wc_change.tolist()}
+
+
+def free_cash_flow(nopat, capex, wc_change):
+    return {'fcf': [nopat[i] - capex[i] - wc_change[i] for i in range(len(nopat))]}
+
+
+def terminal_value(fcf, discount_rate, terminal_growth):
+    return {'terminal_value': fcf[-1] * (1 + terminal_growth) / (discount_rate - terminal_growth)}
+
+
+def discount_cash_flows(fcf, terminal_value, discount_rate):
+    """Present values of the forecast free cash flows and the terminal value"""
+    dcf = [flow / (1 + discount_rate) ** year for year, flow in enumerate(fcf, start=1)]
+    discounted_tv = terminal_value / (1 + discount_rate) ** len(fcf)
+    return {'dcf': dcf, 'discounted_tv': discounted_tv, 'ev': sum(dcf) + discounted_tv}
+
+
+def equity_bridge(ev, shares_outstanding=None, debt=0.0, cash=0.0):
+    """Enterprise value to equity value and price per share"""
+    equity_value = ev - debt + cash
+    price_per_share = equity_value / shares_outstanding if shares_outstanding else None
+    return {'equity_value': equity_value, 'price_per_share': price_per_share}
+
+
+# The forward DCF as a dependency graph, in evaluation order. Each node reads model
+# inputs and/or outputs of earlier nodes by argument name and returns new outputs.
+DCF_NODES = [
+    (revenue_path, ('base_revenue', 'forecast_years', 'revenue_growth')),
+    (operating_profit, ('revenue', 'operating_margin', 'tax_rate')),
+    (reinvestment, ('base_revenue', 'revenue', 'capex_percent', 'wc_percent')),
+    (free_cash_flow, ('nopat', 'capex', 'wc_change')),
+    (terminal_value, ('fcf', 'discount_rate', 'terminal_growth')),
+    (discount_cash_flows, ('fcf', 'terminal_value', 'discount_rate')),
+    (equity_bridge, ('ev', 'shares_outstanding', 'debt', 'cash')),
+]
+
+MODEL_KEYS = ['years', 'revenue', 'ebit', 'tax', 'nopat', 'capex', 'wc', 'wc_initial', 'wc_change', 'fcf',
+              'dcf', 'terminal_value', 'discounted_tv', 'ev', 'equity_value', 'price_per_share']
+
+
+def dcf_valuation(base_revenue, forecast_years, revenue_growth, operating_margin, tax_rate,
+                  capex_percent, wc_percent, discount_rate, terminal_growth,
+                  shares_outstanding=None, debt=0.0, cash=0.0):
+    """Run the forward DCF model. Rates are fractions, amounts are in millions."""
+    values = dict(locals())
+    for node, args in DCF_NODES:
+        values.update(node(*(values[name] for name in args)))
+    return {key: values[key] for key in MODEL_KEYS}
+
+
+class DCFGraph:
+    """Forward DCF evaluated over ``DCF_NODES`` with each node's output cached.
+
+    A node re-runs only when one of its model inputs changed or a node it reads from
+    re-ran, so editing debt or cash only re-runs the equity bridge and editing the
+    discount rate skips everything above the terminal value. ``recomputed`` lists the
+    nodes the last ``evaluate`` call actually ran.
+    """
+
+    def __init__(self, nodes=DCF_NODES):
+        self.nodes = nodes
+        self.inputs = {}
+        self.outputs = {}
+        self.recomputed = []
+
+    def evaluate(self, **inputs):
+        """Takes the same keyword arguments as ``dcf_valuation`` and returns the same dict"""
+        inputs.setdefault('shares_outstanding', None)
+        inputs.setdefault('debt', 0.0)
+        inputs.setdefault('cash', 0.0)
+        changed = {name for name, value in inputs.items()
+                   if name not in self.inputs or self.inputs[name] != value}
+        self.recomputed = []
+
+        values = dict(inputs)
+        for node, args in self.nodes:
+            name = node.__name__
+            if name not in self.outputs or any(arg in changed for arg in args):
+                self.outputs[name] = node(*(values[arg] for arg in args))
+                self.recomputed.append(name)
+                # Everything downstream of a re-run node is stale as well
+                changed.update(self.outputs[name])
+            values.update(self.outputs[name])
+
+        self.inputs = inputs
+        return {key: values[key] for key in MODEL_KEYS}
+
+
+def _batch_column(scenarios, name, default=0.0):
+    return np.array([s.get(name) if s.get(name) is not None else default for s in scenarios], dtype=float)
+
+
+def batch_cash_flows(scenarios):
+    """Scenarios x years free cash flow matrix of a batch, which does not depend on the discount rate.
+
+    Returns ``(fcf, horizon)``; years past a scenario's horizon hold values that are masked
+    out by ``discount_batch``.
+    """
+    base_revenue = _batch_column(scenarios, 'base_revenue')
+    horizon = np.array([s['forecast_years'] for s in scenarios], dtype=int)
+    tax_rate = _batch_column(scenarios, 'tax_rate')
+    years = np.arange(1, horizon.max() + 1)
+
+    # Scenarios x years matrices of the scheduled rates
+    def rates(name):
+        return np.vstack([schedule(0.0 if s.get(name) is None else s[name], len(years)) for s in scenarios])
+
+    wc_percent = rates('wc_percent')
+    revenue = base_revenue[:, None] * np.cumprod(1 + rates('revenue_growth'), axis=1)
+    ebit = revenue * rates('operating_margin')
+    nopat = ebit - ebit * tax_rate[:, None]
+    capex = revenue * rates('capex_percent')
+    wc = revenue * wc_percent
+    wc_previous = np.column_stack([base_revenue * wc_percent[:, 0], wc[:, :-1]])
+    return nopat - capex - (wc - wc_previous), horizon
+
+
+def discount_batch(fcf, horizon, discount_rate, terminal_growth):
+    """Terminal value, its present value and enterprise value of ``batch_cash_flows`` at per-row rates"""
+    years = np.arange(1, fcf.shape[1] + 1)
+    mask = years[None, :] <= horizon[:, None]
+    last_fcf = fcf[np.arange(len(fcf)), horizon - 1]
+    terminal_value = last_fcf * (1 + terminal_growth) / (discount_rate - terminal_growth)
+    dcf = np.where(mask, fcf / (1 + discount_rate[:, None]) ** years, 0.0)
+    discounted_tv = terminal_value / (1 + discount_rate) ** horizon
+    return terminal_value, discounted_tv, dcf.sum(axis=1) + discounted_tv
+
+
+def dcf_batch(scenarios):
+    """Vectorized ``dcf_valuation`` over a list of keyword-argument dicts.
+
+    Scenarios may use different forecast lengths; years past a scenario's horizon are
+    masked out. Returns arrays of ``terminal_value``, ``discounted_tv``, ``ev``,
+    ``equity_value`` and ``price_per_share`` (NaN where shares outstanding is missing).
+    """
+    def column(name, default=0.0):
+        return _batch_column(scenarios, name, default)
+
+    discount_rate, terminal_growth = column('discount_rate'), column('terminal_growth')
+    shares, debt, cash = column('shares_outstanding', np.nan), column('debt'), column('cash')
+
+    fcf, horizon = batch_cash_flows(scenarios)
+    terminal_value, discounted_tv, ev = discount_batch(fcf, horizon, discount_rate, terminal_growth)
+    equity_value = ev - debt + cash
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_per_share = np.where(shares > 0, equity_value / shares, np.nan)
+
+    return {
+        'terminal_value': terminal_value,
+        'discounted_tv': discounted_tv,
+        'ev': ev,
+        'equity_value': equity_value,
+        'price_per_share': price_per_share,
+    }
+
+
+# Inputs covered by the sensitivity analysis. Rates are shocked by +/-1 percentage point
+# (schedules shift in parallel), amounts in millions by +/-10% of their value, or of the
+# enterprise value when the amount is zero (e.g. no debt), which still moves the price.
+SENSITIVITY_INPUTS = {
+    'base_revenue': 'Base Revenue',
+    'revenue_growth': 'Revenue Growth',
+    'operating_margin': 'Operating Margin',
+    'tax_rate': 'Tax Rate',
+    'capex_percent': 'CapEx %',
+    'wc_percent': 'Working Capital %',
+    'discount_rate': 'Discount Rate',
+    'terminal_growth': 'Terminal Growth',
+    'shares_outstanding': 'Shares Outstanding',
+    'debt': 'Debt',
+    'cash': 'Cash',
+}
+RATE_SHOCK = 0.01
+AMOUNT_SHOCK = 0.10
+
+
+def _bumped(inputs, name, delta):
+    scenario = dict(inputs)
+    value = inputs.get(name) or 0.0
+    scenario[name] = tuple(rate + delta for rate in value) if np.ndim(value) else value + delta
+    return scenario
+
+
+def _batch_engine(inputs):
+    """``(inputs, batch)``: ``dcf_batch``, or the quarterly batch when ``inputs`` are
+    ``quarterly_dcf_valuation`` arguments (their seasonality and first quarter removed)"""
+    if 'seasonality' not in inputs and 'first_quarter' not in inputs:
+        return inputs, dcf_batch
+    inputs = dict(inputs)
+    seasonality, first_quarter = inputs.pop('seasonality', None), inputs.pop('first_quarter', 1)
+    return inputs, lambda scenarios: quarterly_dcf_batch(scenarios, seasonality, first_quarter)
+
+
+def price_sensitivities(inputs, step=1e-5):
+    """Sensitivity of price per share to every model input from one batched evaluation.
+
+    ``inputs`` are ``dcf_valuation`` (or ``quarterly_dcf_valuation``) keyword arguments and
+    must include shares outstanding. For each input the batch holds a
+    central finite difference with a small ``step`` (the partial derivative, per unit of
+    the input) and a +/- shock for the tornado chart (1 point for rates, 10% for amounts).
+    A zero amount other than the share count is shocked by 10% of enterprise value instead.
+    Returns a table sorted by the size of the shock's price swing.
+    """
+    if not inputs.get('shares_outstanding'):
+        raise ValueError("Shares outstanding not found; price sensitivities need a share count")
+    inputs, batch = _batch_engine(inputs)
+    ev = None
+    bumps = []
+    for name in SENSITIVITY_INPUTS:
+        value = inputs.get(name) or 0.0
+        if name in PERCENT_PARAMETERS:
+            h, shock = step, RATE_SHOCK
+        else:
+            scale = abs(value)
+            if scale == 0 and name != 'shares_outstanding':
+                if ev is None:
+                    ev = float(batch([inputs])['ev'][0])
+                scale = abs(ev)
+            h, shock = step * max(abs(value), 1.0), AMOUNT_SHOCK * scale
+        bumps.append((name, value, h, shock))
+
+    scenarios = [inputs]
+    for name, _, h, shock in bumps:
+        scenarios += [_bumped(inputs, name, -h), _bumped(inputs, name, h),
+                      _bumped(inputs, name, -shock), _bumped(inputs, name, shock)]
+    prices = batch(scenarios)['price_per_share']
+
+    rows = []
+    for i, (name, value, h, shock) in enumerate(bumps):
+        down, up, low, high = prices[1 + 4 * i: 5 + 4 * i]
+        rows.append({
+            'input': name,
+            'label': SENSITIVITY_INPUTS[name],
+            'value': value,
+            'derivative': (up - down) / (2 * h),
+            'shock': shock,
+            'price_low': low,
+            'price_high': high,
+            'swing': abs(high - low),
+        })
+    table = pd.DataFrame(rows).sort_values('swing', ascending=False, kind='stable').reset_index(drop=True)
+    table.attrs['price_per_share'] = prices[0]
+    return table
+
+
+def price_grid(inputs, discount_rates=None, terminal_growths=None, steps=(-0.02, -0.01, 0.0, 0.01, 0.02)):
+    """Price per share over a discount rate x terminal growth grid from one batched evaluation.
+
+    ``inputs`` are ``dcf_valuation`` (or ``quarterly_dcf_valuation``) keyword arguments; by
+    default both axes are the base rates shifted by ``steps``. Cells where terminal growth is
+    not below the discount rate are NaN. Without shares outstanding the grid holds equity
+    values instead.
+    """
+    inputs, batch = _batch_engine(inputs)
+    if discount_rates is None:
+        discount_rates = [round(inputs['discount_rate'] + step, 10) for step in steps]
+    if terminal_growths is None:
+        terminal_growths = [round(inputs['terminal_growth'] + step, 10) for step in steps]
+    cells = [(r, g) for r in discount_rates for g in terminal_growths]
+    results = batch([dict(inputs, discount_rate=r, terminal_growth=g) for r, g in cells])
+    values = results['price_per_share'] if inputs.get('shares_outstanding') else results['equity_value']
+    values = np.where([g < r for r, g in cells], values, np.nan)
+    return pd.DataFrame(values.reshape(len(discount_rates), len(terminal_growths)),
+                        index=pd.Index(discount_rates, name='discount_rate'),
+                        columns=pd.Index(terminal_growths, name='terminal_growth'))
+
+
+def seasonality_profile(panel, account='Revenue', selected_cols=None):
+    """Average share of each calendar quarter (Q1..Q4) in its year's total, scaled to average 1.
+
+    Only years with four positive quarters count; without any, the profile is flat.
+    """
+    flat = (1.0, 1.0, 1.0, 1.0)
+    pos = panel.quarter_pos if selected_cols is None else panel.columns(selected_cols)
+    if account not in panel or not len(pos):
+        return flat
+
+    years, inverse = np.unique(panel.year[pos], return_inverse=True)
+    grid = np.full((len(years), 4), np.nan)
+    grid[inverse, panel.quarter[pos] - 1] = panel.values[panel.rows[account], pos]
+    complete = np.all(grid > 0, axis=1)
+    if not complete.any():
+        return flat
+    shares = grid[complete] / grid[complete].sum(axis=1, keepdims=True)
+    return tuple((shares.mean(axis=0) * 4).tolist())
+
+
+def next_quarter(panel):
+    """Calendar quarter (1-4) that follows the latest historical quarter"""
+    if panel is None or not len(panel.quarter_pos):
+        return 1
+    return int(panel.quarter[panel.quarter_pos[-1]]) % 4 + 1
+
+
+def quarterly_dcf_batch(scenarios, seasonality=None, first_quarter=1):
+    """Vectorized DCF on a quarterly grid (four periods per forecast year).
+
+    Annual rates are converted to quarterly compounding, the annualized revenue run rate
+    is spread over quarters with ``seasonality`` (Q1..Q4 multipliers averaging 1,
+    starting at calendar quarter ``first_quarter``), cash flows are discounted at
+    quarter ends and the terminal value grows the last four quarters' FCF.
+    Returns scenarios x quarters matrices plus per-scenario valuation arrays.
+    """
+    def column(name, default=0.0):
+        return _batch_column(scenarios, name, default)
+
+    base_revenue = column('base_revenue')
+    horizon = np.array([s['forecast_years'] for s in scenarios], dtype=int)
+    tax_rate = column('tax_rate')
+    discount_rate, terminal_growth = column('discount_rate'), column('terminal_growth')
+    shares, debt, cash = column('shares_outstanding', np.nan), column('debt'), column('cash')
+
+    quarters = np.arange(1, horizon.max() * 4 + 1)
+    year_index = (quarters - 1) // 4
+    mask = quarters[None, :] <= 4 * horizon[:, None]
+
+    # Annual rate schedules repeated over the four quarters of each year
+    def rates(name):
+        annual = np.vstack([schedule(0.0 if s.get(name) is None else s[name], horizon.max()) for s in scenarios])
+        return annual[:, year_index]
+
+    season = np.asarray(seasonality if seasonality is not None else (1.0,) * 4, dtype=float)
+    season = season[(first_quarter - 1 + quarters - 1) % 4]
+
+    wc_percent = rates('wc_percent')
+    run_rate = base_revenue[:, None] * np.cumprod((1 + rates('revenue_growth')) ** 0.25, axis=1)
+    revenue = run_rate / 4 * season
+    ebit = revenue * rates('operating_margin')
+    tax = ebit * tax_rate[:, None]
+    nopat = ebit - tax
+    capex = revenue * rates('capex_percent')
+    # Working capital follows the run rate so it does not swing with seasonality
+    wc = run_rate * wc_percent
+    wc_initial = base_revenue * wc_percent[:, 0]
+    wc_change = np.diff(wc, axis=1, prepend=wc_initial[:, None])
+    fcf = nopat - capex - wc_change
+
+    dcf = np.where(mask, fcf / (1 + discount_rate[:, None]) ** (quarters / 4), 0.0)
+    last_year = 4 * horizon[:, None] - 4 + np.arange(4)
+    terminal_value = (np.take_along_axis(fcf, last_year, axis=1).sum(axis=1)
+                      * (1 + terminal_growth) / (discount_rate - terminal_growth))
+    discounted_tv = terminal_value / (1 + discount_rate) ** horizon
+
+    ev = dcf.sum(axis=1) + discounted_tv
+    equity_value = ev - debt + cash
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price_per_share = np.where(shares > 0, equity_value / shares, np.nan)
+
+    return {
+        'quarters': quarters,
+        'revenue': revenue, 'ebit': ebit, 'tax': tax, 'nopat': nopat, 'capex': capex,
+        'wc': wc, 'wc_initial': wc_initial, 'wc_change': wc_change, 'fcf': fcf, 'dcf': dcf,
+        'terminal_value': terminal_value,
+        'discounted_tv': discounted_tv,
+        'ev': ev,
+        'equity_value': equity_value,
+        'price_per_share': price_per_share,
+    }
+
+
+def quarterly_dcf_valuation(base_revenue, forecast_years, revenue_growth, operating_margin, tax_rate,
+                            capex_percent, wc_percent, discount_rate, terminal_growth,
+                            shares_outstanding=None, debt=0.0, cash=0.0, seasonality=None, first_quarter=1):
+    """Quarterly-grid DCF returned in the same shape as ``dcf_valuation``.
+
+    Flows are rolled up by forecast year (working capital at year end) so the result can
+    be shown like an annual model; the per-quarter paths are kept under ``'quarterly'``.
+    """
+    inputs = dict(locals())
+    seasonality, first_quarter = inputs.pop('seasonality'), inputs.pop('first_quarter')
+    paths = quarterly_dcf_batch([inputs], seasonality, first_quarter)
+    n = forecast_years * 4
+
+    def by_year(name):
+        return paths[name][0, :n].reshape(forecast_years, 4).sum(axis=1).tolist()
+
+    price_per_share = paths['price_per_share'][0]
+    model = {key: by_year(key) for key in ['revenue', 'ebit', 'tax', 'nopat', 'capex', 'wc_change', 'fcf', 'dcf']}
+    model.update({
+        'years': list(range(1, forecast_years + 1)),
+        'wc': paths['wc'][0, 3:n:4].tolist(),
+        'wc_initial': float(paths['wc_initial'][0]),
+        'terminal_value': float(paths['terminal_value'][0]),
+        'discounted_tv': float(paths['discounted_tv'][0]),
+        'ev': float(paths['ev'][0]),
+        'equity_value': float(paths['equity_value'][0]),
+        'price_per_share': None if np.isnan(price_per_share) else float(price_per_share),
+        'quarterly': {key: paths[key][0, :n].tolist() for key in ['revenue', 'nopat', 'wc_change', 'fcf', 'dcf']},
+    })
+    return {key: model[key] for key in MODEL_KEYS + ['quarterly']}
+
+
+def model_inputs(params):
+    """Convert form-unit parameters into keyword arguments for ``dcf_valuation``"""
+    kwargs = {
+        'base_revenue': float(params['base_revenue']),
+        'forecast_years': int(params['forecast_years']),
+        'shares_outstanding': float(params['shares_outstanding']) if params.get('shares_outstanding') else None,
+        'debt': float(params.get('current_debt') or 0.0),
+        'cash': float(params.get('cash_equivalents') or 0.0),
+    }
+    for name in PERCENT_PARAMETERS:
+        value = params[name]
+        if name in SCHEDULE_PARAMETERS and isinstance(value, str):
+            kwargs[name] = parse_schedule(value, kwargs['forecast_years'], scale=0.01)
+        elif name in SCHEDULE_PARAMETERS and np.ndim(value) == 1:
+            kwargs[name] = tuple(float(rate) / 100 for rate in value)
+        else:
+            kwargs[name] = float(value) / 100
+    if kwargs['forecast_years'] <= 0:
+        raise ValueError("Forecast years must be a valid positive integer")
+    if kwargs['terminal_growth'] >= kwargs['discount_rate']:
+        raise ValueError("Terminal growth rate must be less than discount rate for model validity")
+    return kwargs
+
+
+def value_parameter_sets(parameter_sets, missing_revenue="Could not find revenue data"):
+    """Value form-unit parameter sets in one ``dcf_batch``.
+
+    Returns ``(results, errors)``: arrays of ``enterprise_value``, ``equity_value`` and
+    ``price_per_share`` per set (NaN where the set is invalid) and each set's error message
+    (None for the sets that were valued). A set without base revenue fails with ``missing_revenue``.
+    """
+    errors, valid, scenarios = [], [], []
+    for i, inputs in enumerate(parameter_sets):
+        try:
+            if inputs.get('base_revenue') is None:
+                raise ValueError(missing_revenue)
+            scenarios.append(model_inputs(inputs))
+            valid.append(i)
+            errors.append(None)
+        except (ValueError, TypeError) as e:
+            errors.append(str(e))
+
+    results = {name: np.full(len(errors), np.nan) for name in ('enterprise_value', 'equity_value', 'price_per_share')}
+    if scenarios:
+        batch = dcf_batch(scenarios)
+        results['enterprise_value'][valid] = batch['ev']
+        results['equity_value'][valid] = batch['equity_value']
+        results['price_per_share'][valid] = batch['price_per_share']
+    return results, errors
+
+
+def backtest_parameters(panel, lookback=None):
+    """Prefilled forecast parameters as they would have been derived at each historical quarter.
+
+    At the quarter in position ``k`` only the quarterly columns up to ``k`` and the FY columns
+    of years whose fourth quarter has been reported are visible, so nothing after the as-of date
+    leaks into the parameters. As-of quarters that see the same FY columns share one truncated
+    panel and are evaluated in a single ``window_statistics`` pass. ``lookback`` limits each
+    window to that many trailing quarters (all quarters up to the as-of date by default).
+    Returns a list of ``(as_of, params)`` in form units, oldest first.
+    """
+    q = panel.quarter_pos
+    if not len(q):
+        return []
+
+    # Latest fiscal year whose FY column is available at each quarter
+    q_year = panel.year[q]
+    complete_year = np.where(panel.quarter[q] == 4, q_year, q_year - 1)
+    fy = panel.fy_pos
+
+    entries = []
+    for year in np.unique(complete_year):
+        members = np.flatnonzero(complete_year == year)
+        last = members[-1]
+        visible = np.concatenate([q[:last + 1], fy[panel.year[fy] <= year]])
+        as_of_panel = panel.subset(visible, panel.quarter_cols[:last + 1])
+        windows = [(0 if lookback is None else max(0, k + 1 - lookback), k + 1) for k in members]
+        results, _ = window_statistics(as_of_panel, windows)
+        entries.extend((panel.quarter_cols[k], result['params']) for k, result in zip(members, results))
+    return entries
+
+
+def backtest_valuations(entries, overrides=None):
+    """Value every ``(ticker, as_of, params)`` backtest entry in one vectorized batch.
+
+    ``overrides`` maps ``"default"`` and/or tickers to form-unit parameters applied on top of
+    the as-of prefill. Entries without shares outstanding still get an enterprise and equity
+    value; their price per share is NaN. Invalid inputs are reported in ``status``.
+    """
+    overrides = overrides or {}
+    rows = []
+    for ticker, as_of, params in entries:
+        inputs = dict(DEFAULT_PARAMETERS)
+        inputs.update(params)
+        inputs.update(overrides.get('default', {}))
+        inputs.update(overrides.get(ticker, {}))
+        rows.append({'ticker': ticker, 'as_of': as_of, **inputs})
+
+    results, errors = value_parameter_sets(rows, missing_revenue="No revenue data available at this date")
+    for i, (row, error) in enumerate(zip(rows, errors)):
+        row['status'] = 'ok' if error is None else f"error: {error}"
+        if error is None:
+            row.update({name: values[i] for name, values in results.items()})
+
+    columns = ['ticker', 'as_of', 'status', 'enterprise_value', 'equity_value', 'price_per_share']
+    table = pd.DataFrame(rows)
+    return table.reindex(columns=columns + [col for col in table.columns if col not in columns])
+
+
+def backtest(panel, lookback=None, overrides=None, ticker=None):
+    """Time series of the implied value from the as-of prefill at every historical quarter"""
+    entries = [(ticker, as_of, params) for as_of, params in backtest_parameters(panel, lookback)]
+    return backtest_valuations(entries, overrides)
+
+
+class CalculationCancelled(Exception):
+    """Raised by long-running calculations when their cancel check fires"""
+
+
+def solve_implied_discount_rate(target_price, base_revenue, forecast_years, revenue_growth, operating_margin,
+                                tax_rate, capex_percent, wc_percent, terminal_growth, shares_outstanding,
+                                debt=0.0, cash=0.0, low_rate=0.01, high_rate=0.50,
+                                tolerance=0.0001, max_iterations=100, progress=None, cancelled=None):
+    """Binary-search the discount rate at which the model EV matches the share price.
+
+    Raises ``ValueError`` when no rate in ``[low_rate, high_rate]`` brackets the price.
+    ``progress(fraction)`` is called once per iteration and ``cancelled()`` is polled
+    between iterations; when it returns True ``CalculationCancelled`` is raised.
+    """
+    # Calculate the target enterprise value from the current share price
+    target_equity_value = target_price * shares_outstanding
+    target_ev = target_equity_value + debt - cash
+
+    def ev_at(rate):
+        return dcf_valuation(base_revenue, forecast_years, revenue_growth, operating_margin, tax_rate,
+                             capex_percent, wc_percent, rate, terminal_growth)['ev']
+
+    # Check if terminal growth is less than the lowest discount rate we'll try
+    if terminal_growth >= low_rate:
+        low_rate = terminal_growth + 0.01  # Set low_rate just above terminal growth
+        if low_rate >= high_rate:
+            raise ValueError("Terminal growth rate is too high to find a valid discount rate solution")
+
+    # Ensure we can bracket the solution
+    ev_at_low = ev_at(low_rate)
+    ev_at_high = ev_at(high_rate)
+    if (ev_at_low < target_ev and ev_at_high < target_ev) or (ev_at_low > target_ev and ev_at_high > target_ev):
+        raise ValueError(f"Cannot find a solution in the range {low_rate*100:.1f}% to {high_rate*100:.1f}%. "
+                         f"The current price may be outside the model's realistic valuation range.")
+
+    mid_rate = (low_rate + high_rate) / 2
+    for iteration in range(max_iterations):
+        if cancelled is not None and cancelled():
+            raise CalculationCancelled("Implied discount rate search cancelled")
+        if progress is not None:
+            progress(iteration / max_iterations)
+        mid_rate = (low_rate + high_rate) / 2
+        ev_at_mid = ev_at(mid_rate)
+
+        # If within tolerance, we found our solution
+        if abs(ev_at_mid - target_ev) < tolerance * target_ev:
+            break
+
+        # Adjust search range
+        if ev_at_mid > target_ev:
+            low_rate = mid_rate
+        else:
+            high_rate = mid_rate
+
+    ev = ev_at(mid_rate)
+    return {
+        'implied_discount_rate': mid_rate,
+        'target_equity_value': target_equity_value,
+        'target_ev': target_ev,
+        'ev': ev,
+        'implied_price': (ev - debt + cash) / shares_outstanding,
+    }
+
+
+def implied_discount_rates(scenarios, target_prices, low_rate=0.01, high_rate=0.50, tolerance=0.0001,
+                           max_iterations=100):
+    """``solve_implied_discount_rate`` for a whole batch at once.
+
+    Every scenario runs the same bisection as the scalar solver, but the cash flows are built
+    once and each iteration discounts all unresolved scenarios together. Returns an array of
+    rates, NaN where the price cannot be bracketed or shares or price are missing.
+    """
+    n = len(scenarios)
+    rates = np.full(n, np.nan)
+    if not n:
+        return rates
+    target_prices = np.asarray(target_prices, dtype=float)
+    terminal_growth = _batch_column(scenarios, 'terminal_growth')
+    shares = _batch_column(scenarios, 'shares_outstanding', np.nan)
+    target_ev = (target_prices * shares + _batch_column(scenarios, 'debt') - _batch_column(scenarios, 'cash'))
+    fcf, horizon = batch_cash_flows(scenarios)
+
+    def ev_at(rate, rows):
+        return discount_batch(fcf[rows], horizon[rows], rate, terminal_growth[rows])[2]
+
+    # Same bracket as the scalar solver: the low end moves just above terminal growth
+    low = np.where(terminal_growth >= low_rate, terminal_growth + 0.01, low_rate)
+    high = np.full(n, float(high_rate))
+    everything = np.arange(n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ev_low, ev_high = ev_at(low, everything), ev_at(high, everything)
+    bracketed = ((low < high) & (shares > 0) & (target_prices > 0) &
+                 ~((ev_low < target_ev) & (ev_high < target_ev)) & ~((ev_low > target_ev) & (ev_high > target_ev)))
+
+    active = np.flatnonzero(bracketed)
+    mid = (low + high) / 2
+    for _ in range(max_iterations):
+        if not len(active):
+            break
+        mid[active] = (low[active] + high[active]) / 2
+        ev_mid = ev_at(mid[active], active)
+        done = np.abs(ev_mid - target_ev[active]) < tolerance * target_ev[active]
+        above = ev_mid > target_ev[active]
+        low[active] = np.where(~done & above, mid[active], low[active])
+        high[active] = np.where(~done & ~above, mid[active], high[active])
+        active = active[~done]
+    rates[bracketed] = mid[bracketed]
+    return rates
+
+
+def file_fingerprint(file_path):
+    """Identify a statement file by path, size and modification time"""
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns
+
+
+class ValuationCache:
+    """Least-recently-used store of valuation results shared by every entry point.
+
+    Keys combine a context (typically the file fingerprint and the selected quarters)
+    with the complete input vector, so forward DCF, reverse DCF and sensitivity runs
+    over the same file reuse each other's work. Cached results are shared objects and
+    must be treated as read-only. ``hits`` and ``misses`` are kept for tuning ``maxsize``.
+
+    Forward DCF misses are evaluated on a ``DCFGraph`` kept per context (the ``max_graphs``
+    most recently used), so edits to one file's inputs re-run only the affected nodes and
+    other files neither invalidate those nodes nor wait for them.
+    """
+
+    def __init__(self, maxsize=512, max_graphs=16):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Calculations run on worker threads as well as the Tk thread
+        self.lock = threading.Lock()
+        self.max_graphs = max_graphs
+        self.graphs = OrderedDict()
+
+    def lookup(self, key, compute):
+        """Return the cached value for ``key``, calling ``compute()`` on a miss"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        # Computed outside the lock; exceptions (including cancellation) are not cached
+        value = compute()
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return value
+
+    def base_revenue(self, context, panel, latest_data):
+        return self.lookup((context, 'base_revenue'), lambda: default_base_revenue(panel, latest_data))
+
+    def dcf(self, context, **inputs):
+        """Memoized ``dcf_valuation``; takes the same keyword arguments"""
+        key = (context, 'dcf', tuple(sorted(inputs.items())))
+        return self.lookup(key, lambda: self._evaluate_graph(context, inputs))
+
+    def _graph(self, context):
+        """The context's ``(graph, lock)``, evicting the least recently used graph when full"""
+        with self.lock:
+            if context not in self.graphs:
+                self.graphs[context] = (DCFGraph(), threading.Lock())
+            self.graphs.move_to_end(context)
+            while len(self.graphs) > self.max_graphs:
+                self.graphs.popitem(last=False)
+            return self.graphs[context]
+
+    def _evaluate_graph(self, context, inputs):
+        graph, graph_lock = self._graph(context)
+        # A graph already busy on another thread is not waited for; the full model is just as correct
+        if not graph_lock.acquire(blocking=False):
+            return dcf_valuation(**inputs)
+        try:
+            return graph.evaluate(**inputs)
+        finally:
+            graph_lock.release()
+
+    def quarterly_dcf(self, context, **inputs):
+        """Memoized ``quarterly_dcf_valuation``; takes the same keyword arguments"""
+        key = (context, 'quarterly_dcf', tuple(sorted(inputs.items())))
+        return self.lookup(key, lambda: quarterly_dcf_valuation(**inputs))
+
+    def sensitivities(self, context, **inputs):
+        """Memoized ``price_sensitivities`` for a full set of ``dcf_valuation`` arguments"""
+        key = (context, 'sensitivities', tuple(sorted(inputs.items())))
+        return self.lookup(key, lambda: price_sensitivities(inputs))
+
+    def implied_discount_rate(self, context, target_price, progress=None, cancelled=None, **inputs):
+        """Memoized ``solve_implied_discount_rate``; the callbacks are not part of the key"""
+        key = (context, 'implied_discount_rate', target_price, tuple(sorted(inputs.items())))
+        return self.lookup(key, lambda: solve_implied_discount_rate(target_price, progress=progress,
+                                                                    cancelled=cancelled, **inputs))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.graphs.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Valuation cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']*100:.0f}% hit rate), {stats['size']}/{stats['maxsize']} entries")
@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from valuation_core import SCHEDULE_PARAMETERS, schedule
+
+EXPORT_FILETYPES = [("Excel Files", "*.xlsx"), ("CSV Files", "*.csv"), ("Parquet Files", "*.parquet")]
+
+# Rows written per chunk by the CSV and Parquet writers
+CHUNK_ROWS = 50000
+
+
+def valuation_tables(model, inputs, sensitivities=None, grid=None):
+    """Every output of one forward DCF as named tables, ready for ``export_tables``.
+
+    ``model`` is a ``dcf_valuation`` (or ``quarterly_dcf_valuation``) result and ``inputs``
+    its keyword arguments. ``sensitivities`` is a ``price_sensitivities`` table and ``grid``
+    a ``price_grid`` frame; both are optional.
+    """
+    n_years = len(model['years'])
+    detail = pd.DataFrame({'year': model['years']})
+    for name in SCHEDULE_PARAMETERS:
+        value = inputs.get(name)
+        detail[name] = schedule(0.0 if value is None else value, n_years)
+    for name in ('revenue', 'ebit', 'tax', 'nopat', 'capex', 'wc', 'wc_change', 'fcf'):
+        detail[name] = model[name]
+    if 'quarterly' in model:
+        # Each year's flows are discounted quarter by quarter, so use the factor implied by the rolled-up PV
+        fcf, present_value = np.asarray(model['fcf'], dtype=float), np.asarray(model['dcf'], dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            detail['discount_factor'] = np.where(fcf != 0, present_value / fcf, np.nan)
+    else:
+        detail['discount_factor'] = (1 + inputs['discount_rate']) ** -detail['year'].to_numpy(dtype=float)
+    detail['present_value'] = model['dcf']
+    tables = {'dcf_detail': detail}
+
+    if 'quarterly' in model:
+        quarterly = model['quarterly']
+        tables['quarterly_detail'] = pd.DataFrame({'quarter': np.arange(1, len(quarterly['fcf']) + 1),
+                                                   **{name: values for name, values in quarterly.items()}})
+
+    # Terminal value and the bridge from enterprise value to price per share
+    shares = inputs.get('shares_outstanding')
+    tables['valuation_summary'] = pd.DataFrame([
+        ('PV of forecast FCF', float(np.sum(model['dcf']))),
+        ('Terminal value', model['terminal_value']),
+        ('PV of terminal value', model['discounted_tv']),
+        ('Enterprise value', model['ev']),
+        ('Debt', inputs.get('debt') or 0.0),
+        ('Cash', inputs.get('cash') or 0.0),
+        ('Equity value', model['equity_value']),
+        ('Shares outstanding', shares if shares else np.nan),
+        ('Price per share', model['price_per_share'] if model['price_per_share'] is not None else np.nan),
+    ], columns=['item', 'value'])
+
+    scalars = [(name, float(value)) for name, value in inputs.items()
+               if name not in SCHEDULE_PARAMETERS and value is not None and np.ndim(value) == 0]
+    tables['inputs'] = pd.DataFrame(scalars, columns=['input', 'value'])
+
+    if sensitivities is not None:
+        # Scheduled rates are shocked in every year; keep their first and final year as numbers
+        table = sensitivities.reset_index(drop=True)
+        values = table['value']
+        table['value'] = [float(np.ravel(value)[0]) for value in values]
+        table.insert(table.columns.get_loc('value') + 1, 'final_value', [float(np.ravel(value)[-1]) for value in values])
+        tables['sensitivities'] = table
+    if grid is not None:
+        tables['sensitivity_grid'] = grid_table(grid)
+    return tables
+
+
+def grid_table(grid):
+    """A ``price_grid`` frame in long form: one (discount_rate, terminal_growth, value) row per cell"""
+    rates, growths = np.meshgrid(grid.index.to_numpy(), grid.columns.to_numpy(), indexing='ij')
+    return pd.DataFrame({'discount_rate': rates.ravel(), 'terminal_growth': growths.ravel(),
+                         'value': grid.to_numpy().ravel()})
+
+
+def combine_tables(tables_by_ticker):
+    """Stack per-ticker ``valuation_tables`` into one set of tables with a leading ticker column"""
+    combined = {}
+    for ticker, tables in tables_by_ticker.items():
+        for name, table in tables.items():
+            combined.setdefault(name, []).append(table.assign(ticker=ticker)[['ticker', *table.columns]])
+    return {name: pd.concat(parts, ignore_index=True) for name, parts in combined.items()}
+
+
+def _cell(value):
+    # openpyxl has no representation for NaN
+    return None if isinstance(value, float) and value != value else value
+
+
+def _write_xlsx(tables, path):
+    """One sheet per table through openpyxl's write-only mode, which streams rows to disk"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for name, table in tables.items():
+        sheet = workbook.create_sheet(title=name[:31])
+        sheet.append([str(column) for column in table.columns])
+        for row in table.itertuples(index=False, name=None):
+            sheet.append([_cell(value) for value in row])
+    workbook.save(path)
+    return [path]
+
+
+def _table_path(path, name, extension):
+    return f"{os.path.splitext(path)[0]}_{name}{extension}"
+
+
+def _write_csv(tables, path):
+    paths = []
+    for name, table in tables.items():
+        table_path = _table_path(path, name, '.csv')
+        table.to_csv(table_path, index=False, chunksize=CHUNK_ROWS)
+        paths.append(table_path)
+    return paths
+
+
+def _write_parquet(tables, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow)")
+
+    paths = []
+    for name, table in tables.items():
+        table_path = _table_path(path, name, '.parquet')
+        schema = pa.Schema.from_pandas(table, preserve_index=False)
+        with pq.ParquetWriter(table_path, schema) as writer:
+            for start in range(0, max(len(table), 1), CHUNK_ROWS):
+                chunk = table.iloc[start:start + CHUNK_ROWS]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        paths.append(table_path)
+    return paths
+
+
+WRITERS = {'.xlsx': _write_xlsx, '.csv': _write_csv, '.parquet': _write_parquet}
+
+
+def export_tables(tables, path):
+    """Write named tables in the format given by ``path``'s extension and return the files written.
+
+    ``.xlsx`` writes one workbook with a sheet per table; ``.csv`` and ``.parquet`` write one
+    ``<name>_<table>`` file per table next to ``path``.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported export format '{extension}'; use .xlsx, .csv or .parquet")
+    return WRITERS[extension](tables, path)
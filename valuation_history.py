@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+
+
+def default_history_path():
+    """``$DCF_HISTORY_PATH`` if set, otherwise ``valuation_history.sqlite`` in the per-user data directory"""
+    if os.environ.get('DCF_HISTORY_PATH'):
+        return os.environ['DCF_HISTORY_PATH']
+    if sys.platform == 'win32':
+        data_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        data_dir = os.path.expanduser('~/Library/Application Support')
+    else:
+        data_dir = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    return os.path.join(data_dir, 'dcf_valuation', 'valuation_history.sqlite')
+
+
+# One history database shared by the GUI, batch runs and the valuation server
+HISTORY_PATH = default_history_path()
+
+# Headline outputs copied into their own columns so they can be queried without parsing JSON
+SUMMARY_FIELDS = {
+    'enterprise_value': 'ev',
+    'equity_value': 'equity_value',
+    'price_per_share': 'price_per_share',
+    'implied_discount_rate': 'implied_discount_rate',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS valuations (
+    id INTEGER PRIMARY KEY,
+    ticker TEXT,
+    kind TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    source_path TEXT,
+    source_size INTEGER,
+    source_mtime_ns INTEGER,
+    inputs_key TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    outputs TEXT NOT NULL,
+    enterprise_value REAL,
+    equity_value REAL,
+    price_per_share REAL,
+    implied_discount_rate REAL
+);
+CREATE INDEX IF NOT EXISTS valuations_ticker_date ON valuations (ticker, created_at);
+CREATE INDEX IF NOT EXISTS valuations_date ON valuations (created_at);
+CREATE INDEX IF NOT EXISTS valuations_inputs ON valuations (kind, inputs_key);
+"""
+
+
+def _plain(value):
+    """Numpy scalars/arrays and tuples as plain JSON values; NaN becomes null"""
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return _plain(value.tolist())
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _timestamp(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def inputs_key(kind, inputs):
+    """Stable hash of a calculation kind and its complete input set"""
+    canonical = json.dumps([kind, _plain(inputs)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+class ValuationHistory:
+    """Append-only SQLite store of computed valuations.
+
+    Each row holds the ticker, the calculation kind (``'dcf'``, ``'quarterly_dcf'``,
+    ``'implied_discount_rate'``), the workbook fingerprint it was computed from, a UTC
+    timestamp, the complete inputs and outputs as JSON and the headline outputs as columns.
+    Inputs are the engine-unit keyword arguments (fractions, millions), so identical inputs
+    from any entry point share one ``inputs_key`` and a stored result can be reused.
+    The connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        if path != ':memory:' and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            if path != ':memory:':
+                self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.executescript(SCHEMA)
+
+    def _row(self, ticker, kind, inputs, outputs, fingerprint=None, created_at=None):
+        outputs = _plain(outputs)
+        source_path, source_size, source_mtime_ns = fingerprint or (None, None, None)
+        summary = [outputs.get(field) if isinstance(outputs, dict) else None for field in SUMMARY_FIELDS.values()]
+        return (ticker, kind, created_at or datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                source_path, source_size, source_mtime_ns, inputs_key(kind, inputs),
+                json.dumps(_plain(inputs), sort_keys=True), json.dumps(outputs), *summary)
+
+    def record_many(self, records):
+        """Append ``(ticker, kind, inputs, outputs, fingerprint)`` records in one transaction"""
+        rows = [self._row(*record) for record in records]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO valuations (ticker, kind, created_at, source_path, source_size, source_mtime_ns, "
+                f"inputs_key, inputs, outputs, {', '.join(SUMMARY_FIELDS)}) "
+                f"VALUES ({', '.join('?' * (9 + len(SUMMARY_FIELDS)))})", rows)
+        return len(rows)
+
+    def record(self, ticker, kind, inputs, outputs, fingerprint=None):
+        self.record_many([(ticker, kind, inputs, outputs, fingerprint)])
+
+    def find(self, kind, inputs):
+        """Outputs of the most recent stored calculation with exactly these inputs, or None"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT outputs FROM valuations WHERE kind = ? AND inputs_key = ? ORDER BY id DESC LIMIT 1",
+                (kind, inputs_key(kind, inputs))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def lookup(self, kind, inputs, compute, ticker=None, fingerprint=None):
+        """Stored outputs for ``inputs``, or ``compute()`` recorded under ``ticker`` on a miss"""
+        outputs = self.find(kind, inputs)
+        if outputs is None:
+            outputs = compute()
+            self.record(ticker, kind, inputs, outputs, fingerprint)
+        return outputs
+
+    def query(self, tickers=None, kind=None, since=None, until=None, with_json=False):
+        """Stored valuations as a DataFrame, oldest first.
+
+        ``tickers`` is a list of symbols, ``since``/``until`` are ISO dates or datetimes
+        (inclusive bounds on ``created_at``). ``with_json`` adds the parsed inputs/outputs.
+        """
+        clauses, params = [], []
+        if tickers:
+            clauses.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+            params.extend(ticker.upper() for ticker in tickers)
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if since:
+            clauses.append("created_at >= ?")
+            params.append(_timestamp(since))
+        if until:
+            # Compare at the precision given, so a plain date includes that whole day
+            clauses.append("substr(created_at, 1, length(?)) <= ?")
+            params.extend([_timestamp(until)] * 2)
+        columns = ['id', 'ticker', 'kind', 'created_at', 'source_path', 'source_mtime_ns', *SUMMARY_FIELDS]
+        if with_json:
+            columns += ['inputs', 'outputs']
+        sql = f"SELECT {', '.join(columns)} FROM valuations"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self.lock:
+            table = pd.read_sql_query(sql + " ORDER BY created_at, id", self.connection, params=params)
+        if with_json:
+            table['inputs'] = table['inputs'].map(json.loads)
+            table['outputs'] = table['outputs'].map(json.loads)
+        return table
+
+    def latest(self, tickers=None, kind='dcf'):
+        """Most recent valuation per ticker"""
+        table = self.query(tickers, kind)
+        return table.groupby('ticker', sort=True).tail(1).reset_index(drop=True)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,321 @@
+import os
+import json
+import math
+import asyncio
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+
+from valuation_core import (DEFAULT_PARAMETERS, LookbackCache, ValuationCache, load_panel, select_quarters,
+                            file_fingerprint, model_inputs, verbose_logging)
+from batch_valuation import discover_workbooks
+from scenarios import SCENARIO_FIELDS
+from valuation_history import HISTORY_PATH, ValuationHistory
+
+logger = logging.getLogger(__name__)
+
+# Request fields that are not model parameters
+REQUEST_FIELDS = {'ticker', 'quarters'}
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class UnknownTicker(KeyError):
+    pass
+
+
+class TickerData:
+    """One workbook parsed into a panel with its lookback windows, tagged with the file it came from"""
+
+    def __init__(self, ticker, file_path):
+        self.ticker = ticker
+        self.file_path = file_path
+        self.fingerprint = file_fingerprint(file_path)
+        self.panel = load_panel(file_path)
+        self.lookback_cache = LookbackCache(self.panel)
+
+
+class TickerStore:
+    """Parsed workbooks kept in memory and reloaded when a workbook changes on disk.
+
+    Every ``get`` compares the workbook's size and mtime with the loaded copy, so a
+    re-consolidated ticker is picked up on its next request; ``refresh`` does the same
+    for every loaded ticker and is run periodically by the server.
+    """
+
+    def __init__(self, statements_dir):
+        self.statements_dir = statements_dir
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.load_locks = {}
+
+    def workbooks(self):
+        return dict(discover_workbooks(self.statements_dir))
+
+    def _load_lock(self, ticker):
+        with self.lock:
+            return self.load_locks.setdefault(ticker, threading.Lock())
+
+    def get(self, ticker):
+        ticker = ticker.upper()
+        entry = self.entries.get(ticker)
+        path = entry.file_path if entry else self.workbooks().get(ticker)
+        if path is None or not os.path.exists(path):
+            raise UnknownTicker(f"No consolidated workbook found for {ticker}")
+        if entry is not None and entry.fingerprint == file_fingerprint(path):
+            return entry
+
+        # One load per ticker at a time; other requests for it wait and reuse the result
+        with self._load_lock(ticker):
+            entry = self.entries.get(ticker)
+            if entry is None or entry.fingerprint != file_fingerprint(path):
+                logger.info(f"Loading {ticker} from {path}")
+                entry = TickerData(ticker, path)
+                self.entries[ticker] = entry
+        return entry
+
+    def refresh(self):
+        """Reload every loaded ticker whose workbook changed; returns the reloaded tickers"""
+        reloaded = []
+        for ticker, entry in list(self.entries.items()):
+            try:
+                changed = file_fingerprint(entry.file_path) != entry.fingerprint
+            except OSError:
+                continue
+            if changed:
+                self.get(ticker)
+                reloaded.append(ticker)
+        return reloaded
+
+
+def json_safe(value):
+    """Convert numpy scalars, tuples and NaN/inf into plain JSON values"""
+    if isinstance(value, dict):
+        return {str(key): json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if hasattr(value, 'tolist'):
+        return json_safe(value.tolist())
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+class ValuationService:
+    """DCF, reverse DCF and sensitivity answers for hot tickers, shared by every connection"""
+
+    def __init__(self, statements_dir, workers=None, history=None):
+        self.store = TickerStore(statements_dir)
+        self.cache = ValuationCache()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        # Optional ValuationHistory: new results are recorded and reused across restarts
+        self.history = history
+
+    def prepare(self, request):
+        """Prefilled inputs for the request's ticker and lookback, with the request's overrides on top"""
+        if not request.get('ticker'):
+            raise ValueError("A ticker is required")
+        # A misspelt parameter would otherwise be valued at its default without notice
+        unknown = sorted(name for name in request if name not in REQUEST_FIELDS and name not in SCENARIO_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown field(s) {', '.join(unknown)}; "
+                             f"valid fields are {', '.join(sorted(REQUEST_FIELDS) + SCENARIO_FIELDS)}")
+        data = self.store.get(request['ticker'])
+        selected = select_quarters(data.panel.quarter_cols, request.get('quarters', "All available data"))
+        entry = data.lookback_cache.get(selected)
+        context = (data.fingerprint, tuple(selected))
+
+        inputs = dict(DEFAULT_PARAMETERS)
+        inputs.update(entry['params'])
+        inputs.update({name: value for name, value in request.items() if name not in REQUEST_FIELDS})
+        if inputs.get('base_revenue') is None:
+            inputs['base_revenue'] = self.cache.base_revenue(context, data.panel, data.lookback_cache.latest_data)
+        if inputs['base_revenue'] is None:
+            raise ValueError("Could not find revenue data; provide base_revenue")
+        return data, context, inputs
+
+    def stored(self, data, kind, inputs, compute):
+        """Reuse a result from the history for identical inputs, recording new ones"""
+        if self.history is None:
+            return compute()
+        return self.history.lookup(kind, inputs, compute, data.ticker, data.fingerprint)
+
+    def dcf(self, request):
+        data, context, inputs = self.prepare(request)
+        kwargs = model_inputs(inputs)
+        model = self.stored(data, 'dcf', kwargs, lambda: self.cache.dcf(context, **kwargs))
+        return {'ticker': data.ticker, 'inputs': inputs, 'model': model}
+
+    def implied_discount_rate(self, request):
+        data, context, inputs = self.prepare(request)
+        if not inputs.get('current_share_price'):
+            raise ValueError("current_share_price is required for the reverse DCF")
+        if not inputs.get('shares_outstanding'):
+            raise ValueError("shares_outstanding is required for the reverse DCF")
+        kwargs = model_inputs(inputs)
+        kwargs.pop('discount_rate')
+        current_price = float(inputs['current_share_price'])
+        solution = self.stored(data, 'implied_discount_rate', dict(kwargs, target_price=current_price),
+                               lambda: self.cache.implied_discount_rate(context, current_price, **kwargs))
+        return {'ticker': data.ticker, 'inputs': inputs, 'solution': solution}
+
+    def sensitivities(self, request):
+        data, context, inputs = self.prepare(request)
+        if not inputs.get('shares_outstanding'):
+            raise ValueError("shares_outstanding is required for sensitivities")
+        table = self.cache.sensitivities(context, **model_inputs(inputs))
+        return {'ticker': data.ticker, 'inputs': inputs, 'price_per_share': table.attrs['price_per_share'],
+                'sensitivities': table.to_dict(orient='records')}
+
+    def tickers(self, request):
+        return {'tickers': sorted(self.store.workbooks()), 'loaded': sorted(self.store.entries)}
+
+    def stats(self, request):
+        return {'cache': self.cache.stats(), 'loaded': sorted(self.store.entries)}
+
+    ROUTES = {
+        ('GET', '/health'): lambda self, request: {'status': 'ok'},
+        ('GET', '/tickers'): tickers,
+        ('GET', '/stats'): stats,
+        ('POST', '/dcf'): dcf,
+        ('POST', '/implied-discount-rate'): implied_discount_rate,
+        ('POST', '/sensitivities'): sensitivities,
+    }
+    # Valuation endpoints also accept their fields as a GET query string
+    ROUTES.update({('GET', path): handler for (method, path), handler in list(ROUTES.items()) if method == 'POST'})
+
+    async def handle(self, method, path, request):
+        """Run one request on the worker pool; returns (status, response body)"""
+        handler = self.ROUTES.get((method, path))
+        if handler is None:
+            known = any(route_path == path for _, route_path in self.ROUTES)
+            return (405 if known else 404), {'error': f"{method} {path} is not supported"}
+        loop = asyncio.get_running_loop()
+        try:
+            return 200, await loop.run_in_executor(self.pool, handler, self, request)
+        except UnknownTicker as e:
+            return 404, {'error': e.args[0]}
+        except (ValueError, TypeError, KeyError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request into (method, path, fields); fields merge the query and a JSON body"""
+    request_line = (await reader.readline()).decode('latin-1').strip()
+    if not request_line:
+        return None
+    method, target, _ = request_line.split(' ', 2)
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    url = urlsplit(target)
+    fields = dict(parse_qsl(url.query))
+    length = int(headers.get('content-length', 0))
+    if length:
+        body = json.loads(await reader.readexactly(length))
+        if not isinstance(body, dict):
+            raise ValueError("The request body must be a JSON object")
+        fields.update(body)
+    return method.upper(), url.path, fields
+
+
+async def serve_connection(service, reader, writer):
+    try:
+        try:
+            parsed = await read_request(reader)
+            if parsed is None:
+                return
+            status, body = await service.handle(*parsed)
+        except (ValueError, json.JSONDecodeError) as e:
+            status, body = 400, {'error': f"Malformed request: {e}"}
+        payload = json.dumps(json_safe(body)).encode()
+        writer.write(f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def watch(service, interval):
+    """Reload changed workbooks in the background so the next request finds them hot"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        reloaded = await loop.run_in_executor(service.pool, service.store.refresh)
+        if reloaded:
+            logger.info(f"Reloaded {', '.join(reloaded)}")
+
+
+async def serve(service, host='127.0.0.1', port=8765, socket_path=None, watch_interval=2.0, preload=()):
+    loop = asyncio.get_running_loop()
+    for ticker in preload:
+        await loop.run_in_executor(service.pool, service.store.get, ticker)
+
+    def handler(reader, writer):
+        return serve_connection(service, reader, writer)
+
+    if socket_path:
+        server = await asyncio.start_unix_server(handler, path=socket_path)
+        print(f"Serving valuations on unix socket {socket_path}")
+    else:
+        server = await asyncio.start_server(handler, host, port)
+        print(f"Serving valuations on http://{host}:{port}")
+
+    watcher = asyncio.ensure_future(watch(service, watch_interval)) if watch_interval > 0 else None
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+
+
+def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Serve DCF, reverse DCF and sensitivity requests from memory.')
+    parser.add_argument('preload', nargs='*', help='Tickers to load before accepting requests')
+    parser.add_argument('--statements-dir', default=os.path.join(script_dir, 'statements'),
+                        help='Folder containing one sub-folder per ticker')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help='Listen on this unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='Calculation worker threads')
+    parser.add_argument('--history', default=HISTORY_PATH, help='Valuation history database')
+    parser.add_argument('--no-history', action='store_true', help='Do not record or reuse valuation history')
+    parser.add_argument('--watch-interval', type=float, default=2.0,
+                        help='Seconds between checks for changed workbooks (0 to only check on request)')
+    parser.add_argument('--verbose', action='store_true', help='Log workbook loads and loading diagnostics')
+    args = parser.parse_args()
+
+    if args.verbose:
+        verbose_logging()
+        logger.setLevel(logging.DEBUG)
+
+    history = None if args.no_history else ValuationHistory(args.history)
+    service = ValuationService(args.statements_dir, args.workers, history)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.socket, args.watch_interval,
+                          [ticker.upper() for ticker in args.preload]))
+    except KeyboardInterrupt:
+        print("Server stopped")
+    finally:
+        service.pool.shutdown(wait=False)
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(ttk.Frame):
+    """Read-only table that only materialises the rows and columns currently in view.
+
+    The underlying ``ttk.Treeview`` holds one item per visible row and one column per
+    visible data column; scrolling rewrites those cells from ``values`` instead of
+    inserting every row up front, so opening very large frames stays immediate.
+    """
+
+    def __init__(self, master, row_labels, col_labels, values, label_heading="Account",
+                 label_width=220, col_width=100, formatter=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.row_labels = [str(label) for label in row_labels]
+        self.col_labels = [str(label) for label in col_labels]
+        self.values = values
+        self.label_heading = label_heading
+        self.label_width = label_width
+        self.col_width = col_width
+        self.formatter = formatter or self.format_value
+
+        self.first_row = 0
+        self.first_col = 0
+        self.visible_rows = 0
+        self.visible_cols = 0
+        self.items = []
+
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse", height=1)
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.hsb = ttk.Scrollbar(self, orient="horizontal", command=self.xview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.vsb.grid(row=0, column=1, sticky="ns")
+        self.hsb.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        # Row height of the current theme, used to work out how many rows fit
+        self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+
+        self.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Shift-MouseWheel>", lambda e: self._on_mousewheel(e, horizontal=True))
+        self.tree.bind("<Button-4>", lambda e: self.yview("scroll", -3, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.yview("scroll", 3, "units"))
+
+    @staticmethod
+    def format_value(value):
+        """Format a single cell only when it scrolls into view"""
+        return str(value)
+
+    @property
+    def n_rows(self):
+        return len(self.row_labels)
+
+    @property
+    def n_cols(self):
+        return len(self.col_labels)
+
+    def _on_resize(self, event):
+        # Leave room for the heading row and the horizontal scrollbar
+        height = event.height - self.hsb.winfo_reqheight() - self.row_height - 4
+        width = event.width - self.vsb.winfo_reqwidth() - self.label_width
+        rows = min(max(1, height // self.row_height), self.n_rows)
+        cols = min(max(1, width // self.col_width), self.n_cols)
+        if (rows, cols) != (self.visible_rows, self.visible_cols):
+            self._layout(rows, cols)
+
+    def _layout(self, rows, cols):
+        """Rebuild the fixed pool of tree items and display columns for a new viewport size"""
+        self.visible_rows = rows
+        self.visible_cols = cols
+        column_ids = ["label"] + [f"c{i}" for i in range(cols)]
+        self.tree.configure(columns=column_ids, height=max(rows, 1))
+
+        self.tree.column("label", anchor=tk.W, width=self.label_width, stretch=tk.NO)
+        self.tree.heading("label", text=self.label_heading, anchor=tk.W)
+        for column_id in column_ids[1:]:
+            self.tree.column(column_id, anchor=tk.E, width=self.col_width, stretch=tk.NO)
+
+        self.tree.delete(*self.tree.get_children())
+        self.items = [self.tree.insert("", tk.END) for _ in range(rows)]
+
+        self.first_row = self._clamp(self.first_row, rows, self.n_rows)
+        self.first_col = self._clamp(self.first_col, cols, self.n_cols)
+        self._refresh()
+
+    def _refresh(self):
+        """Write the cells of the current viewport into the item pool"""
+        col_range = range(self.first_col, min(self.first_col + self.visible_cols, self.n_cols))
+        for i in range(self.visible_cols):
+            col = self.first_col + i
+            self.tree.heading(f"c{i}", text=self.col_labels[col] if col < self.n_cols else "", anchor=tk.E)
+
+        for i, item in enumerate(self.items):
+            row = self.first_row + i
+            if row < self.n_rows:
+                cells = [self.row_labels[row]] + [self.formatter(self.values[row, col]) for col in col_range]
+            else:
+                cells = []
+            self.tree.item(item, values=cells)
+
+        self.vsb.set(*self._fractions(self.first_row, self.visible_rows, self.n_rows))
+        self.hsb.set(*self._fractions(self.first_col, self.visible_cols, self.n_cols))
+
+    @staticmethod
+    def _clamp(first, visible, total):
+        return max(0, min(first, total - visible))
+
+    @staticmethod
+    def _fractions(first, visible, total):
+        if total <= 0:
+            return 0.0, 1.0
+        return first / total, min(1.0, (first + visible) / total)
+
+    def _scroll(self, args, first, visible, total):
+        """Translate Scrollbar 'moveto'/'scroll' commands into a new first index"""
+        if args[0] == "moveto":
+            first = int(round(float(args[1]) * total))
+        elif args[0] == "scroll":
+            step = int(args[1])
+            first += step * max(visible - 1, 1) if args[2] == "pages" else step
+        return self._clamp(first, visible, total)
+
+    def yview(self, *args):
+        self.first_row = self._scroll(args, self.first_row, self.visible_rows, self.n_rows)
+        self._refresh()
+
+    def xview(self, *args):
+        self.first_col = self._scroll(args, self.first_col, self.visible_cols, self.n_cols)
+        self._refresh()
+
+    def _on_mousewheel(self, event, horizontal=False):
+        step = -1 if event.delta > 0 else 1
+        if horizontal:
+            self.xview("scroll", step, "units")
+        else:
+            self.yview("scroll", step * 3, "units")
+        return "break"